@@ -0,0 +1,280 @@
+"""Armazenamento das análises prévias em uma tabela SQLite.
+
+Cada análise salva é um INSERT em data/analisePrevia.db: o custo não
+cresce com o número de análises já salvas, o commit é atômico e durável
+(WAL com synchronous FULL) e sessões salvando ao mesmo tempo esperam o
+lock de escrita umas das outras em vez de sobrescrever o arquivo.
+
+A tabela agregados guarda, por mês × gênero × público alvo, a contagem e
+as somas e somas de quadrados do valor de mercado e das páginas; a tabela
+histograma_paginas conta as análises por faixa de páginas na mesma
+divisão. Um gatilho atualiza as duas a cada INSERT, então o painel lê
+algumas centenas de células, não as análises (ver carregar_agregados).
+
+Junto com cada análise são gravadas a assinatura MinHash e as chaves de
+título e autor dela (ver duplicatas.py), para avisar de análises da mesma
+obra escritas com outra grafia (analises_parecidas).
+
+As colunas são expostas com os mesmos rótulos do antigo
+data/analisePrevia.csv. Se esse CSV existir, as linhas dele são copiadas
+para a tabela na primeira abertura do processo, e o arquivo é renomeado
+para analisePrevia.csv.migrado.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import closing
+import pandas as pd
+import duplicatas
+
+DATA_DIR = 'data'
+DB_PATH = os.path.join(DATA_DIR, 'analisePrevia.db')
+CSV_PATH = os.path.join(DATA_DIR, 'analisePrevia.csv')
+
+# Rótulo usado no formulário e no CSV antigo -> coluna da tabela
+COLUNAS = {
+    'Título': 'titulo',
+    'Autor': 'autor',
+    'Gênero': 'genero',
+    'Público Alvo': 'publico_alvo',
+    'Número de Página em Média': 'paginas_media',
+    'Valor Estimado do Mercado': 'valor_mercado',
+    'Concorrentes Relevantes': 'concorrentes',
+    'Data da Análise': 'data_analise',
+}
+
+ESQUEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS analises (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        titulo TEXT,
+        autor TEXT,
+        genero TEXT,
+        publico_alvo TEXT,
+        paginas_media INTEGER,
+        valor_mercado REAL,
+        concorrentes TEXT,
+        data_analise TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_analises_data ON analises (data_analise)",
+]
+
+# Largura das faixas do histograma de páginas (faixa 0 = 1 a 100 páginas)
+PAGINAS_POR_FAIXA = 100
+
+ESQUEMA_AGREGADOS = [
+    # Cada análise já com a célula (mês × gênero × público) e os números válidos;
+    # textos antigos que não são número nem data ficam de fora das somas
+    f"""
+    CREATE VIEW analises_celulas AS
+    SELECT
+        id,
+        CASE WHEN data_analise GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]*'
+             THEN substr(data_analise, 1, 7) ELSE 'sem-data' END AS mes,
+        COALESCE(genero, 'Não informado') AS genero,
+        COALESCE(publico_alvo, 'Não informado') AS publico_alvo,
+        CASE WHEN typeof(valor_mercado) IN ('integer', 'real') THEN valor_mercado END AS valor,
+        CASE WHEN typeof(paginas_media) IN ('integer', 'real') AND paginas_media >= 1
+             THEN paginas_media END AS paginas,
+        (CAST(paginas_media AS INTEGER) - 1) / {PAGINAS_POR_FAIXA} AS faixa
+    FROM analises
+    """,
+    """
+    CREATE TABLE agregados (
+        mes TEXT NOT NULL,
+        genero TEXT NOT NULL,
+        publico_alvo TEXT NOT NULL,
+        quantidade INTEGER NOT NULL,
+        quantidade_valor INTEGER NOT NULL,
+        soma_valor REAL NOT NULL,
+        soma_quadrados_valor REAL NOT NULL,
+        quantidade_paginas INTEGER NOT NULL,
+        soma_paginas REAL NOT NULL,
+        soma_quadrados_paginas REAL NOT NULL,
+        PRIMARY KEY (mes, genero, publico_alvo)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE histograma_paginas (
+        mes TEXT NOT NULL,
+        genero TEXT NOT NULL,
+        publico_alvo TEXT NOT NULL,
+        faixa INTEGER NOT NULL,
+        quantidade INTEGER NOT NULL,
+        PRIMARY KEY (mes, genero, publico_alvo, faixa)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TRIGGER analises_agregados_insert AFTER INSERT ON analises BEGIN
+        INSERT INTO agregados
+        SELECT mes, genero, publico_alvo, 1,
+               valor IS NOT NULL, COALESCE(valor, 0), COALESCE(valor * valor, 0),
+               paginas IS NOT NULL, COALESCE(paginas, 0), COALESCE(paginas * paginas, 0)
+        FROM analises_celulas WHERE id = new.id
+        ON CONFLICT (mes, genero, publico_alvo) DO UPDATE SET
+            quantidade = quantidade + 1,
+            quantidade_valor = quantidade_valor + excluded.quantidade_valor,
+            soma_valor = soma_valor + excluded.soma_valor,
+            soma_quadrados_valor = soma_quadrados_valor + excluded.soma_quadrados_valor,
+            quantidade_paginas = quantidade_paginas + excluded.quantidade_paginas,
+            soma_paginas = soma_paginas + excluded.soma_paginas,
+            soma_quadrados_paginas = soma_quadrados_paginas + excluded.soma_quadrados_paginas;
+        INSERT INTO histograma_paginas
+        SELECT mes, genero, publico_alvo, faixa, 1
+        FROM analises_celulas WHERE id = new.id AND paginas IS NOT NULL
+        ON CONFLICT (mes, genero, publico_alvo, faixa) DO UPDATE SET quantidade = quantidade + 1;
+    END
+    """,
+    # Preenche com as análises gravadas antes dos agregados existirem
+    """
+    INSERT INTO agregados
+    SELECT mes, genero, publico_alvo, COUNT(*),
+           COUNT(valor), TOTAL(valor), TOTAL(valor * valor),
+           COUNT(paginas), TOTAL(paginas), TOTAL(paginas * paginas)
+    FROM analises_celulas GROUP BY mes, genero, publico_alvo
+    """,
+    """
+    INSERT INTO histograma_paginas
+    SELECT mes, genero, publico_alvo, faixa, COUNT(*)
+    FROM analises_celulas WHERE paginas IS NOT NULL GROUP BY mes, genero, publico_alvo, faixa
+    """,
+]
+
+INSERIR = f"INSERT INTO analises ({', '.join(COLUNAS.values())}) VALUES ({', '.join('?' * len(COLUNAS))})"
+
+# A migração do CSV roda uma vez por processo
+_lock_preparo = threading.Lock()
+_preparado = False
+
+# Conexão reaproveitada pela consulta de parecidas: abrir uma custa mais que a consulta
+_lock_leitura = threading.Lock()
+_conn_leitura = None
+
+
+def conectar():
+    """Abre uma conexão com o banco das análises, já configurada."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=10.0, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = FULL")  # cada análise salva sobrevive a uma queda de energia
+    conn.execute("PRAGMA busy_timeout = 10000")
+    return conn
+
+
+def _migrar_csv(conn):
+    """Copia o CSV antigo para a tabela (uma única vez) e o renomeia."""
+    if not os.path.exists(CSV_PATH):
+        return 0
+
+    # IMMEDIATE: dois processos abrindo juntos não importam o CSV duas vezes
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # user_version 1 marca que o CSV já foi importado (ex.: se a renomeação falhou antes)
+        importadas = 0
+        # Outro processo pode ter migrado e renomeado o CSV enquanto esperávamos o lock
+        if os.path.exists(CSV_PATH) and conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+            try:
+                df = pd.read_csv(CSV_PATH)
+            except pd.errors.EmptyDataError:
+                df = pd.DataFrame()
+            df = df.reindex(columns=list(COLUNAS)).astype(object)
+            df = df.where(df.notna(), None)
+            conn.executemany(INSERIR, df.itertuples(index=False, name=None))
+            importadas = len(df)
+            conn.execute("PRAGMA user_version = 1")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    try:
+        os.replace(CSV_PATH, CSV_PATH + '.migrado')
+    except FileNotFoundError:
+        pass
+    return importadas
+
+
+def preparar():
+    """Cria a tabela e migra o CSV antigo na primeira chamada do processo."""
+    global _preparado
+    if _preparado:
+        return
+    with _lock_preparo:
+        if _preparado:
+            return
+        with closing(conectar()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for comando in ESQUEMA + duplicatas.ESQUEMA:
+                    conn.execute(comando)
+                # Criados e preenchidos na mesma transação: nenhum INSERT fica de fora
+                if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'agregados'").fetchone():
+                    for comando in ESQUEMA_AGREGADOS:
+                        conn.execute(comando)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            _migrar_csv(conn)
+            # Análises gravadas antes do índice de duplicatas (ou vindas do CSV)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                duplicatas.indexar_pendentes(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        _preparado = True
+
+
+def salvar_analise(entrada):
+    """Grava uma análise (dicionário com os rótulos de COLUNAS) e retorna o id dela."""
+    preparar()
+    valores = [entrada.get(rotulo) for rotulo in COLUNAS]
+    with closing(conectar()) as conn:
+        # A análise e as chaves dela no índice de duplicatas, na mesma transação
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            analise_id = conn.execute(INSERIR, valores).lastrowid
+            duplicatas.indexar(conn, [(analise_id, entrada.get('Título'), entrada.get('Autor'))])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return analise_id
+
+
+def analises_parecidas(titulo, autor):
+    """Análises já salvas com título e autor parecidos, das mais parecidas para as menos."""
+    global _conn_leitura
+    preparar()
+    with _lock_leitura:
+        if _conn_leitura is None:
+            # Em autocommit, cada consulta enxerga as análises gravadas por outras conexões
+            _conn_leitura = sqlite3.connect(DB_PATH, timeout=10.0, isolation_level=None, check_same_thread=False)
+        return duplicatas.parecidas(_conn_leitura, titulo, autor)
+
+
+def carregar_analises():
+    """Retorna todas as análises, em ordem de gravação, com os rótulos de COLUNAS."""
+    preparar()
+    with closing(conectar()) as conn:
+        df = pd.read_sql_query(
+            f"SELECT {', '.join(COLUNAS.values())} FROM analises ORDER BY id", conn
+        )
+    return df.rename(columns={coluna: rotulo for rotulo, coluna in COLUNAS.items()})
+
+
+def carregar_agregados():
+    """Retorna as células de agregados (mes, genero, publico_alvo, contagens e somas)."""
+    preparar()
+    with closing(conectar()) as conn:
+        return pd.read_sql_query("SELECT * FROM agregados ORDER BY mes, genero, publico_alvo", conn)
+
+
+def carregar_histograma_paginas():
+    """Retorna as contagens do histograma de páginas (mes, genero, publico_alvo, faixa, quantidade)."""
+    preparar()
+    with closing(conectar()) as conn:
+        return pd.read_sql_query("SELECT * FROM histograma_paginas ORDER BY mes, genero, publico_alvo, faixa", conn)
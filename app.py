@@ -1,16 +1,15 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime
-import os
-if not os.path.exists('data'):
-    os.makedirs('data')
-
-DATA_PATH = 'data/analisePrevia.csv'
+from analises import analises_parecidas, salvar_analise
+from historico import agendar_exportacao, iniciar_exportacao
 
 st.set_page_config(
     page_icon='📊', page_title='Análise Prévia', layout='centered')
 st.title('Análise Prévia para a Publicação de Livros')
 
+# Copia para o Parquet (ver historico.py) as análises que ainda não foram copiadas
+iniciar_exportacao()
+
 st.markdown('Preencha os dados abaixo para gerar a análise prévia.')
 
 # Form's #
@@ -42,10 +41,13 @@ with st.form(key='analise_previa_form'):
             'Concorrentes Relevantes': concorrentes,
             'Data da Análise': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
-        try:
-            df = pd.read_csv(DATA_PATH)
-        except FileNotFoundError:
-            df = pd.DataFrame()
-        df = pd.contact([df, pd.dataFrame([novaEntrada])], ignore_index=True)
-        df.to_csv(DATA_PATH, index=False)
+        # Análises da mesma obra com outra grafia (ver duplicatas.py), antes de gravar esta
+        parecidas = analises_parecidas(titulo, autor) if titulo or autor else []
+        # Um INSERT por análise (ver analises.py), sem reler nem reescrever as anteriores
+        salvar_analise(novaEntrada)
+        agendar_exportacao()
         st.success('Análise salva com sucesso!')
+        if parecidas:
+            st.warning('Já existem análises parecidas com esta:\n\n' + '\n'.join(
+                f"- **{analise['titulo']}** — {analise['autor']} ({analise['data']}, {analise['similaridade']:.0%} parecida)"
+                for analise in parecidas))
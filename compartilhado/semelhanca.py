@@ -0,0 +1,130 @@
+"""Comparação aproximada de títulos e autores por trigramas e MinHash.
+
+Título e autor são normalizados (sem acentos, pontuação ou maiúsculas) e
+quebrados em trigramas de caracteres; duas entradas tratam da mesma obra
+quando a similaridade de Jaccard dos trigramas passa de LIMIAR. Cada
+entrada guarda uma assinatura MinHash de ASSINATURAS valores, dividida em
+BANDAS faixas (ver chaves): só as entradas que coincidem em alguma faixa
+são comparadas, primeiro pela fração de valores iguais das assinaturas
+e, perto do limiar, pelos trigramas.
+
+Este módulo não depende do banco: é usado pelo BiblioTech (yuri trabalho/)
+e pelo app de análises da raiz do projeto, cujos duplicatas.py gravam as
+assinaturas e as chaves nas próprias tabelas. As permutações e as
+constantes são as mesmas nos dois, então as assinaturas já gravadas
+continuam valendo. Os dois apps o instalam pelos seus requirements:
+
+    pip install -e compartilhado
+"""
+import re
+import unicodedata
+import zlib
+import numpy as np
+
+# Valores da assinatura MinHash, em BANDAS faixas de LINHAS_POR_BANDA
+BANDAS = 10
+LINHAS_POR_BANDA = 3
+ASSINATURAS = BANDAS * LINHAS_POR_BANDA
+
+# Jaccard mínimo entre os trigramas para duas entradas contarem como da mesma obra
+LIMIAR = 0.7
+
+# Candidatos examinados por consulta (os que coincidem em mais faixas primeiro)
+MAX_CANDIDATOS = 50
+
+# Folga abaixo do LIMIAR para a estimativa da assinatura (desvio padrão
+# de cerca de 0,08 com 30 valores): só quem passa dela é verificado
+MARGEM_ESTIMATIVA = 0.2
+
+# Permutações (a * h + b) mod PRIMO fixas: as assinaturas gravadas continuam válidas
+_PRIMO = (1 << 31) - 1
+_gerador = np.random.default_rng(20240531)
+_A = _gerador.integers(1, _PRIMO, ASSINATURAS, dtype=np.uint64)[:, None]
+_B = _gerador.integers(0, _PRIMO, ASSINATURAS, dtype=np.uint64)[:, None]
+
+# Marcas diacríticas que sobram após a decomposição NFKD
+_ACENTOS = re.compile("[\u0300-\u036f]")
+_SEPARADORES = re.compile(r"[\W_]+")
+
+
+def normalizar_texto(texto):
+    """Normaliza um texto para comparação: sem acentos, sem pontuação, minúsculo."""
+    texto = _ACENTOS.sub("", unicodedata.normalize("NFKD", str(texto)))
+    return _SEPARADORES.sub(" ", texto.casefold()).strip()
+
+
+def normalizar_coluna(serie):
+    """Aplica normalizar_texto a uma coluna inteira do pandas."""
+    return serie.fillna("").astype(str).map(normalizar_texto)
+
+
+def trigramas(titulo, autor):
+    """Conjunto de trigramas do título e do autor normalizados."""
+    texto = f" {normalizar_texto(titulo or '')} | {normalizar_texto(autor or '')} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def jaccard(a, b):
+    """Similaridade de Jaccard entre dois conjuntos."""
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def assinatura(conjunto):
+    """Assinatura MinHash (ASSINATURAS valores uint32) do conjunto de trigramas."""
+    hashes = np.fromiter((zlib.crc32(t.encode()) for t in conjunto), dtype=np.uint64, count=len(conjunto))
+    return ((_A * hashes + _B) % _PRIMO).min(axis=1).astype(np.uint32)
+
+
+def chaves(valores):
+    """Chaves das faixas de uma assinatura."""
+    # A faixa vai nos bits altos: faixas diferentes com os mesmos valores não colidem
+    return [
+        (banda << 32) | zlib.crc32(valores[banda * LINHAS_POR_BANDA:(banda + 1) * LINHAS_POR_BANDA].tobytes())
+        for banda in range(BANDAS)
+    ]
+
+
+def confirmar(conjunto, valores, candidatos, limiar=LIMIAR):
+    """Candidatos (titulo, autor, assinatura em bytes) que passam do limiar, como (posição, similaridade).
+
+    A estimativa pelas assinaturas descarta de uma vez os que ficam longe do
+    limiar; só os outros têm os trigramas comparados.
+    """
+    if not candidatos:
+        return []
+    assinaturas = np.frombuffer(
+        b"".join(bytes(candidato[2]) for candidato in candidatos), dtype=np.uint32
+    ).reshape(-1, ASSINATURAS)
+    estimativas = (assinaturas == valores).mean(axis=1)
+    confirmados = []
+    for posicao, ((titulo, autor, _), estimativa) in enumerate(zip(candidatos, estimativas)):
+        if estimativa < limiar - MARGEM_ESTIMATIVA:
+            continue
+        similaridade = jaccard(conjunto, trigramas(titulo, autor))
+        if similaridade >= limiar:
+            confirmados.append((posicao, similaridade))
+    return confirmados
+
+
+def agrupar(pares, textos, limiar=LIMIAR):
+    """Une os pares (a, b) cujos trigramas em `textos` passam do limiar; retorna os grupos de ids em ordem."""
+    pai = {}
+
+    def raiz(item):
+        while pai[item] != item:
+            pai[item] = pai[pai[item]]
+            item = pai[item]
+        return item
+
+    for a, b in pares:
+        if a in textos and b in textos and jaccard(textos[a], textos[b]) >= limiar:
+            pai.setdefault(a, a)
+            pai.setdefault(b, b)
+            raiz_a, raiz_b = raiz(a), raiz(b)
+            if raiz_a != raiz_b:
+                pai[max(raiz_a, raiz_b)] = min(raiz_a, raiz_b)
+
+    grupos = {}
+    for item in pai:
+        grupos.setdefault(raiz(item), []).append(item)
+    return sorted((sorted(ids) for ids in grupos.values()), key=lambda ids: (-len(ids), ids[0]))
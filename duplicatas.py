@@ -0,0 +1,122 @@
+"""Índice de análises quase duplicadas pelo título e autor.
+
+Título e autor são normalizados (sem acentos, pontuação ou maiúsculas) e
+quebrados em trigramas de caracteres; duas análises tratam da mesma obra
+quando a similaridade de Jaccard dos trigramas passa de LIMIAR. Cada
+análise guarda uma assinatura MinHash de ASSINATURAS valores
+(analises_minhash), dividida em BANDAS faixas cujo hash vai para
+analises_assinaturas: só as análises que coincidem em alguma faixa são
+comparadas, primeiro pela fração de valores iguais das assinaturas e,
+perto do limiar, pelos trigramas.
+
+O algoritmo é o mesmo do BiblioTech, no pacote compartilhado pelos dois
+apps (compartilhado/semelhanca.py, instalado pelo requirements.txt); aqui
+ficam só as tabelas das análises. As funções recebem a conexão aberta por
+analises.py, para a análise e as chaves dela serem gravadas na mesma
+transação. Para listar os grupos de análises repetidas:
+
+    python duplicatas.py
+    python duplicatas.py --limiar 0.8
+"""
+import sys
+from semelhanca import LIMIAR, MAX_CANDIDATOS, agrupar, assinatura, chaves, confirmar, trigramas
+
+ESQUEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS analises_minhash (
+        analise_id INTEGER PRIMARY KEY,
+        assinatura BLOB NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS analises_assinaturas (
+        chave INTEGER NOT NULL,
+        analise_id INTEGER NOT NULL,
+        PRIMARY KEY (chave, analise_id)
+    ) WITHOUT ROWID
+    """,
+]
+
+
+def indexar(conn, analises):
+    """Grava assinatura e chaves de análises dadas como (id, titulo, autor), na transação de `conn`."""
+    for analise_id, titulo, autor in analises:
+        valores = assinatura(trigramas(titulo, autor))
+        conn.executemany(
+            "INSERT OR IGNORE INTO analises_assinaturas (chave, analise_id) VALUES (?, ?)",
+            [(chave, analise_id) for chave in chaves(valores)]
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO analises_minhash (analise_id, assinatura) VALUES (?, ?)",
+            (analise_id, valores.tobytes())
+        )
+
+
+def indexar_pendentes(conn):
+    """Indexa as análises gravadas antes do índice existir. Retorna quantas."""
+    pendentes = conn.execute(
+        """
+        SELECT id, titulo, autor FROM analises
+        WHERE id NOT IN (SELECT analise_id FROM analises_minhash)
+        """
+    ).fetchall()
+    indexar(conn, pendentes)
+    return len(pendentes)
+
+
+def parecidas(conn, titulo, autor, limite=5, limiar=LIMIAR):
+    """Análises já gravadas parecidas com o título e autor, como dicionários (id, titulo, autor, data, similaridade)."""
+    conjunto = trigramas(titulo, autor)
+    valores = assinatura(conjunto)
+    chaves_analise = chaves(valores)
+    candidatos = conn.execute(
+        f"""
+        SELECT a.id, a.titulo, a.autor, a.data_analise, m.assinatura FROM (
+            SELECT analise_id, COUNT(*) AS faixas FROM analises_assinaturas
+            WHERE chave IN ({', '.join('?' * len(chaves_analise))})
+            GROUP BY analise_id ORDER BY faixas DESC LIMIT ?
+        ) c
+        JOIN analises a ON a.id = c.analise_id
+        JOIN analises_minhash m ON m.analise_id = c.analise_id
+        """,
+        chaves_analise + [MAX_CANDIDATOS]
+    ).fetchall()
+    encontradas = []
+    for posicao, similaridade in confirmar(conjunto, valores, [(linha[1], linha[2], linha[4]) for linha in candidatos], limiar):
+        analise_id, titulo_analise, autor_analise, data, _ = candidatos[posicao]
+        encontradas.append({'id': analise_id, 'titulo': titulo_analise, 'autor': autor_analise,
+                            'data': data, 'similaridade': round(similaridade, 3)})
+    encontradas.sort(key=lambda analise: (-analise['similaridade'], analise['id']))
+    return encontradas[:limite]
+
+
+def grupos(conn, limiar=LIMIAR):
+    """Grupos de análises quase duplicadas, cada um uma lista de ids em ordem."""
+    textos = {analise_id: trigramas(titulo, autor)
+              for analise_id, titulo, autor in conn.execute("SELECT id, titulo, autor FROM analises")}
+    pares = set()
+    for (membros,) in conn.execute(
+        "SELECT GROUP_CONCAT(analise_id) FROM analises_assinaturas GROUP BY chave HAVING COUNT(*) > 1"
+    ):
+        membros = sorted(map(int, membros.split(',')))
+        pares.update((a, b) for i, a in enumerate(membros) for b in membros[i + 1:])
+
+    return agrupar(pares, textos, limiar)
+
+
+if __name__ == '__main__':
+    from contextlib import closing
+    from analises import conectar, preparar
+
+    preparar()
+    limiar = float(sys.argv[sys.argv.index('--limiar') + 1]) if '--limiar' in sys.argv else LIMIAR
+    with closing(conectar()) as conn:
+        encontrados = grupos(conn, limiar)
+        for ids in encontrados:
+            print(f'\n{len(ids)} análises:')
+            for analise_id in ids:
+                titulo, autor, data = conn.execute(
+                    'SELECT titulo, autor, data_analise FROM analises WHERE id = ?', (analise_id,)
+                ).fetchone()
+                print(f'  {analise_id:>6}  {data}  {titulo} — {autor}')
+    print(f'\n{len(encontrados)} grupos de análises repetidas')
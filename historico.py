@@ -0,0 +1,296 @@
+"""Cópia colunar das análises prévias em Parquet, particionada por mês.
+
+O app grava cada análise na tabela SQLite (ver analises.py). Em segundo
+plano, as análises novas são copiadas para arquivos Parquet em
+data/analises_parquet/mes=AAAA-MM/, um diretório por mês de `Data da
+Análise` (as sem data válida vão para mes=sem-data). As colunas são
+tipadas: páginas inteiras, valor em float, data como timestamp, e
+`Gênero` e `Público Alvo` como categorias (dicionário no Parquet).
+
+Cada cópia acrescenta um arquivo pequeno por mês tocado, com o intervalo
+de ids no nome (parte-<primeiro>-<ultimo>.parquet). Quando um mês passa de
+MAX_PARTES arquivos, eles são fundidos em um só. O último id copiado fica
+em _estado.db, cuja transação também serve de trava entre processos:
+arquivos além desse id (sobras de uma cópia interrompida) são ignorados
+e apagados, e arquivos cobertos por uma fusão são ignorados até serem
+removidos.
+
+agrupar() abre só os meses do intervalo pedido e lê só as colunas usadas;
+o Painel de Mercado o usa para os autores mais analisados, que as células
+de analises.py (mês × gênero × público) não guardam. As análises salvas
+depois da última cópia ainda não aparecem; exportar_pendentes() força a
+cópia.
+
+    python historico.py               # copia as pendentes
+    python historico.py --compactar   # e funde os arquivos de todos os meses
+"""
+import os
+import re
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from analises import COLUNAS, DATA_DIR, conectar, preparar
+
+PASTA_PARQUET = os.path.join(DATA_DIR, 'analises_parquet')
+ESTADO_PATH = os.path.join(PASTA_PARQUET, '_estado.db')
+
+# Arquivos pequenos que um mês acumula antes de ser compactado
+MAX_PARTES = 8
+
+# Partição das análises sem data válida
+SEM_DATA = 'sem-data'
+
+ESQUEMA = pa.schema([
+    ('id', pa.int64()),
+    ('titulo', pa.string()),
+    ('autor', pa.string()),
+    ('genero', pa.dictionary(pa.int32(), pa.string())),
+    ('publico_alvo', pa.dictionary(pa.int32(), pa.string())),
+    ('paginas_media', pa.int32()),
+    ('valor_mercado', pa.float64()),
+    ('concorrentes', pa.string()),
+    ('data_analise', pa.timestamp('s')),
+])
+
+_PARTE = re.compile(r'^parte-(\d+)-(\d+)\.parquet$')
+
+_lock = threading.Lock()
+_exportacao_agendada = False
+_exportacao_iniciada = False
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="historico")
+
+
+@contextmanager
+def _trava():
+    """Transação IMMEDIATE em _estado.db: uma cópia ou compactação por vez, entre processos."""
+    os.makedirs(PASTA_PARQUET, exist_ok=True)
+    with closing(sqlite3.connect(ESTADO_PATH, timeout=60.0, isolation_level=None)) as estado:
+        estado.execute("CREATE TABLE IF NOT EXISTS estado (ultimo_id INTEGER NOT NULL)")
+        estado.execute("BEGIN IMMEDIATE")
+        try:
+            if estado.execute("SELECT COUNT(*) FROM estado").fetchone()[0] == 0:
+                estado.execute("INSERT INTO estado (ultimo_id) VALUES (0)")
+            yield estado
+            estado.execute("COMMIT")
+        except BaseException:
+            estado.execute("ROLLBACK")
+            raise
+
+
+def _ultimo_exportado(estado=None):
+    """Último id de análise já copiado para o Parquet (0 se nenhum)."""
+    if estado is not None:
+        return estado.execute("SELECT ultimo_id FROM estado").fetchone()[0]
+    if not os.path.exists(ESTADO_PATH):
+        return 0
+    with closing(sqlite3.connect(ESTADO_PATH, timeout=60.0)) as conn:
+        try:
+            linha = conn.execute("SELECT ultimo_id FROM estado").fetchone()
+        except sqlite3.OperationalError:
+            return 0
+    return linha[0] if linha else 0
+
+
+def _pasta_mes(mes):
+    return os.path.join(PASTA_PARQUET, f'mes={mes}')
+
+
+def _meses():
+    """Meses que têm partição, como 'AAAA-MM' (ou SEM_DATA)."""
+    if not os.path.isdir(PASTA_PARQUET):
+        return []
+    return sorted(nome[4:] for nome in os.listdir(PASTA_PARQUET) if nome.startswith('mes='))
+
+
+def _partes(mes, ultimo_id):
+    """Arquivos válidos do mês: [(primeiro, ultimo, caminho)], sem os que outro arquivo cobre."""
+    pasta = _pasta_mes(mes)
+    try:
+        nomes = os.listdir(pasta)
+    except FileNotFoundError:
+        return [], []
+    partes = []
+    for nome in nomes:
+        encontrado = _PARTE.match(nome)
+        if encontrado:
+            partes.append((int(encontrado.group(1)), int(encontrado.group(2)), os.path.join(pasta, nome)))
+
+    validas, descartadas = [], []
+    for primeiro, ultimo, caminho in partes:
+        coberta = any(
+            p <= primeiro and ultimo <= u and (p, u) != (primeiro, ultimo)
+            for p, u, _ in partes
+        )
+        if primeiro > ultimo_id or coberta:
+            descartadas.append(caminho)
+        else:
+            validas.append((primeiro, ultimo, caminho))
+    return sorted(validas), descartadas
+
+
+def _tipar(df):
+    """Converte as linhas da tabela SQLite para o ESQUEMA do Parquet."""
+    df = df.copy()
+    df['paginas_media'] = pd.to_numeric(df['paginas_media'], errors='coerce').round().astype('Int32')
+    df['valor_mercado'] = pd.to_numeric(df['valor_mercado'], errors='coerce').astype('float64')
+    df['data_analise'] = pd.to_datetime(df['data_analise'], errors='coerce', format='mixed').dt.floor('s')
+    for coluna in ('genero', 'publico_alvo'):
+        df[coluna] = df[coluna].astype('category')
+    return df
+
+
+def _gravar(tabela, caminho):
+    """Grava a tabela num arquivo temporário e o move para o nome final de uma vez."""
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    pq.write_table(tabela, temporario, compression='zstd')
+    os.replace(temporario, caminho)
+
+
+def exportar_pendentes():
+    """Copia para o Parquet as análises salvas depois da última cópia. Retorna quantas."""
+    preparar()
+    with _trava() as estado:
+        ultimo_id = _ultimo_exportado(estado)
+        # Sobras de uma cópia ou compactação interrompida
+        for mes in _meses():
+            for caminho in _partes(mes, ultimo_id)[1]:
+                os.remove(caminho)
+
+        with closing(conectar()) as conn:
+            df = pd.read_sql_query(
+                f"SELECT id, {', '.join(COLUNAS.values())} FROM analises WHERE id > ? ORDER BY id",
+                conn, params=(ultimo_id,)
+            )
+        if df.empty:
+            return 0
+
+        df = _tipar(df)
+        meses = df['data_analise'].dt.strftime('%Y-%m').fillna(SEM_DATA)
+        for mes, grupo in df.groupby(meses, sort=False):
+            os.makedirs(_pasta_mes(mes), exist_ok=True)
+            _gravar(
+                pa.Table.from_pandas(grupo, schema=ESQUEMA, preserve_index=False),
+                os.path.join(_pasta_mes(mes), f"parte-{grupo['id'].iloc[0]:010d}-{grupo['id'].iloc[-1]:010d}.parquet")
+            )
+        estado.execute("UPDATE estado SET ultimo_id = ?", (int(df['id'].iloc[-1]),))
+        tocados = set(meses)
+
+    for mes in tocados:
+        compactar(mes, minimo=MAX_PARTES + 1)
+    return len(df)
+
+
+def compactar(mes, minimo=2):
+    """Funde os arquivos do mês em um só se ele tiver pelo menos `minimo` arquivos."""
+    with _trava() as estado:
+        partes, descartadas = _partes(mes, _ultimo_exportado(estado))
+        if len(partes) >= minimo:
+            tabela = pa.concat_tables(pq.read_table(caminho, schema=ESQUEMA) for _, _, caminho in partes)
+            tabela = tabela.sort_by('id').unify_dictionaries().combine_chunks()
+            _gravar(
+                tabela,
+                os.path.join(_pasta_mes(mes), f"parte-{partes[0][0]:010d}-{partes[-1][1]:010d}.parquet")
+            )
+            descartadas += [caminho for _, _, caminho in partes]
+        for caminho in descartadas:
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+
+
+def _mes_de(data):
+    return pd.Timestamp(data).strftime('%Y-%m')
+
+
+def _arquivos(inicio=None, fim=None):
+    """Arquivos dos meses entre inicio e fim (inclusive); sem intervalo, todos."""
+    ultimo_id = _ultimo_exportado()
+    arquivos = []
+    for mes in _meses():
+        if mes == SEM_DATA:
+            if inicio is not None or fim is not None:
+                continue
+        elif (inicio is not None and mes < _mes_de(inicio)) or (fim is not None and mes > _mes_de(fim)):
+            continue
+        arquivos += [caminho for _, _, caminho in _partes(mes, ultimo_id)[0]]
+    return arquivos
+
+
+def _ler(colunas, inicio, fim, filtro):
+    """Lê as colunas pedidas dos meses do intervalo como uma tabela Arrow."""
+    condicao = filtro
+    if inicio is not None:
+        limite = pc.field('data_analise') >= pa.scalar(pd.Timestamp(inicio), type=pa.timestamp('s'))
+        condicao = limite if condicao is None else condicao & limite
+    if fim is not None:
+        limite = pc.field('data_analise') <= pa.scalar(pd.Timestamp(fim), type=pa.timestamp('s'))
+        condicao = limite if condicao is None else condicao & limite
+
+    for tentativa in range(3):
+        try:
+            conjunto = ds.dataset(_arquivos(inicio, fim), schema=ESQUEMA, format='parquet')
+            # Cada arquivo tem o próprio dicionário de categorias
+            return conjunto.to_table(columns=colunas, filter=condicao).unify_dictionaries()
+        except FileNotFoundError:
+            # Uma compactação removeu um arquivo entre a listagem e a leitura
+            if tentativa == 2:
+                raise
+
+
+def agrupar(por, agregacoes, inicio=None, fim=None, filtro=None):
+    """Agrega as análises entre inicio e fim (datas ou textos) por colunas do ESQUEMA.
+
+    `agregacoes` segue o Table.group_by do pyarrow, ex.:
+    `agrupar(['genero'], [('valor_mercado', 'mean'), ('id', 'count')])`, e
+    `filtro` é uma expressão do pyarrow, ex.: `pc.field('genero') == 'Romance'`.
+    """
+    colunas = list(dict.fromkeys(list(por) + [coluna for coluna, _ in agregacoes]))
+    tabela = _ler(colunas, inicio, fim, filtro)
+    return tabela.group_by(por).aggregate(agregacoes).to_pandas()
+
+
+def _exportar_em_segundo_plano():
+    global _exportacao_agendada
+    with _lock:
+        _exportacao_agendada = False
+    try:
+        exportar_pendentes()
+    except Exception:
+        # As análises continuam no SQLite; a próxima cópia as leva
+        pass
+
+
+def agendar_exportacao():
+    """Agenda a cópia das análises novas; pedidos seguidos são atendidos de uma vez."""
+    global _exportacao_agendada
+    with _lock:
+        if _exportacao_agendada:
+            return
+        _exportacao_agendada = True
+    _executor.submit(_exportar_em_segundo_plano)
+
+
+def iniciar_exportacao():
+    """Agenda, uma vez por processo, a cópia das análises ainda não exportadas."""
+    global _exportacao_iniciada
+    with _lock:
+        if _exportacao_iniciada:
+            return
+        _exportacao_iniciada = True
+    agendar_exportacao()
+
+
+if __name__ == "__main__":
+    print(f"{exportar_pendentes()} análises copiadas para {PASTA_PARQUET}")
+    if "--compactar" in sys.argv:
+        for mes in _meses():
+            compactar(mes)
+        print(f"{len(_meses())} meses compactados")
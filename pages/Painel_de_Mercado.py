@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import streamlit as st
+from analises import PAGINAS_POR_FAIXA, carregar_agregados, carregar_histograma_paginas
+from historico import agrupar, iniciar_exportacao
+
+# Autores listados no ranking lido do histórico em Parquet
+AUTORES_NO_RANKING = 15
+
+st.set_page_config(
+    page_icon='📈', page_title='Painel de Mercado', layout='wide')
+st.title('Panorama do Mercado')
+
+# Células mês × gênero × público mantidas a cada análise salva (ver analises.py):
+# o custo desta página depende do número de células, não do de análises
+agregados = carregar_agregados()
+histograma = carregar_histograma_paginas()
+# A página pode ser aberta antes da principal, que também inicia a cópia
+iniciar_exportacao()
+
+if agregados.empty:
+    st.info('Nenhuma análise salva ainda.')
+    st.stop()
+
+SOMAS = ['quantidade', 'quantidade_valor', 'soma_valor', 'soma_quadrados_valor',
+         'quantidade_paginas', 'soma_paginas', 'soma_quadrados_paginas']
+
+
+def resumir(celulas, por):
+    """Soma as células por `por` e calcula médias e desvios padrão a partir das somas."""
+    grupos = celulas.groupby(por, as_index=False)[SOMAS].sum() if por else celulas[SOMAS].sum().to_frame().T
+    for nome, quantidade, soma, quadrados in [
+        ('valor', 'quantidade_valor', 'soma_valor', 'soma_quadrados_valor'),
+        ('paginas', 'quantidade_paginas', 'soma_paginas', 'soma_quadrados_paginas'),
+    ]:
+        n = grupos[quantidade].astype(float)
+        grupos[f'media_{nome}'] = (grupos[soma] / n).where(n > 0)
+        # Variância amostral: (Σx² - (Σx)²/n) / (n - 1)
+        variancia = ((grupos[quadrados] - grupos[soma] ** 2 / n) / (n - 1)).where(n > 1)
+        grupos[f'desvio_{nome}'] = np.sqrt(variancia.clip(lower=0))
+    return grupos
+
+
+# Filters #
+
+meses = sorted(m for m in agregados['mes'].unique() if m != 'sem-data')
+generos = sorted(agregados['genero'].unique())
+publicos = sorted(agregados['publico_alvo'].unique())
+
+with st.sidebar:
+    generosEscolhidos = st.multiselect('Gênero', generos, default=generos)
+    publicosEscolhidos = st.multiselect('Público Alvo', publicos, default=publicos)
+    if len(meses) > 1:
+        inicio, fim = st.select_slider('Período', options=meses, value=(meses[0], meses[-1]))
+    else:
+        inicio, fim = (meses[0], meses[0]) if meses else (None, None)
+
+
+def filtrar(tabela):
+    filtro = tabela['genero'].isin(generosEscolhidos) & tabela['publico_alvo'].isin(publicosEscolhidos)
+    if meses and (inicio, fim) != (meses[0], meses[-1]):
+        # Análises sem data só entram quando o período inteiro está selecionado
+        filtro &= tabela['mes'].between(inicio, fim)
+    return tabela[filtro]
+
+
+celulas = filtrar(agregados)
+if celulas.empty:
+    st.warning('Nenhuma análise com esses filtros.')
+    st.stop()
+
+# Totals #
+
+total = resumir(celulas, []).iloc[0]
+col1, col2, col3 = st.columns(3)
+col1.metric('Análises', f"{int(total['quantidade']):,}".replace(',', '.'))
+col2.metric('Valor Estimado Médio', '-' if np.isnan(total['media_valor']) else f"R$ {total['media_valor']:,.2f}")
+col3.metric('Páginas em Média', '-' if np.isnan(total['media_paginas']) else f"{total['media_paginas']:.0f}")
+
+# Gênero x Público Alvo #
+
+st.subheader('Por Gênero e Público Alvo')
+porCelula = resumir(celulas, ['genero', 'publico_alvo'])
+st.dataframe(
+    porCelula[['genero', 'publico_alvo', 'quantidade', 'media_valor', 'desvio_valor', 'media_paginas', 'desvio_paginas']]
+    .rename(columns={
+        'genero': 'Gênero', 'publico_alvo': 'Público Alvo', 'quantidade': 'Análises',
+        'media_valor': 'Valor Médio', 'desvio_valor': 'Desvio do Valor',
+        'media_paginas': 'Páginas em Média', 'desvio_paginas': 'Desvio das Páginas',
+    })
+    .round(2),
+    hide_index=True)
+
+# Over time #
+
+st.subheader('Ao Longo do Tempo')
+porMes = resumir(celulas[celulas['mes'] != 'sem-data'], ['mes', 'genero'])
+if not porMes.empty:
+    col1, col2 = st.columns(2)
+    col1.markdown('**Análises por mês**')
+    col1.line_chart(porMes.pivot(index='mes', columns='genero', values='quantidade').fillna(0))
+    col2.markdown('**Valor estimado médio por mês**')
+    col2.line_chart(porMes.pivot(index='mes', columns='genero', values='media_valor'))
+
+# Page count distribution #
+
+st.subheader('Distribuição do Número de Páginas')
+faixas = filtrar(histograma).groupby('faixa')['quantidade'].sum()
+if not faixas.empty:
+    faixas.index = faixas.index * PAGINAS_POR_FAIXA + 1
+    st.bar_chart(faixas.rename('Análises'), x_label=f'Páginas (faixas de {PAGINAS_POR_FAIXA}, pelo início)')
+
+# Most analysed authors #
+
+st.subheader('Autores Mais Analisados')
+st.caption('Lido da cópia em Parquet (ver historico.py): análises salvas há pouco entram na próxima cópia.')
+
+
+def filtro_historico():
+    """Os filtros de gênero e público como expressão do pyarrow (no Parquet, 'Não informado' é nulo)."""
+    condicao = None
+    for coluna, escolhidos, todos in [('genero', generosEscolhidos, generos), ('publico_alvo', publicosEscolhidos, publicos)]:
+        if set(escolhidos) == set(todos):
+            continue
+        valores = pa.array([valor for valor in escolhidos if valor != 'Não informado'], type=pa.string())
+        parte = pc.field(coluna).isin(valores)
+        if 'Não informado' in escolhidos:
+            parte = parte | pc.field(coluna).is_null()
+        condicao = parte if condicao is None else condicao & parte
+    return condicao
+
+
+periodo = {}
+if meses and (inicio, fim) != (meses[0], meses[-1]):
+    # Só as partições dos meses escolhidos são lidas; sem período, as sem data também entram
+    periodo = {'inicio': f'{inicio}-01', 'fim': pd.Period(fim, 'M').end_time.floor('s')}
+autores = agrupar(['autor'], [('id', 'count'), ('valor_mercado', 'mean')], filtro=filtro_historico(), **periodo)
+autores = autores.dropna(subset=['autor']).sort_values(['id_count', 'autor'], ascending=[False, True])
+if autores.empty:
+    st.info('Nenhuma análise copiada para o histórico com esses filtros.')
+else:
+    st.dataframe(
+        autores.head(AUTORES_NO_RANKING)
+        .rename(columns={'autor': 'Autor', 'id_count': 'Análises', 'valor_mercado_mean': 'Valor Médio'})
+        .round(2),
+        hide_index=True)
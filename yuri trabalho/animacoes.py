@@ -0,0 +1,149 @@
+"""Carregamento das animações Lottie sem esperar pela rede.
+
+As páginas sempre recebem a animação da memória, do cache em disco ou da
+cópia embutida no projeto (assets/lottie). A busca no lottiefiles.com roda
+em segundo plano, em paralelo e com tempo limite, e revalida o cache com
+ETag; o resultado passa a valer a partir do próximo rerun.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from metricas import cronometrado
+
+PASTA_APP = os.path.dirname(os.path.abspath(__file__))
+
+# Animações usadas pelas páginas: nome -> URL de origem
+ANIMACOES = {
+    "livro": "https://assets5.lottiefiles.com/packages/lf20_1a8dx7zj.json",
+    "leitura": "https://assets7.lottiefiles.com/packages/lf20_qmfs6c3i.json",
+    "biblioteca": "https://assets10.lottiefiles.com/packages/lf20_ystsffqy.json",
+}
+
+# Cache em disco das animações baixadas
+PASTA_CACHE = os.path.join(PASTA_APP, 'cache', 'lottie')
+
+# Cópias embutidas, usadas quando não há cache (primeira execução ou offline)
+PASTA_EMBUTIDAS = os.path.join(PASTA_APP, 'assets', 'lottie')
+
+# Tempo limite das requisições: (conexão, leitura) em segundos
+TEMPO_LIMITE = (2, 5)
+
+# Idade a partir da qual o cache é revalidado com o servidor
+VALIDADE_CACHE = 24 * 60 * 60  # 24 horas
+
+_animacoes = {}  # nome -> JSON já carregado
+_lock = threading.Lock()
+_atualizacao_iniciada = False
+
+
+def _caminho_cache(nome):
+    return os.path.join(PASTA_CACHE, f"{nome}.json")
+
+
+def _caminho_etag(nome):
+    return os.path.join(PASTA_CACHE, f"{nome}.etag")
+
+
+def _ler_json(caminho):
+    try:
+        with open(caminho, encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+
+def _gravar_atomico(caminho, conteudo):
+    """Grava o arquivo por inteiro ou não grava (nunca deixa meio arquivo no cache)."""
+    temporario = f"{caminho}.{threading.get_ident()}.tmp"
+    with open(temporario, "wb") as arquivo:
+        arquivo.write(conteudo)
+    os.replace(temporario, caminho)
+
+
+@cronometrado
+def _atualizar(nome, url):
+    """Baixa ou revalida uma animação e atualiza o cache em disco e em memória."""
+    cabecalhos = {}
+    try:
+        with open(_caminho_etag(nome), encoding="utf-8") as arquivo:
+            cabecalhos["If-None-Match"] = arquivo.read().strip()
+    except OSError:
+        pass
+    # Sem o JSON em cache o ETag não serve para nada
+    if not os.path.exists(_caminho_cache(nome)):
+        cabecalhos.pop("If-None-Match", None)
+
+    try:
+        resposta = requests.get(url, headers=cabecalhos, timeout=TEMPO_LIMITE)
+    except requests.RequestException:
+        return
+
+    if resposta.status_code == 304:
+        # Continua válido: só renova a data para adiar a próxima revalidação
+        os.utime(_caminho_cache(nome))
+        return
+    if resposta.status_code != 200:
+        return
+    try:
+        animacao = resposta.json()
+    except ValueError:
+        return
+
+    _gravar_atomico(_caminho_cache(nome), resposta.content)
+    etag = resposta.headers.get("ETag")
+    if etag:
+        _gravar_atomico(_caminho_etag(nome), etag.encode("utf-8"))
+    with _lock:
+        _animacoes[nome] = animacao
+
+
+def _precisa_atualizar(nome):
+    try:
+        idade = time.time() - os.path.getmtime(_caminho_cache(nome))
+    except OSError:
+        return True
+    return idade > VALIDADE_CACHE
+
+
+def iniciar_atualizacao():
+    """Dispara, uma vez por processo, a atualização em segundo plano das animações vencidas."""
+    global _atualizacao_iniciada
+    with _lock:
+        if _atualizacao_iniciada:
+            return
+        _atualizacao_iniciada = True
+
+    pendentes = {nome: url for nome, url in ANIMACOES.items() if _precisa_atualizar(nome)}
+    if not pendentes:
+        return
+    os.makedirs(PASTA_CACHE, exist_ok=True)
+
+    # O executor é encerrado sem esperar: as threads terminam sozinhas
+    executor = ThreadPoolExecutor(max_workers=len(pendentes), thread_name_prefix="lottie")
+    for nome, url in pendentes.items():
+        executor.submit(_atualizar, nome, url)
+    executor.shutdown(wait=False)
+
+
+@cronometrado
+def carregar_animacao(nome):
+    """Retorna o JSON da animação sem acessar a rede (memória, cache em disco ou cópia embutida)."""
+    iniciar_atualizacao()
+
+    with _lock:
+        animacao = _animacoes.get(nome)
+    if animacao is not None:
+        return animacao
+
+    animacao = _ler_json(_caminho_cache(nome))
+    if animacao is None:
+        animacao = _ler_json(os.path.join(PASTA_EMBUTIDAS, f"{nome}.json"))
+
+    if animacao is not None:
+        with _lock:
+            # Uma versão baixada nesse meio-tempo tem prioridade
+            animacao = _animacoes.setdefault(nome, animacao)
+    return animacao
@@ -1,11 +1,21 @@
 import streamlit as st
-import sqlite3
-import pandas as pd
 from datetime import datetime
-import random
-import requests
 from streamlit_option_menu import option_menu
 from streamlit_lottie import st_lottie
+from streamlit_searchbox import st_searchbox
+from animacoes import carregar_animacao
+from tema import tag_tema
+from grade import renderizar_grade, renderizar_estrelas
+from capas import url_capa
+from importar import importar_catalogo
+from comentarios import renderizar_comentarios, reiniciar_comentarios
+from similares import iniciar_atualizacao as iniciar_similares
+from duplicatas import possiveis_duplicatas, iniciar_indexacao as iniciar_duplicatas
+from sugestoes import sugerir, iniciar_indice
+from metricas import iniciar_rerun, finalizar_rerun, trecho
+from depuracao import depuracao_ativa, renderizar_painel
+from banco import inicializar_banco, agendar_recalculo_popularidade, ORDENACOES_LIVROS
+from repositorio import obter_repositorio
 
 # Configuração da página
 st.set_page_config(
@@ -15,6 +25,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Começa a medir o tempo deste rerun (ver metricas.py)
+iniciar_rerun()
+
 # Cores e tema
 PRIMARY_COLOR = "#7c3aed"  # Roxo vibrante
 SECONDARY_COLOR = "#5b21b6"  # Roxo mais escuro
@@ -24,852 +37,34 @@ CARD_BG_COLOR = "#ffffff"  # Branco
 TEXT_COLOR = "#1e293b"  # Cinza escuro
 SIDEBAR_COLOR = "#f1f5f9"  # Cinza muito claro
 
-# Função para carregar animações Lottie
-def load_lottieurl(url):
-    try:
-        r = requests.get(url)
-        if r.status_code != 200:
-            return None
-        return r.json()
-    except:
-        return None
-
-# Carregar animações
-lottie_book = load_lottieurl("https://assets5.lottiefiles.com/packages/lf20_1a8dx7zj.json")
-lottie_reading = load_lottieurl("https://assets7.lottiefiles.com/packages/lf20_qmfs6c3i.json")
-lottie_library = load_lottieurl("https://assets10.lottiefiles.com/packages/lf20_ystsffqy.json")
-
-# Aplicar CSS personalizado para melhorar a aparência
-st.markdown(f"""
-<style>
-    /* Estilos gerais */
-    .main {{
-        background-color: {BG_COLOR};
-        color: {TEXT_COLOR};
-        font-family: 'Poppins', sans-serif;
-    }}
-    
-    .stApp {{
-        max-width: 1400px;
-        margin: 0 auto;
-    }}
-    
-    h1, h2, h3, h4, h5 {{
-        font-family: 'Poppins', sans-serif;
-        font-weight: 600;
-        color: {PRIMARY_COLOR};
-    }}
-    
-    /* Sidebar */
-    section[data-testid="stSidebar"] {{
-        background-color: {SIDEBAR_COLOR};
-        border-right: 1px solid #e2e8f0;
-    }}
-    
-    /* Cards de livros */
-    .book-card {{
-        background-color: {CARD_BG_COLOR};
-        border-radius: 16px;
-        padding: 20px;
-        margin-bottom: 25px;
-        box-shadow: 0 10px 25px rgba(0,0,0,0.03);
-        transition: all 0.4s ease;
-        border: 1px solid #f1f5f9;
-        display: flex;
-        flex-direction: column;
-        height: 100%;
-        overflow: hidden;
-        position: relative;
-    }}
-    
-    .book-card:hover {{
-        transform: translateY(-8px);
-        box-shadow: 0 20px 30px rgba(0,0,0,0.08);
-        border-color: {PRIMARY_COLOR}40;
-    }}
-    
-    .book-cover {{
-        width: 100%;
-        height: 240px;
-        object-fit: cover;
-        border-radius: 10px;
-        margin-bottom: 15px;
-        box-shadow: 0 5px 15px rgba(0,0,0,0.1);
-        transition: transform 0.3s ease;
-    }}
-    
-    .book-card:hover .book-cover {{
-        transform: scale(1.03);
-    }}
-    
-    .book-title {{
-        font-size: 1.4rem;
-        font-weight: bold;
-        margin-bottom: 8px;
-        color: {PRIMARY_COLOR};
-        line-height: 1.3;
-    }}
-    
-    .book-author {{
-        font-style: italic;
-        color: #64748b;
-        margin-bottom: 10px;
-        font-size: 1.1rem;
-    }}
-    
-    .book-meta {{
-        display: flex;
-        justify-content: space-between;
-        margin-bottom: 10px;
-        color: #64748b;
-        font-size: 0.9rem;
-    }}
-    
-    .book-rating {{
-        font-weight: bold;
-        color: #f59e0b;
-        font-size: 1.2rem;
-        margin-top: 10px;
-    }}
-    
-    .book-description {{
-        color: #64748b;
-        font-size: 0.95rem;
-        margin-top: 10px;
-        flex-grow: 1;
-    }}
-    
-    .book-button {{
-        background: linear-gradient(135deg, {PRIMARY_COLOR}, {SECONDARY_COLOR});
-        color: white;
-        border: none;
-        border-radius: 8px;
-        padding: 10px 15px;
-        font-weight: 600;
-        cursor: pointer;
-        transition: all 0.3s;
-        width: 100%;
-        margin-top: 15px;
-        text-align: center;
-        box-shadow: 0 4px 6px rgba(124, 58, 237, 0.2);
-    }}
-    
-    .book-button:hover {{
-        box-shadow: 0 6px 12px rgba(124, 58, 237, 0.3);
-        transform: translateY(-2px);
-    }}
-    
-    /* Detalhes do livro */
-    .book-detail-container {{
-        background-color: {CARD_BG_COLOR};
-        border-radius: 20px;
-        padding: 30px;
-        box-shadow: 0 10px 30px rgba(0,0,0,0.05);
-        margin-top: 20px;
-        border: 1px solid #f1f5f9;
-    }}
-    
-    .book-detail-cover {{
-        width: 100%;
-        max-height: 450px;
-        object-fit: cover;
-        border-radius: 12px;
-        box-shadow: 0 15px 30px rgba(0,0,0,0.1);
-    }}
-    
-    .book-detail-title {{
-        font-size: 2.5rem;
-        font-weight: 700;
-        color: {PRIMARY_COLOR};
-        margin-bottom: 10px;
-        line-height: 1.2;
-    }}
-    
-    .book-detail-author {{
-        font-size: 1.5rem;
-        font-style: italic;
-        color: #64748b;
-        margin-bottom: 20px;
-    }}
-    
-    .book-detail-meta {{
-        display: flex;
-        gap: 20px;
-        margin-bottom: 20px;
-        color: #64748b;
-    }}
-    
-    .book-detail-rating {{
-        font-size: 1.5rem;
-        color: #f59e0b;
-        margin-bottom: 20px;
-    }}
-    
-    .book-detail-synopsis {{
-        font-size: 1.1rem;
-        line-height: 1.8;
-        color: #334155;
-        margin-bottom: 30px;
-        background-color: #f8fafc;
-        padding: 25px;
-        border-radius: 12px;
-        border-left: 5px solid {PRIMARY_COLOR};
-    }}
-    
-    /* Comentários */
-    .comment-section {{
-        margin-top: 40px;
-    }}
-    
-    .comment-box {{
-        background-color: #f8fafc;
-        border-radius: 12px;
-        padding: 20px;
-        margin-bottom: 20px;
-        border-left: 4px solid {ACCENT_COLOR};
-        transition: transform 0.2s ease;
-    }}
-    
-    .comment-box:hover {{
-        transform: translateX(5px);
-    }}
-    
-    .comment-author {{
-        font-weight: bold;
-        color: {PRIMARY_COLOR};
-        font-size: 1.1rem;
-    }}
-    
-    .comment-date {{
-        font-size: 0.85rem;
-        color: #94a3b8;
-        margin-bottom: 10px;
-    }}
-    
-    .comment-content {{
-        font-size: 1rem;
-        line-height: 1.6;
-        color: #334155;
-    }}
-    
-    /* Formulários */
-    .form-container {{
-        background-color: {CARD_BG_COLOR};
-        border-radius: 16px;
-        padding: 30px;
-        box-shadow: 0 5px 15px rgba(0,0,0,0.03);
-        margin-bottom: 25px;
-        border: 1px solid #f1f5f9;
-    }}
-    
-    .form-title {{
-        font-size: 1.5rem;
-        color: {PRIMARY_COLOR};
-        margin-bottom: 20px;
-        border-bottom: 2px solid {PRIMARY_COLOR}40;
-        padding-bottom: 10px;
-    }}
-    
-    /* Botões */
-    .stButton > button {{
-        background: linear-gradient(135deg, {PRIMARY_COLOR}, {SECONDARY_COLOR});
-        color: white !important;
-        border: none !important;
-        border-radius: 8px !important;
-        font-weight: 600 !important;
-        transition: all 0.3s ease !important;
-        padding: 0.5rem 1rem !important;
-        box-shadow: 0 4px 6px rgba(124, 58, 237, 0.2) !important;
-    }}
-    
-    .stButton > button:hover {{
-        transform: translateY(-2px) !important;
-        box-shadow: 0 6px 12px rgba(124, 58, 237, 0.3) !important;
-    }}
-    
-    .stButton > button:active {{
-        transform: translateY(0) !important;
-    }}
-    
-    /* Destaque para livros populares */
-    .featured-section {{
-        margin-bottom: 40px;
-    }}
-    
-    .featured-title {{
-        font-size: 1.8rem;
-        color: {PRIMARY_COLOR};
-        margin-bottom: 25px;
-        border-bottom: 3px solid {PRIMARY_COLOR};
-        padding-bottom: 10px;
-        display: inline-block;
-    }}
-    
-    /* Barra de navegação */
-    .nav-container {{
-        margin-bottom: 25px;
-    }}
-    
-    /* Badges */
-    .badge {{
-        background: linear-gradient(135deg, {PRIMARY_COLOR}, {ACCENT_COLOR});
-        color: white;
-        padding: 5px 12px;
-        border-radius: 20px;
-        font-size: 0.8rem;
-        font-weight: 600;
-        margin-right: 5px;
-        box-shadow: 0 2px 5px rgba(124, 58, 237, 0.2);
-    }}
-    
-    /* Banner */
-    .banner {{
-        background: linear-gradient(135deg, {PRIMARY_COLOR}, {SECONDARY_COLOR});
-        border-radius: 20px;
-        padding: 40px;
-        color: white;
-        margin-bottom: 40px;
-        box-shadow: 0 10px 30px rgba(124, 58, 237, 0.3);
-        position: relative;
-        overflow: hidden;
-    }}
-    
-    .banner::before {{
-        content: "";
-        position: absolute;
-        top: 0;
-        left: 0;
-        width: 100%;
-        height: 100%;
-        background: url('https://www.transparenttextures.com/patterns/cubes.png');
-        opacity: 0.1;
-    }}
-    
-    .banner h1 {{
-        color: white;
-        font-size: 2.5rem;
-        margin-bottom: 15px;
-        font-weight: 700;
-    }}
-    
-    .banner p {{
-        font-size: 1.2rem;
-        margin-bottom: 25px;
-        opacity: 0.9;
-    }}
-    
-    .banner-button {{
-        background-color: white;
-        color: {PRIMARY_COLOR};
-        border: none;
-        padding: 10px 20px;
-        border-radius: 8px;
-        font-weight: 600;
-        cursor: pointer;
-        transition: all 0.3s;
-        display: inline-block;
-        margin-right: 15px;
-        box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-    }}
-    
-    .banner-button:hover {{
-        transform: translateY(-3px);
-        box-shadow: 0 6px 12px rgba(0,0,0,0.15);
-    }}
-    
-    .banner-button-outline {{
-        background-color: transparent;
-        color: white;
-        border: 2px solid white;
-        padding: 10px 20px;
-        border-radius: 8px;
-        font-weight: 600;
-        cursor: pointer;
-        transition: all 0.3s;
-        display: inline-block;
-    }}
-    
-    .banner-button-outline:hover {{
-        background-color: white;
-        color: {PRIMARY_COLOR};
-        transform: translateY(-3px);
-        box-shadow: 0 6px 12px rgba(0,0,0,0.15);
-    }}
-    
-    /* Stats cards */
-    .stats-card {{
-        background-color: white;
-        border-radius: 16px;
-        padding: 25px;
-        text-align: center;
-        box-shadow: 0 5px 15px rgba(0,0,0,0.05);
-        transition: transform 0.3s ease;
-        border: 1px solid #f1f5f9;
-    }}
-    
-    .stats-card:hover {{
-        transform: translateY(-5px);
-        box-shadow: 0 10px 25px rgba(0,0,0,0.1);
-        border-color: {PRIMARY_COLOR}40;
-    }}
-    
-    .stats-icon {{
-        font-size: 2rem;
-        color: {PRIMARY_COLOR};
-        margin-bottom: 15px;
-    }}
-    
-    .stats-number {{
-        font-size: 2.5rem;
-        font-weight: 700;
-        color: {PRIMARY_COLOR};
-        margin-bottom: 5px;
-        background: linear-gradient(135deg, {PRIMARY_COLOR}, {ACCENT_COLOR});
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-    }}
-    
-    .stats-label {{
-        color: #64748b;
-        font-size: 1rem;
-    }}
-    
-    /* Animações */
-    @keyframes fadeIn {{
-        from {{ opacity: 0; transform: translateY(10px); }}
-        to {{ opacity: 1; transform: translateY(0); }}
-    }}
-    
-    .animate-fade-in {{
-        animation: fadeIn 0.5s ease-out forwards;
-    }}
-    
-    /* Delay para animações em sequência */
-    .delay-1 {{ animation-delay: 0.1s; }}
-    .delay-2 {{ animation-delay: 0.2s; }}
-    .delay-3 {{ animation-delay: 0.3s; }}
-    .delay-4 {{ animation-delay: 0.4s; }}
-    .delay-5 {{ animation-delay: 0.5s; }}
-    
-    /* Responsividade */
-    @media (max-width: 768px) {{
-        .book-card {{
-            padding: 15px;
-        }}
-        
-        .book-title {{
-            font-size: 1.2rem;
-        }}
-        
-        .book-cover {{
-            height: 180px;
-        }}
-        
-        .banner {{
-            padding: 25px;
-        }}
-        
-        .banner h1 {{
-            font-size: 1.8rem;
-        }}
-    }}
-    
-    /* Estilização de inputs */
-    .stTextInput > div > div > input {{
-        border-radius: 8px !important;
-        border: 1px solid #e2e8f0 !important;
-        padding: 10px 15px !important;
-        transition: all 0.3s ease !important;
-    }}
-    
-    .stTextInput > div > div > input:focus {{
-        border-color: {PRIMARY_COLOR} !important;
-        box-shadow: 0 0 0 2px {PRIMARY_COLOR}40 !important;
-    }}
-    
-    .stTextArea > div > div > textarea {{
-        border-radius: 8px !important;
-        border: 1px solid #e2e8f0 !important;
-        padding: 10px 15px !important;
-    }}
-    
-    .stTextArea > div > div > textarea:focus {{
-        border-color: {PRIMARY_COLOR} !important;
-        box-shadow: 0 0 0 2px {PRIMARY_COLOR}40 !important;
-    }}
-    
-    .stSelectbox > div > div > div {{
-        border-radius: 8px !important;
-        border: 1px solid #e2e8f0 !important;
-    }}
-    
-    .stSelectbox > div > div > div:focus {{
-        border-color: {PRIMARY_COLOR} !important;
-        box-shadow: 0 0 0 2px {PRIMARY_COLOR}40 !important;
-    }}
-    
-    /* Footer */
-    .footer {{
-        text-align: center;
-        padding: 20px;
-        color: #64748b;
-        margin-top: 50px;
-        border-top: 1px solid #e2e8f0;
-    }}
-    
-    /* Glassmorphism effect */
-    .glass-card {{
-        background: rgba(255, 255, 255, 0.7);
-        backdrop-filter: blur(10px);
-        -webkit-backdrop-filter: blur(10px);
-        border: 1px solid rgba(255, 255, 255, 0.2);
-    }}
-</style>
-
-<!-- Importar fontes -->
-<link href="https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;500;600;700&display=swap" rel="stylesheet">
-<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0-beta3/css/all.min.css">
-""", unsafe_allow_html=True)
-
-# Inicialização do banco de dados
-def init_db():
-    """Inicializa o banco de dados SQLite com as tabelas necessárias."""
-    conn = sqlite3.connect('biblioteca.db')
-    c = conn.cursor()
-    
-    # Criar tabela de livros se não existir
-    c.execute('''
-    CREATE TABLE IF NOT EXISTS livros (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        titulo TEXT NOT NULL,
-        autor TEXT NOT NULL,
-        ano_publicacao INTEGER,
-        genero TEXT,
-        sinopse TEXT,
-        nota REAL,
-        data_adicao TEXT,
-        capa_url TEXT
-    )
-    ''')
-    
-    # Criar tabela de comentários se não existir
-    c.execute('''
-    CREATE TABLE IF NOT EXISTS comentarios (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        livro_id INTEGER,
-        nome_usuario TEXT,
-        comentario TEXT,
-        data_comentario TEXT,
-        FOREIGN KEY (livro_id) REFERENCES livros (id)
-    )
-    ''')
-    
-    conn.commit()
-    conn.close()
-
-# Função para adicionar livros populares pré-definidos
-def adicionar_livros_populares():
-    """Adiciona alguns livros populares ao banco de dados se ainda não existirem."""
-    conn = sqlite3.connect('biblioteca.db')
-    c = conn.cursor()
-    
-    # Verificar se já existem livros no banco
-    c.execute("SELECT COUNT(*) FROM livros")
-    count = c.fetchone()[0]
-    
-    if count == 0:
-        # Lista de livros populares para adicionar
-        livros_populares = [
-            {
-                "titulo": "Cem Anos de Solidão",
-                "autor": "Gabriel García Márquez",
-                "ano_publicacao": 1967,
-                "genero": "Realismo Mágico",
-                "sinopse": "Uma das obras mais importantes da literatura mundial, conta a história da família Buendía ao longo de várias gerações na fictícia cidade de Macondo. A narrativa mistura realidade e fantasia, explorando temas como solidão, amor, guerra e o destino cíclico da humanidade.",
-                "nota": 4.8,
-                "capa_url": "https://m.media-amazon.com/images/I/81G+l+iMm+L._AC_UF1000,1000_QL80_.jpg"
-            },
-            {
-                "titulo": "1984",
-                "autor": "George Orwell",
-                "ano_publicacao": 1949,
-                "genero": "Ficção Distópica",
-                "sinopse": "Ambientado em um futuro distópico onde o governo totalitário, liderado pelo enigmático Grande Irmão, controla todos os aspectos da vida dos cidadãos, incluindo seus pensamentos. A obra é uma crítica ao totalitarismo e à opressão governamental, explorando temas como vigilância em massa, manipulação histórica e controle mental.",
-                "nota": 4.7,
-                "capa_url": "https://m.media-amazon.com/images/I/819js3EQwbL._AC_UF1000,1000_QL80_.jpg"
-            },
-            {
-                "titulo": "Dom Quixote",
-                "autor": "Miguel de Cervantes",
-                "ano_publicacao": 1605,
-                "genero": "Romance Clássico",
-                "sinopse": "Considerado o primeiro romance moderno, narra as aventuras do fidalgo Alonso Quijano, que enlouquece após ler muitos romances de cavalaria e decide tornar-se um cavaleiro andante sob o nome de Dom Quixote de la Mancha. Acompanhado de seu fiel escudeiro Sancho Pança, ele parte em busca de aventuras, confundindo a realidade com suas fantasias.",
-                "nota": 4.6,
-                "capa_url": "https://m.media-amazon.com/images/I/71LGz+E+TtL._AC_UF1000,1000_QL80_.jpg"
-            },
-            {
-                "titulo": "O Pequeno Príncipe",
-                "autor": "Antoine de Saint-Exupéry",
-                "ano_publicacao": 1943,
-                "genero": "Fábula",
-                "sinopse": "Uma fábula poética que aborda temas profundos como amor, amizade, solidão e o sentido da vida. A história começa quando um aviador cai no deserto do Saara e encontra um menino misterioso, o Pequeno Príncipe, que veio de um asteroide distante. Através de suas conversas, o aviador aprende lições valiosas sobre a vida e as relações humanas.",
-                "nota": 4.9,
-                "capa_url": "https://m.media-amazon.com/images/I/71OZY035QKL._AC_UF1000,1000_QL80_.jpg"
-            },
-            {
-                "titulo": "Crime e Castigo",
-                "autor": "Fiódor Dostoiévski",
-                "ano_publicacao": 1866,
-                "genero": "Romance Psicológico",
-                "sinopse": "O romance acompanha a história de Raskólnikov, um ex-estudante que comete um assassinato para provar sua teoria de que pessoas extraordinárias estão acima da lei moral. A obra explora profundamente a psicologia do crime, o remorso e a redenção, além de questões filosóficas sobre moralidade, niilismo e a condição humana.",
-                "nota": 4.7,
-                "capa_url": "https://m.media-amazon.com/images/I/61un6+JjAUL._AC_UF1000,1000_QL80_.jpg"
-            },
-            {
-                "titulo": "Orgulho e Preconceito",
-                "autor": "Jane Austen",
-                "ano_publicacao": 1813,
-                "genero": "Romance",
-                "sinopse": "Ambientado na Inglaterra rural do século XIX, o romance narra a história de Elizabeth Bennet e sua família. A trama gira em torno dos relacionamentos e casamentos das cinco irmãs Bennet, com foco especial no relacionamento entre Elizabeth e o orgulhoso Sr. Darcy. A obra é uma crítica social à época, abordando temas como casamento, moral, educação e preconceitos de classe.",
-                "nota": 4.8,
-                "capa_url": "https://m.media-amazon.com/images/I/71Q1tPupKjL._AC_UF1000,1000_QL80_.jpg"
-            },
-            {
-                "titulo": "A Metamorfose",
-                "autor": "Franz Kafka",
-                "ano_publicacao": 1915,
-                "genero": "Ficção Absurdista",
-                "sinopse": "A novela conta a história de Gregor Samsa, um caixeiro-viajante que acorda certa manhã transformado em um inseto monstruoso. A obra explora temas como alienação, identidade e o absurdo da condição humana, enquanto acompanha a reação da família de Gregor à sua transformação e seu gradual abandono.",
-                "nota": 4.5,
-                "capa_url": "https://m.media-amazon.com/images/I/61OUBSaYJEL._AC_UF1000,1000_QL80_.jpg"
-            },
-            {
-                "titulo": "Ulisses",
-                "autor": "James Joyce",
-                "ano_publicacao": 1922,
-                "genero": "Modernismo",
-                "sinopse": "Considerada uma das obras mais importantes da literatura modernista, a narrativa acompanha um único dia na vida de Leopold Bloom em Dublin. O romance é conhecido por sua complexidade estilística, experimentação com a linguagem e referências à Odisseia de Homero. A obra explora temas como identidade irlandesa, relações humanas e a condição do homem moderno.",
-                "nota": 4.4,
-                "capa_url": "https://m.media-amazon.com/images/I/71QKrhhMJIL._AC_UF1000,1000_QL80_.jpg"
-            },
-            {
-                "titulo": "A Divina Comédia",
-                "autor": "Dante Alighieri",
-                "ano_publicacao": 1320,
-                "genero": "Poema Épico",
-                "sinopse": "Este poema épico narra a jornada de Dante pelos três reinos do além-túmulo: Inferno, Purgatório e Paraíso. Guiado inicialmente pelo poeta romano Virgílio e depois por sua amada Beatriz, Dante encontra figuras históricas e mitológicas, explorando temas religiosos, filosóficos e políticos da época medieval.",
-                "nota": 4.6,
-                "capa_url": "https://m.media-amazon.com/images/I/61Iy2SvKFPL._AC_UF1000,1000_QL80_.jpg"
-            },
-            {
-                "titulo": "Moby Dick",
-                "autor": "Herman Melville",
-                "ano_publicacao": 1851,
-                "genero": "Aventura",
-                "sinopse": "A história segue a obsessiva busca do Capitão Ahab pela baleia branca Moby Dick, que arrancou sua perna em um encontro anterior. Narrado pelo marinheiro Ishmael, o romance explora temas como obsessão, vingança, bem e mal, além de oferecer detalhes minuciosos sobre a indústria baleeira do século XIX.",
-                "nota": 4.5,
-                "capa_url": "https://m.media-amazon.com/images/I/71+WUTwT+ML._AC_UF1000,1000_QL80_.jpg"
-            },
-            {
-                "titulo": "O Senhor dos Anéis",
-                "autor": "J.R.R. Tolkien",
-                "ano_publicacao": 1954,
-                "genero": "Fantasia",
-                "sinopse": "Ambientada no mundo fictício da Terra-média, a trilogia narra a jornada do hobbit Frodo Bolseiro para destruir o Um Anel, uma poderosa artefato criado pelo Senhor das Trevas Sauron. Acompanhado pela Sociedade do Anel, Frodo enfrenta perigos e desafios enquanto tenta impedir que Sauron recupere seu poder e domine a Terra-média.",
-                "nota": 4.9,
-                "capa_url": "https://m.media-amazon.com/images/I/71ZLavBjpRL._AC_UF1000,1000_QL80_.jpg"
-            },
-            {
-                "titulo": "Harry Potter e a Pedra Filosofal",
-                "autor": "J.K. Rowling",
-                "ano_publicacao": 1997,
-                "genero": "Fantasia",
-                "sinopse": "O primeiro livro da série Harry Potter apresenta o jovem órfão Harry, que descobre ser um bruxo no seu décimo primeiro aniversário. Ele é convidado a estudar na Escola de Magia e Bruxaria de Hogwarts, onde faz amigos, aprende magia e descobre a verdade sobre seu passado e a ameaça do bruxo das trevas Lord Voldemort.",
-                "nota": 4.8,
-                "capa_url": "https://m.media-amazon.com/images/I/81ibfYk4qmL._AC_UF1000,1000_QL80_.jpg"
-            }
-        ]
-        
-        data_adicao = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        for livro in livros_populares:
-            c.execute('''
-            INSERT INTO livros (titulo, autor, ano_publicacao, genero, sinopse, nota, data_adicao, capa_url)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                livro["titulo"], 
-                livro["autor"], 
-                livro["ano_publicacao"], 
-                livro["genero"], 
-                livro["sinopse"], 
-                livro["nota"], 
-                data_adicao,
-                livro["capa_url"]
-            ))
-            
-            # Adicionar alguns comentários fictícios para cada livro
-            livro_id = c.lastrowid
-            
-            comentarios = [
-                {
-                    "nome": "Leitor Entusiasta",
-                    "comentario": f"Simplesmente adorei {livro['titulo']}! Uma obra-prima que me fez refletir profundamente.",
-                    "data": (datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
-                },
-                {
-                    "nome": "Crítico Literário",
-                    "comentario": f"A narrativa de {livro['autor']} é brilhante. A construção dos personagens e o desenvolvimento da trama são impecáveis.",
-                    "data": (datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
-                }
-            ]
-            
-            for comentario in comentarios:
-                c.execute('''
-                INSERT INTO comentarios (livro_id, nome_usuario, comentario, data_comentario)
-                VALUES (?, ?, ?, ?)
-                ''', (
-                    livro_id,
-                    comentario["nome"],
-                    comentario["comentario"],
-                    comentario["data"]
-                ))
-    
-    conn.commit()
-    conn.close()
-
-# Função para adicionar um novo livro
-def adicionar_livro(titulo, autor, ano_publicacao, genero, sinopse, nota, capa_url=""):
-    """Adiciona um novo livro ao banco de dados."""
-    conn = sqlite3.connect('biblioteca.db')
-    c = conn.cursor()
-    
-    data_adicao = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    # Se não for fornecida uma URL de capa, usar uma imagem de placeholder
-    if not capa_url:
-        capa_url = f"https://picsum.photos/seed/{random.randint(1, 1000)}/400/600"
-    
-    c.execute('''
-    INSERT INTO livros (titulo, autor, ano_publicacao, genero, sinopse, nota, data_adicao, capa_url)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (titulo, autor, ano_publicacao, genero, sinopse, nota, data_adicao, capa_url))
-    
-    livro_id = c.lastrowid
-    
-    conn.commit()
-    conn.close()
-    
-    return livro_id
-
-# Função para obter todos os livros
-def obter_livros():
-    """Retorna todos os livros do banco de dados."""
-    conn = sqlite3.connect('biblioteca.db')
-    livros = pd.read_sql_query("SELECT * FROM livros ORDER BY data_adicao DESC", conn)
-    conn.close()
-    return livros
-
-# Função para obter livros populares (com maior nota)
-def obter_livros_populares(limite=6):
-    """Retorna os livros mais bem avaliados."""
-    conn = sqlite3.connect('biblioteca.db')
-    livros = pd.read_sql_query(f"SELECT * FROM livros ORDER BY nota DESC LIMIT {limite}", conn)
-    conn.close()
-    return livros
-
-# Função para obter um livro específico pelo ID
-def obter_livro_por_id(livro_id):
-    """Retorna um livro específico pelo ID."""
-    conn = sqlite3.connect('biblioteca.db')
-    livro = pd.read_sql_query("SELECT * FROM livros WHERE id = ?", conn, params=(livro_id,))
-    conn.close()
-    return livro
-
-# Função para adicionar um comentário
-def adicionar_comentario(livro_id, nome_usuario, comentario):
-    """Adiciona um novo comentário a um livro."""
-    conn = sqlite3.connect('biblioteca.db')
-    c = conn.cursor()
-    
-    data_comentario = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    c.execute('''
-    INSERT INTO comentarios (livro_id, nome_usuario, comentario, data_comentario)
-    VALUES (?, ?, ?, ?)
-    ''', (livro_id, nome_usuario, comentario, data_comentario))
-    
-    conn.commit()
-    conn.close()
-
-# Função para obter comentários de um livro
-def obter_comentarios(livro_id):
-    """Retorna todos os comentários de um livro específico."""
-    conn = sqlite3.connect('biblioteca.db')
-    comentarios = pd.read_sql_query(
-        "SELECT * FROM comentarios WHERE livro_id = ? ORDER BY data_comentario DESC", 
-        conn, 
-        params=(livro_id,)
-    )
-    conn.close()
-    return comentarios
-
-# Função para buscar livros
-def buscar_livros(termo_busca):
-    """Busca livros pelo título, autor ou gênero."""
-    conn = sqlite3.connect('biblioteca.db')
-    termo = f"%{termo_busca}%"
-    livros = pd.read_sql_query(
-        "SELECT * FROM livros WHERE titulo LIKE ? OR autor LIKE ? OR genero LIKE ? ORDER BY data_adicao DESC", 
-        conn, 
-        params=(termo, termo, termo)
-    )
-    conn.close()
-    return livros
+# Carregar animações (nunca espera pela rede: ver animacoes.py)
+lottie_book = carregar_animacao("livro")
+lottie_reading = carregar_animacao("leitura")
+lottie_library = carregar_animacao("biblioteca")
 
-# Função para renderizar estrelas baseado na nota
-def renderizar_estrelas(nota):
-    """Renderiza estrelas baseado na nota (0-5)."""
-    estrelas_cheias = int(nota)
-    meia_estrela = 1 if nota - estrelas_cheias >= 0.5 else 0
-    estrelas_vazias = 5 - estrelas_cheias - meia_estrela
-    
-    return "⭐" * estrelas_cheias + ("⭐" if meia_estrela else "") + "☆" * estrelas_vazias
-
-# Função para obter estatísticas
-def obter_estatisticas():
-    """Retorna estatísticas sobre os livros e comentários."""
-    conn = sqlite3.connect('biblioteca.db')
-    c = conn.cursor()
-    
-    # Total de livros
-    c.execute("SELECT COUNT(*) FROM livros")
-    total_livros = c.fetchone()[0]
-    
-    # Nota média
-    c.execute("SELECT AVG(nota) FROM livros")
-    nota_media = c.fetchone()[0] or 0
-    nota_media = round(nota_media, 1)
-    
-    # Total de comentários
-    c.execute("SELECT COUNT(*) FROM comentarios")
-    total_comentarios = c.fetchone()[0]
-    
-    # Gêneros diferentes
-    c.execute("SELECT COUNT(DISTINCT genero) FROM livros")
-    total_generos = c.fetchone()[0]
-    
-    conn.close()
-    
-    return {
-        "total_livros": total_livros,
-        "nota_media": nota_media,
-        "total_comentarios": total_comentarios,
-        "total_generos": total_generos
-    }
+# Aplicar o tema: folha de estilos estática compilada uma vez por processo (ver tema.py)
+st.markdown(tag_tema({
+    "PRIMARY_COLOR": PRIMARY_COLOR,
+    "SECONDARY_COLOR": SECONDARY_COLOR,
+    "ACCENT_COLOR": ACCENT_COLOR,
+    "BG_COLOR": BG_COLOR,
+    "CARD_BG_COLOR": CARD_BG_COLOR,
+    "TEXT_COLOR": TEXT_COLOR,
+    "SIDEBAR_COLOR": SIDEBAR_COLOR,
+}), unsafe_allow_html=True)
 
-# Inicializar o banco de dados e adicionar livros populares
-init_db()
-adicionar_livros_populares()
+# Inicializar o banco de dados e adicionar livros populares (só no primeiro rerun do processo)
+inicializar_banco()
+# Leituras e escritas das páginas (SQLite ou DuckDB, ver repositorio.py)
+repositorio = obter_repositorio()
+# Calcula em segundo plano os similares dos livros que ainda não os têm
+iniciar_similares()
+# Indexa em segundo plano, para o aviso de duplicatas, os livros que ainda não têm chaves
+iniciar_duplicatas()
+# Monta em segundo plano o índice de prefixos das sugestões da busca
+iniciar_indice()
+# Aplica em segundo plano o decaimento da popularidade (no primeiro rerun e depois a cada INTERVALO_RECALCULO)
+agendar_recalculo_popularidade()
 
 # Configuração de estado da sessão
 if 'pagina_atual' not in st.session_state:
@@ -901,18 +96,54 @@ with st.container():
     st.markdown('</div>', unsafe_allow_html=True)
 
 # Barra de busca
-if st.session_state['pagina_atual'] in ['início', 'explorar']:
+def opcoes_busca(termo):
+    """Sugestões da caixa de busca enquanto o usuário digita, como (rótulo, valor)."""
+    return [
+        (f"📖 {texto}" if tipo == "titulo" else f"✍️ {texto}", (tipo, texto, livro_id))
+        for tipo, texto, livro_id in sugerir(termo)
+    ]
+
+
+# Fragmento: cada tecla reexecuta só a barra de busca, não a página inteira
+@st.fragment
+def barra_de_busca():
     col1, col2 = st.columns([4, 1])
     with col1:
-        termo_busca = st.text_input("🔍 Buscar livros por título, autor ou gênero", "")
+        escolha = st_searchbox(
+            opcoes_busca,
+            label="🔍 Buscar livros por título, autor ou gênero",
+            placeholder="Digite um título ou autor",
+            key="caixa_busca",
+            default_use_searchterm=True,
+            rerun_scope="fragment",
+        )
     with col2:
         st.markdown("<br>", unsafe_allow_html=True)
         buscar = st.button("Buscar")
-    
-    if buscar and termo_busca:
-        st.session_state['termo_busca'] = termo_busca
+
+    if isinstance(escolha, tuple):
+        tipo, texto, livro_id = escolha
+        if tipo == "titulo":
+            st.session_state['livro_selecionado'] = livro_id
+            st.session_state['pagina_atual'] = 'detalhes'
+        else:
+            st.session_state['termo_busca'] = texto
+            st.session_state['pagina_atual'] = 'resultados_busca'
+    elif buscar and escolha:
+        st.session_state['termo_busca'] = escolha
         st.session_state['pagina_atual'] = 'resultados_busca'
-        st.rerun()
+    else:
+        return
+    # Caixa vazia ao voltar para a página
+    del st.session_state['caixa_busca']
+    st.rerun(scope="app")
+
+
+if st.session_state['pagina_atual'] in ['início', 'explorar']:
+    barra_de_busca()
+
+# Tempo da página escolhida; encerrado depois do último ramo abaixo
+trecho_pagina = trecho(f"pagina.{st.session_state['pagina_atual']}").iniciar()
 
 # Página Inicial
 if st.session_state['pagina_atual'] == 'início':
@@ -935,7 +166,7 @@ if st.session_state['pagina_atual'] == 'início':
         st_lottie(lottie_book, height=300, key="book_animation")
     
     # Estatísticas
-    stats = obter_estatisticas()
+    stats = repositorio.obter_estatisticas()
     
     st.markdown('<div style="margin: 40px 0;">', unsafe_allow_html=True)
     col1, col2, col3, col4 = st.columns(4)
@@ -982,32 +213,10 @@ if st.session_state['pagina_atual'] == 'início':
     st.markdown('<div class="featured-section">', unsafe_allow_html=True)
     st.markdown('<h2 class="featured-title animate-fade-in">📊 Livros Mais Populares</h2>', unsafe_allow_html=True)
     
-    livros_populares = obter_livros_populares(6)
+    livros_populares = repositorio.obter_livros_populares(6)
     
-    # Exibir livros populares em um grid de 3 colunas
-    cols = st.columns(3)
-    
-    for i, (_, livro) in enumerate(livros_populares.iterrows()):
-        with cols[i % 3]:
-            st.markdown(f"""
-            <div class="book-card animate-fade-in" style="animation-delay: {i * 0.1}s">
-                <img src="{livro['capa_url']}" class="book-cover" alt="Capa do livro {livro['titulo']}">
-                <div class="book-title">{livro['titulo']}</div>
-                <div class="book-author">por {livro['autor']}</div>
-                <div class="book-meta">
-                    <span>{livro['genero']}</span>
-                    <span>{livro['ano_publicacao']}</span>
-                </div>
-                <div class="book-rating">{renderizar_estrelas(livro['nota'])}</div>
-                <div class="book-description">{livro['sinopse'][:100]}...</div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Botão funcional do Streamlit
-            if st.button(f"Ver Detalhes", key=f"btn_pop_{livro['id']}"):
-                st.session_state['livro_selecionado'] = livro['id']
-                st.session_state['pagina_atual'] = 'detalhes'
-                st.rerun()
+    # Exibir livros populares em grade
+    renderizar_grade(livros_populares, "populares")
     
     st.markdown('</div>', unsafe_allow_html=True)
     
@@ -1015,32 +224,10 @@ if st.session_state['pagina_atual'] == 'início':
     st.markdown('<div class="featured-section">', unsafe_allow_html=True)
     st.markdown('<h2 class="featured-title animate-fade-in">🆕 Adições Recentes</h2>', unsafe_allow_html=True)
     
-    livros_recentes = obter_livros().head(3)
+    livros_recentes, _ = repositorio.consultar_livros(ordenar_por="Mais Recentes", tamanho_pagina=3)
     
-    # Exibir livros recentes em um grid de 3 colunas
-    cols = st.columns(3)
-    
-    for i, (_, livro) in enumerate(livros_recentes.iterrows()):
-        with cols[i % 3]:
-            st.markdown(f"""
-            <div class="book-card animate-fade-in" style="animation-delay: {i * 0.1}s">
-                <img src="{livro['capa_url']}" class="book-cover" alt="Capa do livro {livro['titulo']}">
-                <div class="book-title">{livro['titulo']}</div>
-                <div class="book-author">por {livro['autor']}</div>
-                <div class="book-meta">
-                    <span>{livro['genero']}</span>
-                    <span>{livro['ano_publicacao']}</span>
-                </div>
-                <div class="book-rating">{renderizar_estrelas(livro['nota'])}</div>
-                <div class="book-description">{livro['sinopse'][:100]}...</div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Botão funcional do Streamlit
-            if st.button(f"Ver Detalhes", key=f"btn_rec_{livro['id']}"):
-                st.session_state['livro_selecionado'] = livro['id']
-                st.session_state['pagina_atual'] = 'detalhes'
-                st.rerun()
+    # Exibir livros recentes em grade
+    renderizar_grade(livros_recentes, "recentes")
     
     st.markdown('</div>', unsafe_allow_html=True)
 
@@ -1066,61 +253,41 @@ elif st.session_state['pagina_atual'] == 'explorar':
     with col3:
         ordenar_por = st.selectbox(
             "Ordenar por",
-            ["Mais Recentes", "Melhor Avaliados", "Título (A-Z)", "Autor (A-Z)", "Ano (Mais Recente)"]
+            list(ORDENACOES_LIVROS)
         )
     
-    # Obter livros e aplicar filtros
-    livros = obter_livros()
-    
-    # Aplicar filtros
-    if filtro_genero:
-        livros = livros[livros['genero'].isin(filtro_genero)]
+    # Paginação por cursor: volta para a primeira página sempre que os filtros mudam
+    filtros = (tuple(filtro_genero), filtro_nota_min, ordenar_por)
+    if st.session_state.get('explorar_filtros') != filtros:
+        st.session_state['explorar_filtros'] = filtros
+        st.session_state['explorar_cursores'] = [None]
+    cursores = st.session_state['explorar_cursores']
     
-    livros = livros[livros['nota'] >= filtro_nota_min]
-    
-    # Aplicar ordenação
-    if ordenar_por == "Mais Recentes":
-        livros = livros.sort_values(by="data_adicao", ascending=False)
-    elif ordenar_por == "Melhor Avaliados":
-        livros = livros.sort_values(by="nota", ascending=False)
-    elif ordenar_por == "Título (A-Z)":
-        livros = livros.sort_values(by="titulo")
-    elif ordenar_por == "Autor (A-Z)":
-        livros = livros.sort_values(by="autor")
-    elif ordenar_por == "Ano (Mais Recente)":
-        livros = livros.sort_values(by="ano_publicacao", ascending=False)
+    # Filtros e ordenação são aplicados no banco, uma página por vez
+    livros, proximo_cursor = repositorio.consultar_livros(
+        filtro_genero, filtro_nota_min, ordenar_por, cursor=cursores[-1]
+    )
     
     # Verificar se existem livros
     if livros.empty:
         st.info("Nenhum livro encontrado com os filtros selecionados.")
     else:
         # Exibir livros em um layout de grade
-        st.markdown(f"<p>Exibindo {len(livros)} livros</p>", unsafe_allow_html=True)
+        st.markdown(f"<p>Exibindo {len(livros)} livros (página {len(cursores)})</p>", unsafe_allow_html=True)
         
-        # Criar grid de 3 colunas
-        cols = st.columns(3)
+        # Grade da página atual (a paginação já vem do banco)
+        renderizar_grade(livros, "explorar")
         
-        for i, (_, livro) in enumerate(livros.iterrows()):
-            with cols[i % 3]:
-                st.markdown(f"""
-                <div class="book-card animate-fade-in" style="animation-delay: {i * 0.1}s">
-                    <img src="{livro['capa_url']}" class="book-cover" alt="Capa do livro {livro['titulo']}">
-                    <div class="book-title">{livro['titulo']}</div>
-                    <div class="book-author">por {livro['autor']}</div>
-                    <div class="book-meta">
-                        <span>{livro['genero']}</span>
-                        <span>{livro['ano_publicacao']}</span>
-                    </div>
-                    <div class="book-rating">{renderizar_estrelas(livro['nota'])}</div>
-                    <div class="book-description">{livro['sinopse'][:100]}...</div>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Botão funcional do Streamlit
-                if st.button(f"Ver Detalhes", key=f"btn_exp_{livro['id']}"):
-                    st.session_state['livro_selecionado'] = livro['id']
-                    st.session_state['pagina_atual'] = 'detalhes'
-                    st.rerun()
+        # Navegação entre páginas
+        col1, _, col3 = st.columns([1, 4, 1])
+        with col1:
+            if len(cursores) > 1 and st.button("← Anterior", key="explorar_anterior"):
+                cursores.pop()
+                st.rerun()
+        with col3:
+            if proximo_cursor is not None and st.button("Próxima →", key="explorar_proxima"):
+                cursores.append(proximo_cursor)
+                st.rerun()
 
 # Página de Resultados de Busca
 elif st.session_state['pagina_atual'] == 'resultados_busca':
@@ -1128,7 +295,7 @@ elif st.session_state['pagina_atual'] == 'resultados_busca':
     st.markdown(f'<h1 class="animate-fade-in">🔍 Resultados para "{termo_busca}"</h1>', unsafe_allow_html=True)
     
     # Obter resultados da busca
-    livros = buscar_livros(termo_busca)
+    livros = repositorio.buscar_livros(termo_busca)
     
     # Verificar se existem resultados
     if livros.empty:
@@ -1140,30 +307,8 @@ elif st.session_state['pagina_atual'] == 'resultados_busca':
         # Exibir resultados em um layout de grade
         st.markdown(f"<p>Encontrados {len(livros)} livros</p>", unsafe_allow_html=True)
         
-        # Criar grid de 3 colunas
-        cols = st.columns(3)
-        
-        for i, (_, livro) in enumerate(livros.iterrows()):
-            with cols[i % 3]:
-                st.markdown(f"""
-                <div class="book-card animate-fade-in" style="animation-delay: {i * 0.1}s">
-                    <img src="{livro['capa_url']}" class="book-cover" alt="Capa do livro {livro['titulo']}">
-                    <div class="book-title">{livro['titulo']}</div>
-                    <div class="book-author">por {livro['autor']}</div>
-                    <div class="book-meta">
-                        <span>{livro['genero']}</span>
-                        <span>{livro['ano_publicacao']}</span>
-                    </div>
-                    <div class="book-rating">{renderizar_estrelas(livro['nota'])}</div>
-                    <div class="book-description">{livro['sinopse'][:100]}...</div>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Botão funcional do Streamlit
-                if st.button(f"Ver Detalhes", key=f"btn_search_{livro['id']}"):
-                    st.session_state['livro_selecionado'] = livro['id']
-                    st.session_state['pagina_atual'] = 'detalhes'
-                    st.rerun()
+        # Grade paginada com os resultados
+        renderizar_grade(livros, "busca")
 
 # Página Adicionar Livro
 elif st.session_state['pagina_atual'] == 'adicionar livro':
@@ -1215,13 +360,65 @@ elif st.session_state['pagina_atual'] == 'adicionar livro':
             if not titulo or not autor:
                 st.error("Título e autor são campos obrigatórios!")
             else:
-                novo_id = adicionar_livro(titulo, autor, ano_publicacao, genero, sinopse, nota, capa_url)
-                st.success(f"Livro '{titulo}' adicionado com sucesso!")
-                
-                # Mostrar o livro adicionado
-                st.session_state['livro_selecionado'] = novo_id
-                st.session_state['pagina_atual'] = 'detalhes'
-                st.rerun()
+                st.session_state['livro_pendente'] = {
+                    "titulo": titulo, "autor": autor, "ano_publicacao": ano_publicacao, "genero": genero,
+                    "sinopse": sinopse, "nota": nota, "capa_url": capa_url,
+                }
+                # Livros já cadastrados com grafia parecida pedem confirmação antes de adicionar
+                st.session_state['duplicatas_pendentes'] = possiveis_duplicatas(titulo, autor)
+
+    if 'livro_pendente' in st.session_state:
+        livro_pendente = st.session_state['livro_pendente']
+        duplicatas_pendentes = st.session_state['duplicatas_pendentes']
+        adicionar = not duplicatas_pendentes
+        if duplicatas_pendentes:
+            st.warning(
+                f"Já existem livros parecidos com '{livro_pendente['titulo']}' de {livro_pendente['autor']}:\n\n"
+                + "\n".join(
+                    f"- **{livro['titulo']}** — {livro['autor']} ({livro['similaridade']:.0%} parecido)"
+                    for livro in duplicatas_pendentes
+                )
+            )
+            col1, col2 = st.columns(2)
+            with col1:
+                adicionar = st.button("Adicionar mesmo assim")
+            with col2:
+                if st.button("Cancelar"):
+                    del st.session_state['livro_pendente']
+                    st.rerun()
+
+        if adicionar:
+            del st.session_state['livro_pendente']
+            novo_id = repositorio.adicionar_livro(**livro_pendente)
+            st.success(f"Livro '{livro_pendente['titulo']}' adicionado com sucesso!")
+
+            # Mostrar o livro adicionado
+            st.session_state['livro_selecionado'] = novo_id
+            st.session_state['pagina_atual'] = 'detalhes'
+            st.rerun()
+
+    # Importação de um catálogo inteiro
+    with st.expander("📦 Importar catálogo em lote"):
+        st.markdown("Envie um arquivo CSV, JSONL ou Parquet com as colunas **titulo** e **autor** "
+                    "(obrigatórias) e, opcionalmente, ano_publicacao, genero, sinopse, nota e capa_url. "
+                    "Livros já cadastrados com o mesmo título e autor são ignorados.")
+        arquivo_catalogo = st.file_uploader("Arquivo do catálogo", type=["csv", "jsonl", "ndjson", "parquet"])
+
+        if arquivo_catalogo is not None and st.button("Importar", key="importar_catalogo"):
+            progresso = st.empty()
+            try:
+                resumo = importar_catalogo(
+                    arquivo_catalogo,
+                    ao_progredir=lambda parcial: progresso.info(f"{parcial['lidos']} linhas lidas, {parcial['inseridos']} inseridas...")
+                )
+            except Exception as erro:
+                progresso.error(f"Não foi possível importar o arquivo: {erro}")
+            else:
+                progresso.success(
+                    f"{resumo['inseridos']} livros importados de {resumo['lidos']} linhas "
+                    f"({resumo['duplicados']} duplicados, {resumo['invalidos']} sem título ou autor) "
+                    f"em {resumo['segundos']:.1f} s."
+                )
 
 # Página Sobre
 elif st.session_state['pagina_atual'] == 'sobre':
@@ -1285,7 +482,7 @@ elif st.session_state['pagina_atual'] == 'detalhes':
     # Verificar se existe um livro selecionado
     if 'livro_selecionado' in st.session_state:
         livro_id = st.session_state['livro_selecionado']
-        livro_df = obter_livro_por_id(livro_id)
+        livro_df = repositorio.obter_livro_por_id(livro_id)
         
         if not livro_df.empty:
             livro = livro_df.iloc[0]
@@ -1305,7 +502,7 @@ elif st.session_state['pagina_atual'] == 'detalhes':
             
             with col1:
                 st.markdown(f"""
-                <img src="{livro['capa_url']}" class="book-detail-cover" alt="Capa do livro {livro['titulo']}">
+                <img src="{url_capa(livro['capa_url'], 'detalhe')}" class="book-detail-cover" loading="lazy" alt="Capa do livro {livro['titulo']}">
                 """, unsafe_allow_html=True)
             
             with col2:
@@ -1326,10 +523,16 @@ elif st.session_state['pagina_atual'] == 'detalhes':
             <div class="book-detail-synopsis">{livro['sinopse']}</div>
             """, unsafe_allow_html=True)
             
+            # Livros similares (lista pré-calculada em similares.py)
+            livros_similares = repositorio.obter_livros_similares(livro_id)
+            if not livros_similares.empty:
+                st.markdown(f'<h3 style="margin-top: 30px; color: {PRIMARY_COLOR};">Livros Similares</h3>', unsafe_allow_html=True)
+                renderizar_grade(livros_similares, f"similares_{livro_id}")
+            
             # Seção de comentários
             st.markdown(f"""
             <div class="comment-section">
-                <h3 style="color: {PRIMARY_COLOR};">Comentários</h3>
+                <h3 style="color: {PRIMARY_COLOR};">Comentários ({repositorio.contar_comentarios(livro_id)})</h3>
             </div>
             """, unsafe_allow_html=True)
             
@@ -1351,24 +554,13 @@ elif st.session_state['pagina_atual'] == 'detalhes':
                     if not nome_usuario or not comentario:
                         st.error("Por favor, preencha todos os campos!")
                     else:
-                        adicionar_comentario(livro_id, nome_usuario, comentario)
+                        repositorio.adicionar_comentario(livro_id, nome_usuario, comentario)
+                        reiniciar_comentarios(livro_id)
                         st.success("Comentário adicionado com sucesso!")
                         st.rerun()
             
-            # Exibir comentários existentes
-            comentarios = obter_comentarios(livro_id)
-            
-            if comentarios.empty:
-                st.info("Ainda não há comentários para este livro. Seja o primeiro a comentar!")
-            else:
-                for _, comentario in comentarios.iterrows():
-                    st.markdown(f"""
-                    <div class="comment-box">
-                        <div class="comment-author">{comentario['nome_usuario']}</div>
-                        <div class="comment-date">{comentario['data_comentario']}</div>
-                        <div class="comment-content">{comentario['comentario']}</div>
-                    </div>
-                    """, unsafe_allow_html=True)
+            # Exibir comentários existentes, uma página por vez
+            renderizar_comentarios(livro_id)
             
             st.markdown('</div>', unsafe_allow_html=True)
         else:
@@ -1380,9 +572,16 @@ elif st.session_state['pagina_atual'] == 'detalhes':
         st.session_state['pagina_atual'] = 'início'
         st.rerun()
 
+trecho_pagina.encerrar()
+
 # Footer
 st.markdown("""
 <div class="footer">
     <p>© 2023 BiblioTech - Desenvolvido com ❤️ usando Python e Streamlit</p>
 </div>
 """, unsafe_allow_html=True)
+
+# Fecha a medição do rerun; com ?depuracao=1 na URL, mostra o tempo de cada trecho
+trechos_rerun, tempo_rerun = finalizar_rerun()
+if depuracao_ativa():
+    renderizar_painel(trechos_rerun, tempo_rerun)
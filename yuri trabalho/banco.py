@@ -0,0 +1,600 @@
+import json
+import logging
+import os
+import sqlite3
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import pandas as pd
+from datetime import datetime
+from migracoes import aplicar_migracoes, EXPRESSAO_POPULARIDADE
+from cache import cache_consultas
+from escrita import EscritorEmLote
+from popularidade import RankingPopularidade
+from metricas import cronometrado, registrar_fonte
+
+# Caminho do banco de dados (BIBLIOTECA_DB permite usar outro arquivo, ex.: no benchmark.py)
+CAMINHO_BANCO = os.environ.get('BIBLIOTECA_DB', 'biblioteca.db')
+
+# Livros e comentários de exemplo usados para semear um banco vazio
+FIXTURE_LIVROS_POPULARES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dados', 'livros_populares.json')
+
+# Quantidade máxima de conexões mantidas abertas no pool
+TAMANHO_POOL = 8
+
+# Configurações aplicadas a cada conexão nova
+PRAGMAS_CONEXAO = (
+    "PRAGMA journal_mode = WAL",      # leitores não bloqueiam o escritor
+    "PRAGMA busy_timeout = 5000",     # espera até 5s pelo lock em vez de falhar
+    "PRAGMA synchronous = NORMAL",    # seguro com WAL e bem mais rápido que FULL
+    "PRAGMA cache_size = -16000",     # ~16 MB de cache de páginas por conexão
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 134217728",   # 128 MB de leitura via mmap
+    "PRAGMA foreign_keys = ON",
+)
+
+# O Streamlit reexecuta o app.py a cada interação, mas os módulos importados
+# permanecem carregados; por isso o pool vive aqui e sobrevive aos reruns.
+_pool = queue.LifoQueue(maxsize=TAMANHO_POOL)
+_lock_pool = threading.Lock()
+_conexoes_abertas = 0
+
+# Migrações e semente rodam uma vez por processo (ver inicializar_banco)
+_lock_inicializacao = threading.Lock()
+_banco_inicializado = False
+
+# Pesos do bm25 por coluna: titulo, autor, genero, sinopse
+PESOS_BUSCA = "10.0, 5.0, 2.0, 1.0"
+
+# Ordenações da página Explorar: rótulo -> (coluna, decrescente)
+ORDENACOES_LIVROS = {
+    "Mais Recentes": ("data_adicao", True),
+    "Melhor Avaliados": ("nota", True),
+    "Título (A-Z)": ("titulo", False),
+    "Autor (A-Z)": ("autor", False),
+    "Ano (Mais Recente)": ("ano_publicacao", True),
+    "Mais Comentados": ("num_comentarios", True),
+    "Atividade Recente": ("ultima_atividade", True),
+    "Mais Populares": ("popularidade", True),
+}
+
+# Quantidade de livros por página na página Explorar
+TAMANHO_PAGINA = 12
+
+# Quantidade de comentários carregados por vez na página de detalhes
+TAMANHO_PAGINA_COMENTARIOS = 20
+
+# Intervalo mínimo entre dois recálculos da popularidade do acervo inteiro
+INTERVALO_RECALCULO = 6 * 3600  # segundos
+
+# Faixa de ids recalculada por transação do escritor
+LIVROS_POR_RECALCULO = 5000
+
+# Diferença mínima de popularidade para o livro ser regravado no recálculo
+TOLERANCIA_POPULARIDADE = 0.001
+
+# Recálculo da popularidade em segundo plano (ver agendar_recalculo_popularidade)
+_lock_recalculo = threading.Lock()
+_recalculo_agendado = False
+_ultimo_recalculo = None
+_executor_recalculo = ThreadPoolExecutor(max_workers=1, thread_name_prefix="popularidade")
+
+
+def montar_consulta_fts(termo_busca):
+    """Converte o texto digitado em uma consulta FTS5 de prefixos (todas as palavras devem casar)."""
+    palavras = re.findall(r"\w+", termo_busca or "")
+    # Cada palavra vira uma string entre aspas, o que neutraliza a sintaxe do FTS5
+    return " ".join(f'"{palavra}"*' for palavra in palavras)
+
+
+def _nova_conexao():
+    """Abre uma conexão SQLite já configurada para uso de longa duração."""
+    conn = sqlite3.connect(
+        CAMINHO_BANCO,
+        timeout=5.0,
+        check_same_thread=False,  # a conexão circula entre as threads do Streamlit via pool
+        cached_statements=256,
+    )
+    for pragma in PRAGMAS_CONEXAO:
+        conn.execute(pragma)
+    return conn
+
+
+def _nova_conexao_escritor():
+    """Conexão da thread escritora, com os arquivos temporários no padrão do SQLite.
+
+    Cada operação do escritor roda num SAVEPOINT, que guarda as páginas
+    alteradas num subjournal; com temp_store = MEMORY ele fica num journal em
+    memória cuja leitura fica mais lenta quanto maior a operação (um bloco da
+    importação levava segundos). No padrão, ele fica em memória até 64 KB e
+    depois vai para um arquivo temporário.
+    """
+    conn = _nova_conexao()
+    conn.execute("PRAGMA temp_store = DEFAULT")
+    return conn
+
+
+# Todas as inserções interativas passam por uma única thread escritora (ver escrita.py)
+escritor = EscritorEmLote(_nova_conexao_escritor)
+
+
+@contextmanager
+def conexao():
+    """Empresta uma conexão do pool durante o bloco `with` e a devolve ao final.
+
+    As conexões ficam abertas entre as chamadas, mantendo o cache de páginas,
+    o esquema já interpretado e os statements preparados. Uma transação que
+    ficar aberta por erro é desfeita antes da conexão voltar ao pool.
+    """
+    global _conexoes_abertas
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        with _lock_pool:
+            criar = _conexoes_abertas < TAMANHO_POOL
+            if criar:
+                _conexoes_abertas += 1
+        if criar:
+            try:
+                conn = _nova_conexao()
+            except Exception:
+                with _lock_pool:
+                    _conexoes_abertas -= 1
+                raise
+        else:
+            # Pool esgotado: espera alguma conexão ser devolvida
+            conn = _pool.get()
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        _pool.put(conn)
+
+
+def _carregar_ranking(limite):
+    """Lê pelo índice os livros de maior popularidade (usado pelo ranking em memória)."""
+    with conexao() as conn:
+        return conn.execute(
+            """
+            SELECT id, popularidade FROM livros
+            WHERE popularidade IS NOT NULL
+            ORDER BY popularidade DESC, id DESC
+            LIMIT ?
+            """,
+            (limite,)
+        ).fetchall()
+
+
+# Primeiros colocados em popularidade, mantidos em memória (ver popularidade.py)
+ranking_populares = RankingPopularidade(_carregar_ranking)
+
+# Contadores incluídos no arquivo de métricas (ver metricas.py)
+registrar_fonte("escritor", escritor.estatisticas)
+registrar_fonte("cache", cache_consultas.estatisticas)
+registrar_fonte("ranking", ranking_populares.estatisticas)
+
+
+def _atualizar_ranking(livro_id):
+    """Leva ao ranking a popularidade recalculada pelos gatilhos para um livro."""
+    with conexao() as conn:
+        linha = conn.execute("SELECT popularidade FROM livros WHERE id = ?", (livro_id,)).fetchone()
+    if linha is not None:
+        ranking_populares.atualizar(livro_id, linha[0])
+
+
+def fechar_conexoes():
+    """Fecha todas as conexões ociosas do pool."""
+    global _conexoes_abertas
+    while True:
+        try:
+            conn = _pool.get_nowait()
+        except queue.Empty:
+            break
+        conn.close()
+        with _lock_pool:
+            _conexoes_abertas -= 1
+
+# Inicialização do banco de dados
+@cronometrado
+def init_db():
+    """Cria ou atualiza o esquema do banco aplicando as migrações pendentes."""
+    with conexao() as conn:
+        aplicar_migracoes(conn)
+
+# Função para adicionar livros populares pré-definidos
+@cronometrado
+def adicionar_livros_populares(caminho_fixture=FIXTURE_LIVROS_POPULARES):
+    """Adiciona os livros populares da fixture (e comentários de exemplo) se o banco estiver vazio."""
+    with open(caminho_fixture, encoding="utf-8") as arquivo:
+        fixture = json.load(arquivo)
+
+    with conexao() as conn:
+        # BEGIN IMMEDIATE: dois processos iniciando juntos não semeiam duas vezes
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("SELECT EXISTS (SELECT 1 FROM livros)").fetchone()[0]:
+            conn.rollback()
+            return False
+
+        data_adicao = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        conn.executemany(
+            """
+            INSERT INTO livros (titulo, autor, ano_publicacao, genero, sinopse, nota, data_adicao, capa_url)
+            VALUES (:titulo, :autor, :ano_publicacao, :genero, :sinopse, :nota, :data_adicao, :capa_url)
+            """,
+            [dict(livro, data_adicao=data_adicao) for livro in fixture["livros"]]
+        )
+
+        # Comentários fictícios para cada livro; a tabela estava vazia, então a ordem dos ids é a da fixture
+        livros = conn.execute("SELECT id, titulo, autor FROM livros ORDER BY id").fetchall()
+        conn.executemany(
+            """
+            INSERT INTO comentarios (livro_id, nome_usuario, comentario, data_comentario)
+            VALUES (?, ?, ?, ?)
+            """,
+            [
+                (livro_id, modelo["nome_usuario"], modelo["comentario"].format(titulo=titulo, autor=autor), data_adicao)
+                for livro_id, titulo, autor in livros
+                for modelo in fixture["comentarios"]
+            ]
+        )
+        conn.commit()
+
+    cache_consultas.invalidar('livros', 'comentarios')
+    ranking_populares.invalidar()
+    return True
+
+# Função para recalcular a popularidade de todos os livros
+@cronometrado
+def recalcular_popularidade():
+    """Recalcula a popularidade de todo o acervo e retorna quantos livros mudaram.
+
+    Os gatilhos atualizam a popularidade a cada escrita; isto aplica o
+    decaimento do tempo (e a média atual) também aos livros sem atividade.
+    Vai pela fila do escritor, uma faixa de ids por transação, e só regrava
+    os livros cuja popularidade mudou mais que TOLERANCIA_POPULARIDADE: um
+    livro sem comentários não decai, e não entra em alteracoes_replica.
+    """
+    sql = f"""
+        UPDATE livros SET popularidade = {EXPRESSAO_POPULARIDADE}
+        WHERE id > ? AND id <= ? AND NOT COALESCE(
+            ABS(popularidade - ({EXPRESSAO_POPULARIDADE})) <= ?,
+            popularidade IS NULL AND ({EXPRESSAO_POPULARIDADE}) IS NULL
+        )
+    """
+    with conexao() as conn:
+        maior_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM livros").fetchone()[0]
+    alterados = 0
+    for inicio in range(0, maior_id, LIVROS_POR_RECALCULO):
+        parametros = (inicio, inicio + LIVROS_POR_RECALCULO, TOLERANCIA_POPULARIDADE)
+        alterados += escritor.executar(lambda conn, parametros=parametros: conn.execute(sql, parametros).rowcount)
+    if alterados:
+        cache_consultas.invalidar('livros')
+        ranking_populares.invalidar()
+    return alterados
+
+
+def _recalcular_em_segundo_plano():
+    global _recalculo_agendado
+    try:
+        recalcular_popularidade()
+    except Exception:
+        # A popularidade gravada continua valendo; tenta de novo no próximo intervalo
+        logging.getLogger(__name__).exception("Falha ao recalcular a popularidade")
+    finally:
+        with _lock_recalculo:
+            _recalculo_agendado = False
+
+# Função para manter em dia o decaimento da popularidade
+def agendar_recalculo_popularidade():
+    """Agenda o recálculo da popularidade se o último tiver mais de INTERVALO_RECALCULO (o primeiro do processo, já).
+
+    Chamada a cada rerun do app; custa só a comparação quando não há o que fazer.
+    """
+    global _recalculo_agendado, _ultimo_recalculo
+    agora = time.monotonic()
+    with _lock_recalculo:
+        if _recalculo_agendado or (
+            _ultimo_recalculo is not None and agora - _ultimo_recalculo < INTERVALO_RECALCULO
+        ):
+            return
+        _recalculo_agendado = True
+        _ultimo_recalculo = agora
+    _executor_recalculo.submit(_recalcular_em_segundo_plano)
+
+# Função para preparar o banco uma única vez por processo
+@cronometrado
+def inicializar_banco():
+    """Aplica as migrações e semeia o banco na primeira chamada do processo; depois não faz nada."""
+    global _banco_inicializado
+    if _banco_inicializado:
+        return
+    with _lock_inicializacao:
+        if not _banco_inicializado:
+            init_db()
+            adicionar_livros_populares()
+            _banco_inicializado = True
+
+# Função para adicionar um novo livro
+@cronometrado
+def adicionar_livro(titulo, autor, ano_publicacao, genero, sinopse, nota, capa_url=""):
+    """Adiciona um novo livro ao banco de dados."""
+    data_adicao = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    # Sem URL de capa o livro é exibido com a capa padrão (ver capas.py)
+    livro_id = escritor.executar(
+        """
+        INSERT INTO livros (titulo, autor, ano_publicacao, genero, sinopse, nota, data_adicao, capa_url)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (titulo, autor, ano_publicacao, genero, sinopse, nota, data_adicao, capa_url),
+        tabelas=('livros',)
+    )
+
+    _atualizar_ranking(livro_id)
+
+    # Entra no índice de quase duplicatas já, para o próximo cadastro ser comparado com ele
+    from duplicatas import indexar_livro
+    indexar_livro(livro_id, titulo, autor)
+
+    # Aparece nas sugestões da busca sem remontar o índice de prefixos
+    from sugestoes import acrescentar_livro
+    acrescentar_livro(livro_id, titulo, autor)
+
+    # Calcula os similares do livro novo em segundo plano, sem refazer a matriz
+    from similares import agendar_atualizacao
+    agendar_atualizacao()
+
+    return livro_id
+
+# Função para obter todos os livros
+@cronometrado
+@cache_consultas.em_cache('livros')
+def obter_livros():
+    """Retorna todos os livros do banco de dados."""
+    with conexao() as conn:
+        livros = pd.read_sql_query("SELECT * FROM livros ORDER BY data_adicao DESC", conn)
+    return livros
+
+# Função para obter livros populares (maior popularidade: nota, comentários e atividade recente)
+@cronometrado
+def obter_livros_populares(limite=6):
+    """Retorna os livros mais populares, na ordem do ranking em memória."""
+    # Os ids entram na chave do cache: o escritor invalida 'livros' antes de
+    # _atualizar_ranking, e uma lista lida nesse intervalo não volta depois
+    return _livros_do_ranking(tuple(ranking_populares.melhores(limite)))
+
+
+@cache_consultas.em_cache('livros')
+def _livros_do_ranking(ids):
+    """Retorna os livros dos ids informados, na mesma ordem."""
+    with conexao() as conn:
+        livros = pd.read_sql_query(
+            f"SELECT * FROM livros WHERE id IN ({', '.join('?' * len(ids))})", conn, params=ids
+        )
+    # Busca por chave primária; a ordem vem do ranking
+    posicao = {livro_id: i for i, livro_id in enumerate(ids)}
+    return livros.sort_values("id", key=lambda coluna: coluna.map(posicao), ignore_index=True)
+
+# Função para obter um livro específico pelo ID
+@cronometrado
+@cache_consultas.em_cache('livros')
+def obter_livro_por_id(livro_id):
+    """Retorna um livro específico pelo ID."""
+    with conexao() as conn:
+        livro = pd.read_sql_query("SELECT * FROM livros WHERE id = ?", conn, params=(livro_id,))
+    return livro
+
+# Função para obter os livros similares a um livro
+@cronometrado
+@cache_consultas.em_cache('livros', 'similares')
+def obter_livros_similares(livro_id, limite=6):
+    """Retorna os livros mais parecidos com um livro, pela lista pré-calculada (ver similares.py)."""
+    with conexao() as conn:
+        livros = pd.read_sql_query(
+            """
+            SELECT l.* FROM livros_similares s
+            JOIN livros l ON l.id = s.similar_id
+            WHERE s.livro_id = ?
+            ORDER BY s.similaridade DESC, s.similar_id
+            LIMIT ?
+            """,
+            conn,
+            params=(livro_id, limite)
+        )
+    return livros
+
+# Função para consultar uma página de livros com filtros e ordenação
+@cronometrado
+def consultar_livros(generos=None, nota_minima=0.0, ordenar_por="Mais Recentes",
+                     cursor=None, tamanho_pagina=TAMANHO_PAGINA):
+    """Retorna uma página de livros filtrada e ordenada no banco e o cursor da página seguinte.
+
+    A paginação é por cursor (keyset): `cursor` é o par (valor da coluna de
+    ordenação, id) do último livro da página anterior, ou None para a primeira
+    página. O cursor devolvido é None quando não há mais páginas.
+    """
+    coluna, descendente = ORDENACOES_LIVROS[ordenar_por]
+    direcao = "DESC" if descendente else "ASC"
+    
+    condicoes = ["nota >= ?"]
+    parametros = [nota_minima]
+    
+    if generos:
+        condicoes.append(f"genero IN ({', '.join('?' * len(generos))})")
+        parametros.extend(generos)
+    
+    if cursor is not None:
+        condicao, valores = condicao_cursor(coluna, descendente, cursor)
+        condicoes.append(condicao)
+        parametros.extend(valores)
+    
+    # Busca um livro a mais só para saber se existe uma próxima página
+    parametros.append(tamanho_pagina + 1)
+    
+    with conexao() as conn:
+        livros = pd.read_sql_query(
+            f"""
+            SELECT * FROM livros
+            WHERE {' AND '.join(condicoes)}
+            ORDER BY {coluna} {direcao}, id {direcao}
+            LIMIT ?
+            """,
+            conn,
+            params=parametros
+        )
+    
+    proximo_cursor = None
+    if len(livros) > tamanho_pagina:
+        livros = livros.iloc[:tamanho_pagina]
+        valor, livro_id = livros[[coluna, "id"]].iloc[-1].tolist()
+        proximo_cursor = (None if pd.isna(valor) else valor, int(livro_id))
+    
+    return livros, proximo_cursor
+
+def condicao_cursor(coluna, descendente, cursor):
+    """Monta a condição WHERE que continua a ordenação logo após o cursor.
+
+    No SQLite o NULL é menor que qualquer valor: aparece no início das
+    ordenações ascendentes e no fim das descendentes.
+    """
+    valor, livro_id = cursor
+    if descendente:
+        if valor is None:
+            return f"({coluna} IS NULL AND id < ?)", [livro_id]
+        return f"({coluna} < ? OR ({coluna} = ? AND id < ?) OR {coluna} IS NULL)", [valor, valor, livro_id]
+    if valor is None:
+        return f"(({coluna} IS NULL AND id > ?) OR {coluna} IS NOT NULL)", [livro_id]
+    return f"({coluna} > ? OR ({coluna} = ? AND id > ?))", [valor, valor, livro_id]
+
+# Função para adicionar um comentário
+@cronometrado
+def adicionar_comentario(livro_id, nome_usuario, comentario):
+    """Adiciona um novo comentário a um livro e retorna o id dele."""
+    data_comentario = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    comentario_id = escritor.executar(
+        """
+        INSERT INTO comentarios (livro_id, nome_usuario, comentario, data_comentario)
+        VALUES (?, ?, ?, ?)
+        """,
+        (livro_id, nome_usuario, comentario, data_comentario),
+        # Os gatilhos também atualizam num_comentarios, ultima_atividade e popularidade do livro
+        tabelas=('comentarios', 'livros')
+    )
+    _atualizar_ranking(livro_id)
+    return comentario_id
+
+# Função para obter comentários de um livro
+@cronometrado
+@cache_consultas.em_cache('comentarios')
+def obter_comentarios(livro_id):
+    """Retorna todos os comentários de um livro específico."""
+    with conexao() as conn:
+        comentarios = pd.read_sql_query(
+            "SELECT * FROM comentarios WHERE livro_id = ? ORDER BY data_comentario DESC", 
+            conn, 
+            params=(livro_id,)
+        )
+    return comentarios
+
+# Função para consultar uma página de comentários de um livro
+@cronometrado
+@cache_consultas.em_cache('comentarios')
+def consultar_comentarios(livro_id, cursor=None, tamanho_pagina=TAMANHO_PAGINA_COMENTARIOS):
+    """Retorna uma página de comentários, do mais novo ao mais antigo, e o cursor da seguinte.
+
+    Como em consultar_livros, `cursor` é o par (data_comentario, id) do
+    último comentário já exibido. A comparação por tupla deixa o SQLite
+    descer direto no índice (livro_id, data_comentario): qualquer página
+    custa o mesmo, por mais longa que seja a conversa.
+    """
+    limite = tamanho_pagina + 1
+    consulta = "SELECT * FROM comentarios WHERE livro_id = ? {} ORDER BY data_comentario DESC, id DESC LIMIT ?"
+
+    with conexao() as conn:
+        if cursor is None:
+            comentarios = pd.read_sql_query(consulta.format(""), conn, params=(livro_id, limite))
+        elif cursor[0] is None:
+            comentarios = pd.read_sql_query(
+                consulta.format("AND data_comentario IS NULL AND id < ?"), conn, params=(livro_id, cursor[1], limite)
+            )
+        else:
+            comentarios = pd.read_sql_query(
+                consulta.format("AND (data_comentario, id) < (?, ?)"), conn, params=(livro_id, *cursor, limite)
+            )
+            # Comentários sem data vêm por último, mas (NULL, id) < (...) nunca é verdadeiro
+            if len(comentarios) < limite:
+                sem_data = pd.read_sql_query(
+                    consulta.format("AND data_comentario IS NULL"), conn, params=(livro_id, limite - len(comentarios))
+                )
+                if not sem_data.empty:
+                    comentarios = pd.concat([comentarios, sem_data], ignore_index=True)
+
+    proximo_cursor = None
+    if len(comentarios) > tamanho_pagina:
+        comentarios = comentarios.iloc[:tamanho_pagina]
+        data, comentario_id = comentarios[["data_comentario", "id"]].iloc[-1].tolist()
+        proximo_cursor = (None if pd.isna(data) else data, int(comentario_id))
+
+    return comentarios, proximo_cursor
+
+# Função para contar os comentários de um livro
+@cronometrado
+@cache_consultas.em_cache('comentarios')
+def contar_comentarios(livro_id):
+    """Retorna quantos comentários um livro tem (coluna mantida pelos gatilhos de comentarios)."""
+    with conexao() as conn:
+        linha = conn.execute("SELECT num_comentarios FROM livros WHERE id = ?", (livro_id,)).fetchone()
+    return linha[0] if linha else 0
+
+# Função para buscar livros
+@cronometrado
+@cache_consultas.em_cache('livros')
+def buscar_livros(termo_busca, limite=100):
+    """Busca livros pelo título, autor, gênero ou sinopse, do mais ao menos relevante."""
+    consulta = montar_consulta_fts(termo_busca)
+    if not consulta:
+        with conexao() as conn:
+            return pd.read_sql_query("SELECT * FROM livros WHERE 0", conn)
+    
+    with conexao() as conn:
+        livros = pd.read_sql_query(
+            f"""
+            SELECT livros.*
+            FROM livros_fts
+            JOIN livros ON livros.id = livros_fts.rowid
+            WHERE livros_fts MATCH ?
+            ORDER BY bm25(livros_fts, {PESOS_BUSCA})
+            LIMIT ?
+            """,
+            conn,
+            params=(consulta, limite)
+        )
+    return livros
+
+# Função para obter estatísticas
+@cronometrado
+def obter_estatisticas():
+    """Retorna estatísticas sobre os livros e comentários."""
+    # Os contadores são mantidos por triggers (migração 4): uma única linha a ler
+    with conexao() as conn:
+        total_livros, soma_notas, qtd_notas, total_comentarios, total_generos = conn.execute(
+            """
+            SELECT total_livros, soma_notas, qtd_notas, total_comentarios, total_generos
+            FROM estatisticas WHERE id = 1
+            """
+        ).fetchone()
+    
+    # Nota média
+    nota_media = round(soma_notas / qtd_notas, 1) if qtd_notas else 0
+    
+    return {
+        "total_livros": total_livros,
+        "nota_media": nota_media,
+        "total_comentarios": total_comentarios,
+        "total_generos": total_generos
+    }
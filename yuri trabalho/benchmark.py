@@ -0,0 +1,471 @@
+"""Benchmark da camada de dados e das páginas do app.
+
+Gera um acervo sintético com semente fixa (o mesmo conteúdo em toda
+execução) num biblioteca.db temporário, mede cada função do banco.py e a
+renderização completa das páginas pelo AppTest do Streamlit, e grava os
+tempos em JSON para comparar entre commits. Rode dentro da pasta do app:
+
+    python benchmark.py                                  # perfil 1k
+    python benchmark.py --perfis 1k 100k --saida atual.json
+    python benchmark.py --perfis 20000x500000            # livros x comentários
+    python benchmark.py --comparar base.json atual.json  # aponta regressões
+
+Cada perfil roda num processo próprio, com BIBLIOTECA_DB apontando para o
+banco gerado: o pool de conexões, o cache e o ranking do banco.py são do
+processo e não trocam de arquivo no meio do caminho.
+
+Funções com cache são medidas duas vezes: "sem cache" (o cache de
+consultas é esvaziado antes de cada repetição) e "com cache". Durante as
+medições o cálculo de similares em segundo plano fica desligado, para não
+disputar CPU e o lock de escrita com o que está sendo medido; os similares
+do acervo são calculados antes, no preparo, só em acervos pequenos.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+# Perfis de tamanho: nome -> (livros, comentários)
+PERFIS = {
+    "1k": (1_000, 10_000),
+    "100k": (100_000, 1_000_000),
+    "1M": (1_000_000, 10_000_000),
+}
+
+SEMENTE = 42
+
+# Repetições por medição e tempo máximo gasto em cada uma (o que vier antes)
+REPETICOES = 20
+ORCAMENTO_SEGUNDOS = 5.0
+
+# Acima disto os similares não são pré-calculados (o cálculo completo é quadrático)
+LIMITE_LIVROS_SIMILARES = 20_000
+
+# Linhas por executemany na geração do acervo
+LINHAS_POR_LOTE = 50_000
+
+# Período coberto pelas datas de cadastro e de comentários
+DIAS_DE_HISTORICO = 3 * 365
+
+TAMANHO_VOCABULARIO = 5_000
+SILABAS = [
+    "ba", "be", "bi", "bo", "ca", "ce", "co", "da", "de", "do", "fa", "fe", "ga", "la", "le", "li",
+    "lo", "lu", "ma", "me", "mi", "mo", "na", "ne", "no", "pa", "pe", "po", "ra", "re", "ri", "ro",
+    "sa", "se", "si", "so", "ta", "te", "ti", "to", "va", "ve", "vi", "zo", "tra", "cri", "pla", "nho",
+]
+GENEROS = [
+    "Romance", "Ficção Científica", "Fantasia", "Não-Ficção", "Biografia",
+    "História", "Autoajuda", "Realismo Mágico", "Ficção Distópica", "Romance Clássico",
+    "Fábula", "Romance Psicológico", "Ficção Absurdista", "Modernismo", "Poema Épico",
+    "Aventura", "Outro",
+]
+
+PASTA_APP = os.path.dirname(os.path.abspath(__file__))
+
+
+def _tamanho_perfil(nome):
+    """Converte o nome de um perfil ("1k" ou "LIVROSxCOMENTARIOS") em (livros, comentários)."""
+    if nome in PERFIS:
+        return PERFIS[nome]
+    try:
+        livros, comentarios = (int(parte) for parte in nome.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"perfil inválido: {nome} (use {', '.join(PERFIS)} ou LIVROSxCOMENTARIOS)"
+        ) from None
+    return livros, comentarios
+
+
+def _palavra(rng):
+    return "".join(rng.choice(SILABAS) for _ in range(rng.randint(2, 4)))
+
+
+def _datas(rng, quantidade, agora):
+    """Gera datas aleatórias dentro do histórico, no formato usado pelo banco."""
+    inicio = agora - DIAS_DE_HISTORICO * 86400
+    for _ in range(quantidade):
+        yield time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(inicio + rng.random() * DIAS_DE_HISTORICO * 86400))
+
+
+def gerar_acervo(caminho, total_livros, total_comentarios, semente=SEMENTE):
+    """Cria em `caminho` um banco com livros e comentários sintéticos.
+
+    As linhas entram nas tabelas da migração 1 e as migrações seguintes
+    são aplicadas depois: o índice de busca, os contadores e a popularidade
+    são preenchidos de uma vez pelos próprios backfills das migrações, em
+    vez de gatilho a gatilho. Os comentários se concentram nos primeiros
+    ids (o livro 1 recebe cerca de 1% deles), como nas conversas longas de
+    livros populares. As datas são relativas ao momento da geração; o resto
+    do conteúdo depende só da semente.
+    """
+    from migracoes import MIGRACOES, aplicar_migracoes
+
+    rng = random.Random(semente)
+    agora = time.time()
+    vocabulario = [_palavra(rng) for _ in range(TAMANHO_VOCABULARIO)]
+    # Frequência das palavras segue a lei de Zipf, como num texto real
+    pesos = list(itertools.accumulate(1 / posicao for posicao in range(1, TAMANHO_VOCABULARIO + 1)))
+    autores = [
+        f"{_palavra(rng).capitalize()} {_palavra(rng).capitalize()}"
+        for _ in range(max(1, total_livros // 10))
+    ]
+    usuarios = [_palavra(rng).capitalize() for _ in range(1000)]
+
+    def texto(minimo, maximo):
+        return " ".join(rng.choices(vocabulario, cum_weights=pesos, k=rng.randint(minimo, maximo)))
+
+    def livros():
+        for i, data_adicao in enumerate(_datas(rng, total_livros, agora), start=1):
+            yield (
+                f"{texto(1, 4).capitalize()} {i}",
+                rng.choice(autores),
+                rng.randint(1800, 2025),
+                rng.choice(GENEROS),
+                texto(20, 60),
+                # Cerca de 5% dos livros ficam sem nota
+                round(rng.uniform(1.0, 5.0), 1) if rng.random() >= 0.05 else None,
+                data_adicao,
+                "",
+            )
+
+    def comentarios():
+        for data_comentario in _datas(rng, total_comentarios, agora):
+            yield (
+                1 + int(total_livros * rng.random() ** 3),
+                rng.choice(usuarios),
+                texto(5, 30),
+                data_comentario,
+            )
+
+    conn = sqlite3.connect(caminho, isolation_level=None)
+    try:
+        # Arquivo descartável: sem journal nem fsync durante a carga
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("BEGIN")
+        for passo in MIGRACOES[0][2]:
+            conn.execute(passo)
+        conn.execute(f"PRAGMA user_version = {MIGRACOES[0][0]}")
+        linhas = livros()
+        while lote := list(itertools.islice(linhas, LINHAS_POR_LOTE)):
+            conn.executemany(
+                """
+                INSERT INTO livros (titulo, autor, ano_publicacao, genero, sinopse, nota, data_adicao, capa_url)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                lote
+            )
+        linhas = comentarios()
+        while lote := list(itertools.islice(linhas, LINHAS_POR_LOTE)):
+            conn.executemany(
+                "INSERT INTO comentarios (livro_id, nome_usuario, comentario, data_comentario) VALUES (?, ?, ?, ?)",
+                lote
+            )
+        conn.execute("COMMIT")
+        aplicar_migracoes(conn)
+    finally:
+        conn.close()
+
+
+def medir(funcao, repeticoes=REPETICOES, orcamento=ORCAMENTO_SEGUNDOS, preparar=None):
+    """Executa `funcao` até `repeticoes` vezes (ou até esgotar o orçamento) e resume os tempos em ms."""
+    tempos = []
+    limite = time.perf_counter() + orcamento
+    while len(tempos) < repeticoes and (not tempos or time.perf_counter() < limite):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return {
+        "repeticoes": len(tempos),
+        "mediana_ms": round(statistics.median(tempos), 3),
+        "p95_ms": round(tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))], 3),
+        "minimo_ms": round(tempos[0], 3),
+    }
+
+
+def _cronometrar(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, round(time.perf_counter() - inicio, 3)
+
+
+def _medir_funcoes(repeticoes, orcamento):
+    """Mede as funções de leitura e escrita do banco.py sobre o acervo atual."""
+    import banco
+    import sugestoes
+    from cache import cache_consultas
+
+    # Índice das sugestões da busca, montado antes para as medidas (e o
+    # adicionar_livro abaixo) encontrarem o processo como no app
+    sugestoes.montar()
+
+    with banco.conexao() as conn:
+        total_livros = conn.execute("SELECT COUNT(*) FROM livros").fetchone()[0]
+        livro_comentado = conn.execute(
+            "SELECT id FROM livros ORDER BY num_comentarios DESC LIMIT 1"
+        ).fetchone()[0]
+        # Para a busca: a palavra mais frequente numa amostra de sinopses, e um
+        # número que só aparece no título de um livro
+        amostra = conn.execute("SELECT sinopse FROM livros LIMIT 200").fetchall()
+        comum = Counter(palavra for (sinopse,) in amostra for palavra in sinopse.split()).most_common(1)[0][0]
+        rara = str(total_livros)
+        autor = conn.execute("SELECT autor FROM livros WHERE id = ?", (max(1, total_livros // 3),)).fetchone()[0]
+    livro_medio = max(1, total_livros // 2)
+
+    def cursor_da_pagina(consultar, pagina):
+        """Segue os cursores até a página pedida (ou a última que existir)."""
+        cursor = None
+        for _ in range(pagina - 1):
+            _, proximo = consultar(cursor)
+            if proximo is None:
+                break
+            cursor = proximo
+        return cursor
+
+    cursor_livros = cursor_da_pagina(lambda c: banco.consultar_livros(cursor=c), 50)
+    cursor_comentarios = cursor_da_pagina(lambda c: banco.consultar_comentarios(livro_comentado, c), 50)
+
+    # nome -> (função, usa o cache de consultas)
+    leituras = {
+        "obter_livros": (banco.obter_livros, True),
+        "obter_livros_populares": (banco.obter_livros_populares, True),
+        "obter_livro_por_id": (lambda: banco.obter_livro_por_id(livro_medio), True),
+        "obter_livros_similares": (lambda: banco.obter_livros_similares(livro_medio), True),
+        "buscar_livros[comum]": (lambda: banco.buscar_livros(comum), True),
+        "buscar_livros[rara]": (lambda: banco.buscar_livros(rara), True),
+        "buscar_livros[prefixo]": (lambda: banco.buscar_livros(comum[:2]), True),
+        "sugerir[1 letra]": (lambda: sugestoes.sugerir(comum[:1]), False),
+        "sugerir[3 letras]": (lambda: sugestoes.sugerir(comum[:3]), False),
+        "sugerir[autor]": (lambda: sugestoes.sugerir(autor.split()[-1][:4]), False),
+        "obter_comentarios": (lambda: banco.obter_comentarios(livro_comentado), True),
+        "consultar_comentarios[pagina 1]": (lambda: banco.consultar_comentarios(livro_comentado), True),
+        "consultar_comentarios[pagina 50]": (
+            lambda: banco.consultar_comentarios(livro_comentado, cursor_comentarios), True
+        ),
+        "contar_comentarios": (lambda: banco.contar_comentarios(livro_comentado), True),
+        "obter_estatisticas": (banco.obter_estatisticas, False),
+        "consultar_livros[genero, nota >= 4]": (
+            lambda: banco.consultar_livros(generos=["Fantasia", "Romance"], nota_minima=4.0), False
+        ),
+        "consultar_livros[pagina 50]": (lambda: banco.consultar_livros(cursor=cursor_livros), False),
+    }
+    for ordenacao in banco.ORDENACOES_LIVROS:
+        leituras[f"consultar_livros[{ordenacao}]"] = (
+            lambda ordenacao=ordenacao: banco.consultar_livros(ordenar_por=ordenacao), False
+        )
+
+    resultados = {}
+    for nome, (funcao, em_cache) in leituras.items():
+        if em_cache:
+            resultados[nome] = medir(funcao, repeticoes, orcamento, preparar=cache_consultas.limpar)
+            funcao()
+            resultados[f"{nome} (cache)"] = medir(funcao, repeticoes, orcamento)
+        else:
+            resultados[nome] = medir(funcao, repeticoes, orcamento)
+
+    contador = itertools.count()
+    resultados["adicionar_comentario"] = medir(
+        lambda: banco.adicionar_comentario(livro_medio, "Benchmark", f"Comentário {next(contador)}"),
+        repeticoes, orcamento
+    )
+    resultados["adicionar_livro"] = medir(
+        lambda: banco.adicionar_livro(
+            f"Livro do benchmark {next(contador)}", "Autor do Benchmark", 2024, "Outro", "Sinopse", 4.0
+        ),
+        repeticoes, orcamento
+    )
+    return resultados, livro_comentado
+
+
+def _medir_paginas(livro_detalhes, repeticoes, orcamento):
+    """Mede a execução completa do app.py em cada página, com e sem o cache de consultas."""
+    import streamlit_option_menu
+    from streamlit.testing.v1 import AppTest
+    from cache import cache_consultas
+
+    # O menu é um componente do navegador, que o AppTest não executa:
+    # a página é escolhida devolvendo o rótulo dela no lugar do clique
+    pagina_escolhida = ["Início"]
+    streamlit_option_menu.option_menu = lambda *args, **kwargs: pagina_escolhida[0]
+
+    paginas = {
+        "Início": {},
+        "Explorar": {},
+        "Detalhes": {"livro_selecionado": livro_detalhes},
+        "Adicionar Livro": {},
+        "Sobre": {},
+    }
+    resultados = {}
+    for pagina, estado in paginas.items():
+        pagina_escolhida[0] = pagina
+
+        def executar():
+            app = AppTest.from_file(os.path.join(PASTA_APP, "app.py"), default_timeout=300)
+            for chave, valor in estado.items():
+                app.session_state[chave] = valor
+            app.run()
+            if app.exception:
+                raise RuntimeError(f"{pagina}: {app.exception[0].value}")
+
+        executar()
+        resultados[pagina] = medir(executar, repeticoes, orcamento, preparar=cache_consultas.limpar)
+        resultados[f"{pagina} (cache)"] = medir(executar, repeticoes, orcamento)
+    return resultados
+
+
+def executar_perfil(nome, semente, repeticoes, orcamento):
+    """Gera o acervo de um perfil em BIBLIOTECA_DB e o mede (roda no processo filho)."""
+    total_livros, total_comentarios = _tamanho_perfil(nome)
+    caminho = os.environ["BIBLIOTECA_DB"]
+    preparo = {}
+
+    _, preparo["gerar_acervo_s"] = _cronometrar(
+        lambda: gerar_acervo(caminho, total_livros, total_comentarios, semente)
+    )
+    preparo["tamanho_banco_mb"] = round(os.path.getsize(caminho) / 2**20, 1)
+
+    import banco
+    import similares
+
+    _, preparo["inicializar_banco_s"] = _cronometrar(banco.inicializar_banco)
+    if total_livros <= LIMITE_LIVROS_SIMILARES:
+        _, preparo["similares_s"] = _cronometrar(similares.incorporar_pendentes)
+    similares.desligar_atualizacao()
+
+    funcoes, livro_comentado = _medir_funcoes(repeticoes, orcamento)
+    paginas = _medir_paginas(livro_comentado, repeticoes, orcamento)
+    return {
+        "livros": total_livros,
+        "comentarios": total_comentarios,
+        "semente": semente,
+        "preparo": preparo,
+        "funcoes": funcoes,
+        "paginas": paginas,
+        "escritor": banco.escritor.estatisticas(),
+    }
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PASTA_APP, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executar_benchmark(perfis, semente=SEMENTE, repeticoes=REPETICOES, orcamento=ORCAMENTO_SEGUNDOS, pasta=None):
+    """Roda cada perfil num processo separado e retorna o relatório completo."""
+    relatorio = {
+        "commit": _commit_atual(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "plataforma": platform.platform(),
+        "perfis": {},
+    }
+    pasta_temporaria = tempfile.mkdtemp(prefix="benchmark_", dir=pasta)
+    try:
+        for nome in perfis:
+            print(f"Perfil {nome}...", file=sys.stderr, flush=True)
+            arquivo_resultado = os.path.join(pasta_temporaria, f"{nome}.json")
+            subprocess.run(
+                [
+                    sys.executable, os.path.abspath(__file__), "--executar-perfil", nome,
+                    "--semente", str(semente), "--repeticoes", str(repeticoes),
+                    "--orcamento", str(orcamento), "--saida", arquivo_resultado,
+                ],
+                cwd=PASTA_APP,
+                env=dict(os.environ, BIBLIOTECA_DB=os.path.join(pasta_temporaria, f"{nome}.db")),
+                check=True,
+            )
+            with open(arquivo_resultado, encoding="utf-8") as arquivo:
+                relatorio["perfis"][nome] = json.load(arquivo)
+    finally:
+        shutil.rmtree(pasta_temporaria, ignore_errors=True)
+    return relatorio
+
+
+def comparar(base, atual, tolerancia=0.2):
+    """Compara as medianas de dois relatórios; retorna as linhas da comparação e as regressões."""
+    linhas, regressoes = [], []
+    for perfil, medicoes_atuais in atual["perfis"].items():
+        medicoes_base = base["perfis"].get(perfil)
+        if medicoes_base is None:
+            continue
+        for grupo in ("funcoes", "paginas"):
+            for nome, medicao in medicoes_atuais[grupo].items():
+                anterior = medicoes_base[grupo].get(nome)
+                if anterior is None:
+                    continue
+                razao = medicao["mediana_ms"] / anterior["mediana_ms"] if anterior["mediana_ms"] else 1.0
+                linha = f"{perfil:>8} {nome:<45} {anterior['mediana_ms']:>10.2f} {medicao['mediana_ms']:>10.2f} {razao:>6.2f}x"
+                if razao > 1 + tolerancia:
+                    linha += "  REGRESSÃO"
+                    regressoes.append((perfil, nome, razao))
+                linhas.append(linha)
+    return linhas, regressoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark da camada de dados e das páginas do app.")
+    parser.add_argument("--perfis", nargs="+", default=["1k"], type=str,
+                        help=f"tamanhos do acervo: {', '.join(PERFIS)} ou LIVROSxCOMENTARIOS")
+    parser.add_argument("--semente", type=int, default=SEMENTE, help="semente do gerador de acervo")
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES, help="repetições por medição")
+    parser.add_argument("--orcamento", type=float, default=ORCAMENTO_SEGUNDOS,
+                        help="segundos máximos gastos em cada medição")
+    parser.add_argument("--pasta", help="onde criar os bancos temporários (padrão: pasta temporária do sistema)")
+    parser.add_argument("--saida", help="arquivo JSON de resultado (padrão: saída padrão)")
+    parser.add_argument("--comparar", nargs=2, metavar=("BASE", "ATUAL"), help="compara dois resultados em JSON")
+    parser.add_argument("--tolerancia", type=float, default=0.2,
+                        help="aumento relativo da mediana considerado regressão (padrão: 0.2)")
+    parser.add_argument("--executar-perfil", help=argparse.SUPPRESS)
+    argumentos = parser.parse_args()
+
+    if argumentos.comparar:
+        with open(argumentos.comparar[0], encoding="utf-8") as arquivo:
+            base = json.load(arquivo)
+        with open(argumentos.comparar[1], encoding="utf-8") as arquivo:
+            atual = json.load(arquivo)
+        linhas, regressoes = comparar(base, atual, argumentos.tolerancia)
+        print(f"{'perfil':>8} {'medição':<45} {'base ms':>10} {'atual ms':>10} {'razão':>7}")
+        print("\n".join(linhas))
+        print(f"{len(regressoes)} regressões acima de {argumentos.tolerancia:.0%}")
+        sys.exit(1 if regressoes else 0)
+
+    if argumentos.executar_perfil:
+        resultado = executar_perfil(
+            argumentos.executar_perfil, argumentos.semente,
+            argumentos.repeticoes, argumentos.orcamento,
+        )
+    else:
+        for nome in argumentos.perfis:
+            try:
+                _tamanho_perfil(nome)
+            except argparse.ArgumentTypeError as erro:
+                parser.error(str(erro))
+        resultado = executar_benchmark(
+            argumentos.perfis, argumentos.semente, argumentos.repeticoes, argumentos.orcamento, argumentos.pasta
+        )
+
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if argumentos.saida:
+        with open(argumentos.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto + "\n")
+    else:
+        print(texto)
@@ -0,0 +1,126 @@
+"""Cache em memória dos resultados das funções de leitura do banco.
+
+Cada entrada é identificada pela função, pelos argumentos e pela geração
+atual das tabelas que a função lê. As funções de escrita chamam
+`invalidar(tabela)` depois do commit, o que incrementa a geração: as
+entradas antigas deixam de ser encontradas e acabam descartadas pela
+política LRU, que respeita um limite de memória.
+"""
+import sys
+import threading
+from collections import OrderedDict
+from functools import wraps
+import pandas as pd
+
+# Memória máxima ocupada pelos resultados em cache
+LIMITE_MEMORIA_CACHE = 64 * 1024 * 1024  # 64 MB
+
+
+def tamanho_estimado(valor):
+    """Estima em bytes a memória ocupada por um resultado."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(index=True, deep=True))
+    # Ex.: (DataFrame, cursor) das consultas paginadas
+    if isinstance(valor, (tuple, list)):
+        return sys.getsizeof(valor) + sum(tamanho_estimado(item) for item in valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho_estimado(k) + tamanho_estimado(v) for k, v in valor.items())
+    return sys.getsizeof(valor)
+
+
+class CacheConsultas:
+    """Cache LRU com orçamento de memória e invalidação por geração de tabela."""
+
+    def __init__(self, limite_bytes=LIMITE_MEMORIA_CACHE):
+        self.limite_bytes = limite_bytes
+        self._entradas = OrderedDict()  # chave -> (valor, tamanho)
+        self._geracoes = {}             # tabela -> geração atual
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+
+    def geracao(self, tabela):
+        """Retorna a geração atual de uma tabela."""
+        return self._geracoes.get(tabela, 0)
+
+    def invalidar(self, *tabelas):
+        """Marca as tabelas como alteradas; deve ser chamada depois do commit."""
+        with self._lock:
+            for tabela in tabelas:
+                self._geracoes[tabela] = self._geracoes.get(tabela, 0) + 1
+
+    def limpar(self):
+        """Remove todas as entradas, mantendo as gerações e os contadores."""
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def obter(self, chave):
+        """Retorna (True, valor) se a chave estiver em cache, senão (False, None)."""
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.falhas += 1
+                return False, None
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return True, entrada[0]
+
+    def guardar(self, chave, valor):
+        """Guarda um resultado, descartando os menos usados se faltar memória."""
+        tamanho = tamanho_estimado(valor)
+        if tamanho > self.limite_bytes:
+            return
+        with self._lock:
+            anterior = self._entradas.pop(chave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+            self._entradas[chave] = (valor, tamanho)
+            self._bytes += tamanho
+            while self._bytes > self.limite_bytes:
+                _, (_, tamanho_removido) = self._entradas.popitem(last=False)
+                self._bytes -= tamanho_removido
+                self.descartes += 1
+
+    def estatisticas(self):
+        """Retorna os contadores do cache."""
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "descartes": self.descartes,
+            }
+
+    def em_cache(self, *tabelas):
+        """Decorador que guarda o resultado da função enquanto as tabelas lidas não mudarem.
+
+        O resultado é compartilhado entre as chamadas: quem o recebe não deve
+        modificá-lo no lugar.
+        """
+        def decorador(funcao):
+            @wraps(funcao)
+            def envoltorio(*args, **kwargs):
+                # A geração é lida antes da consulta: se uma escrita acontecer
+                # no meio, o resultado já nasce com uma geração vencida
+                geracoes = tuple(self.geracao(tabela) for tabela in tabelas)
+                chave = (funcao.__qualname__, args, tuple(sorted(kwargs.items())), geracoes)
+                encontrado, valor = self.obter(chave)
+                if encontrado:
+                    return valor
+                valor = funcao(*args, **kwargs)
+                self.guardar(chave, valor)
+                return valor
+            return envoltorio
+        return decorador
+
+
+# Cache compartilhado por todas as sessões do processo
+cache_consultas = CacheConsultas()
@@ -0,0 +1,217 @@
+"""Cache local das capas e geração de miniaturas.
+
+Cada capa remota é baixada uma única vez, em segundo plano, e guardada pelo
+hash do seu conteúdo. A partir dela são geradas versões WebP no tamanho da
+grade e no tamanho da página de detalhes, servidas pelo próprio Streamlit
+em app/static/capas. Como o nome do arquivo muda junto com o conteúdo, as
+URLs levam `?v=` e podem ficar em cache no navegador por tempo longo.
+
+Enquanto a capa não foi processada, a página usa a URL original; livros
+sem capa usam uma imagem padrão gerada localmente.
+
+A URL vem do formulário, então o download só aceita http(s) para endereços
+públicos (também em cada redirecionamento), para no TAMANHO_MAXIMO e recusa
+imagens acima de MAX_PIXELS antes de decodificá-las.
+"""
+import hashlib
+import io
+import ipaddress
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urljoin, urlsplit
+import requests
+from PIL import Image, ImageDraw, ImageOps
+from banco import conexao, escritor
+from metricas import cronometrado
+
+PASTA_APP = os.path.dirname(os.path.abspath(__file__))
+
+# Originais baixados, nomeados pelo hash do conteúdo
+PASTA_ORIGINAIS = os.path.join(PASTA_APP, 'cache', 'capas')
+
+# Miniaturas servidas pelo Streamlit em app/static/capas
+PASTA_MINIATURAS = os.path.join(PASTA_APP, 'static', 'capas')
+URL_MINIATURAS = 'app/static/capas'
+
+# Variantes geradas: nome -> (largura, altura) em pixels, proporção 2:3
+VARIANTES = {
+    "grade": (240, 360),
+    "detalhe": (450, 675),
+}
+QUALIDADE_WEBP = 80
+
+# Tempo limite do download: (conexão, leitura) em segundos
+TEMPO_LIMITE = (3, 10)
+
+# Limites do download: bytes do arquivo, pixels da imagem e redirecionamentos seguidos
+TAMANHO_MAXIMO = 10 * 1024 * 1024
+MAX_PIXELS = 40_000_000
+MAX_REDIRECIONAMENTOS = 3
+
+# Espera antes de tentar de novo uma capa que falhou
+ESPERA_NOVA_TENTATIVA = 60 * 60  # 1 hora
+
+_lock = threading.Lock()
+_hashes = None        # url -> hash do conteúdo (espelho da tabela capas)
+_pendentes = set()    # URLs sendo baixadas
+_falhas = {}          # url -> instante da última falha
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="capas")
+
+
+def _carregar_hashes():
+    """Carrega da tabela capas o mapa url -> hash, uma vez por processo."""
+    global _hashes
+    with _lock:
+        if _hashes is not None:
+            return _hashes
+    with conexao() as conn:
+        mapa = dict(conn.execute("SELECT url, hash FROM capas").fetchall())
+    with _lock:
+        if _hashes is None:
+            _hashes = mapa
+        return _hashes
+
+
+def _caminho_miniatura(nome, variante):
+    return os.path.join(PASTA_MINIATURAS, f"{nome}-{variante}.webp")
+
+
+def _url_miniatura(nome, variante):
+    return f"{URL_MINIATURAS}/{nome}-{variante}.webp?v={nome[:12]}"
+
+
+def _gerar_miniaturas(imagem, nome):
+    """Grava as variantes WebP de uma imagem, recortadas na proporção da capa."""
+    os.makedirs(PASTA_MINIATURAS, exist_ok=True)
+    imagem = imagem.convert("RGB")
+    for variante, tamanho in VARIANTES.items():
+        caminho = _caminho_miniatura(nome, variante)
+        if os.path.exists(caminho):
+            continue
+        miniatura = ImageOps.fit(imagem, tamanho, method=Image.LANCZOS)
+        temporario = f"{caminho}.{threading.get_ident()}.tmp"
+        miniatura.save(temporario, "WEBP", quality=QUALIDADE_WEBP, method=6)
+        os.replace(temporario, caminho)
+
+
+def url_permitida(url):
+    """Indica se a URL é http(s) com host (não diz nada sobre o endereço dele)."""
+    partes = urlsplit(url)
+    return partes.scheme in ("http", "https") and bool(partes.hostname)
+
+
+def _validar_destino(url):
+    """Levanta ValueError se a URL não for http(s) ou se o host resolver para um endereço não público."""
+    if not url_permitida(url):
+        raise ValueError(f"URL de capa não permitida: {url}")
+    partes = urlsplit(url)
+    for *_, endereco in socket.getaddrinfo(partes.hostname, partes.port or 443, proto=socket.IPPROTO_TCP):
+        if not ipaddress.ip_address(endereco[0].split("%")[0]).is_global:
+            raise ValueError(f"Capa em endereço interno: {url}")
+
+
+def _baixar(url):
+    """Baixa o conteúdo da URL em partes, seguindo redirecionamentos validados, até TAMANHO_MAXIMO bytes."""
+    for _ in range(MAX_REDIRECIONAMENTOS + 1):
+        _validar_destino(url)
+        with requests.get(url, timeout=TEMPO_LIMITE, stream=True, allow_redirects=False) as resposta:
+            if resposta.is_redirect:
+                url = urljoin(url, resposta.headers["Location"])
+                continue
+            resposta.raise_for_status()
+            if int(resposta.headers.get("Content-Length") or 0) > TAMANHO_MAXIMO:
+                raise ValueError(f"Capa maior que {TAMANHO_MAXIMO} bytes: {url}")
+            partes, total = [], 0
+            for parte in resposta.iter_content(64 * 1024):
+                total += len(parte)
+                if total > TAMANHO_MAXIMO:
+                    raise ValueError(f"Capa maior que {TAMANHO_MAXIMO} bytes: {url}")
+                partes.append(parte)
+            return b"".join(partes)
+    raise ValueError(f"Redirecionamentos demais: {url}")
+
+
+@cronometrado
+def processar_capa(url):
+    """Baixa uma capa, guarda o original pelo hash e gera as miniaturas. Retorna o hash."""
+    conteudo = _baixar(url)
+    # Image.open só lê o cabeçalho: o tamanho é conferido antes de decodificar
+    imagem = Image.open(io.BytesIO(conteudo))
+    if imagem.width * imagem.height > MAX_PIXELS:
+        raise ValueError(f"Capa com pixels demais ({imagem.width}x{imagem.height}): {url}")
+    hash_conteudo = hashlib.sha256(conteudo).hexdigest()
+
+    os.makedirs(PASTA_ORIGINAIS, exist_ok=True)
+    caminho_original = os.path.join(PASTA_ORIGINAIS, hash_conteudo)
+    if not os.path.exists(caminho_original):
+        with open(caminho_original, "wb") as arquivo:
+            arquivo.write(conteudo)
+
+    _gerar_miniaturas(imagem, hash_conteudo)
+
+    escritor.executar(
+        "INSERT OR REPLACE INTO capas (url, hash, data_download) VALUES (?, ?, ?)",
+        (url, hash_conteudo, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    )
+    return hash_conteudo
+
+
+def _processar_em_segundo_plano(url):
+    try:
+        hash_conteudo = processar_capa(url)
+    except Exception:
+        with _lock:
+            _falhas[url] = time.time()
+            _pendentes.discard(url)
+        return
+    with _lock:
+        _hashes[url] = hash_conteudo
+        _pendentes.discard(url)
+
+
+def _agendar(url):
+    """Agenda o download de uma capa, no máximo uma vez ao mesmo tempo."""
+    with _lock:
+        if url in _pendentes:
+            return
+        falha = _falhas.get(url)
+        if falha is not None and time.time() - falha < ESPERA_NOVA_TENTATIVA:
+            return
+        _pendentes.add(url)
+    _executor.submit(_processar_em_segundo_plano, url)
+
+
+def _url_padrao(variante):
+    """Retorna a capa padrão (gerada na primeira vez) para livros sem capa."""
+    if not os.path.exists(_caminho_miniatura("padrao", variante)):
+        largura, altura = VARIANTES[variante]
+        imagem = Image.new("RGB", (largura, altura))
+        desenho = ImageDraw.Draw(imagem)
+        # Degradê vertical nas cores do tema
+        inicio, fim = (124, 58, 237), (91, 33, 182)
+        for y in range(altura):
+            t = y / (altura - 1)
+            desenho.line([(0, y), (largura, y)], fill=tuple(round(a + (b - a) * t) for a, b in zip(inicio, fim)))
+        margem = largura // 6
+        desenho.rectangle([margem, altura // 3, largura - margem, altura // 3 + altura // 40], fill=(255, 255, 255))
+        desenho.rectangle([margem, altura // 3 + altura // 20, largura - 2 * margem, altura // 3 + altura // 20 + altura // 60], fill=(236, 72, 153))
+        with _lock:
+            _gerar_miniaturas(imagem, "padrao")
+    return _url_miniatura("padrao", variante)
+
+
+def url_capa(capa_url, variante="grade"):
+    """Retorna a URL a usar no <img>: a miniatura local se já existir, senão a original."""
+    if not capa_url or not isinstance(capa_url, str) or not url_permitida(capa_url):
+        return _url_padrao(variante)
+
+    hash_conteudo = _carregar_hashes().get(capa_url)
+    if hash_conteudo is not None:
+        return _url_miniatura(hash_conteudo, variante)
+
+    _agendar(capa_url)
+    return capa_url
@@ -0,0 +1,70 @@
+"""Lista de comentários da página de detalhes, carregada aos poucos.
+
+Os comentários chegam em páginas pequenas, por cursor (ver
+banco.consultar_comentarios), e cada página vira um único bloco HTML. O
+botão "Carregar mais" só acrescenta o cursor da próxima página à lista
+guardada no session_state; as páginas já vistas saem do cache de
+consultas. Assim o custo da página depende de quantos comentários foram
+abertos, e não de quantos o livro tem.
+"""
+import streamlit as st
+from grade import texto_html
+from repositorio import obter_repositorio
+from metricas import cronometrado
+
+
+@cronometrado
+def html_comentarios(comentarios):
+    """Monta o HTML de uma página de comentários de uma vez, a partir das colunas do DataFrame."""
+    if comentarios.empty:
+        return ""
+
+    caixas = (
+        '<div class="comment-box">'
+        + '<div class="comment-author">' + texto_html(comentarios["nome_usuario"]) + '</div>'
+        + '<div class="comment-date">' + texto_html(comentarios["data_comentario"]) + '</div>'
+        + '<div class="comment-content">' + texto_html(comentarios["comentario"]) + '</div>'
+        + '</div>'
+    )
+    return "".join(caixas.tolist())
+
+
+def _chave_cursores(livro_id):
+    return f"comentarios_{livro_id}_cursores"
+
+
+def reiniciar_comentarios(livro_id):
+    """Volta a lista de comentários do livro para a primeira página (ex.: após um novo comentário)."""
+    st.session_state.pop(_chave_cursores(livro_id), None)
+
+
+@cronometrado
+def renderizar_comentarios(livro_id):
+    """Exibe os comentários já abertos de um livro e o botão para carregar os próximos."""
+    repositorio = obter_repositorio()
+    total = repositorio.contar_comentarios(livro_id)
+    if total == 0:
+        st.info("Ainda não há comentários para este livro. Seja o primeiro a comentar!")
+        return
+
+    # Cursores das páginas abertas: None é a primeira página
+    cursores = st.session_state.setdefault(_chave_cursores(livro_id), [None])
+
+    exibidos = 0
+    proximo_cursor = None
+    for cursor in cursores:
+        comentarios, proximo_cursor = repositorio.consultar_comentarios(livro_id, cursor)
+        st.markdown(html_comentarios(comentarios), unsafe_allow_html=True)
+        exibidos += len(comentarios)
+
+    if proximo_cursor is not None:
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            if st.button("Carregar mais", key=f"comentarios_{livro_id}_mais"):
+                cursores.append(proximo_cursor)
+                st.rerun()
+        with col2:
+            st.markdown(
+                f'<p style="color: #64748b;">Exibindo {exibidos} de {total} comentários</p>',
+                unsafe_allow_html=True
+            )
@@ -0,0 +1,175 @@
+"""Verifica se os backends do repositorio.py devolvem os mesmos resultados.
+
+Gera um acervo sintético (o mesmo gerador do benchmark.py) num banco
+temporário, acrescenta casos de borda (livros sem nota, gênero ou ano,
+comentários sem data) e compara, operação por operação, cada backend de
+repositorio.BACKENDS com o RepositorioSQLite: todas as páginas de cada
+ordenação da página Explorar, filtros, populares, similares, páginas de
+comentários, contagens, estatísticas e busca, antes e depois de escritas.
+
+O teste tests/test_conformidade.py roda estas verificações num acervo
+pequeno a cada `pytest`. Esta linha de comando fica para acervos maiores;
+rode dentro da pasta do app:
+
+    python conformidade.py
+    python conformidade.py --livros 5000 --comentarios 50000
+
+Sai com código 1 se alguma verificação falhar.
+"""
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+
+
+def _igual(esperado, obtido):
+    """Compara dois resultados (DataFrame, cursor, número ou dicionário); retorna a diferença ou None."""
+    import pandas as pd
+
+    if isinstance(esperado, tuple) and len(esperado) == 2 and isinstance(esperado[0], pd.DataFrame):
+        return _igual(esperado[0], obtido[0]) or _igual(esperado[1], obtido[1])
+    if isinstance(esperado, pd.DataFrame):
+        # Os tipos e a forma do valor ausente podem diferir (int64 e None no SQLite,
+        # float64 e NaN no DuckDB); os valores não
+        def normalizar(tabela):
+            tabela = tabela.reset_index(drop=True).astype(object)
+            return tabela.where(tabela.notna(), None)
+
+        try:
+            pd.testing.assert_frame_equal(normalizar(esperado), normalizar(obtido), check_dtype=False)
+        except AssertionError as erro:
+            return str(erro)
+        return None
+    return None if esperado == obtido else f"{esperado!r} != {obtido!r}"
+
+
+def _acrescentar_casos_de_borda(caminho):
+    import sqlite3
+
+    conn = sqlite3.connect(caminho)
+    with conn:
+        conn.executemany(
+            "INSERT INTO livros (titulo, autor, ano_publicacao, genero, sinopse, nota, data_adicao) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                ("Sem nota", "Autor Borda", None, None, None, None, None),
+                ("Sem gênero", "Autor Borda", None, None, "Sinopse", 4.5, "2020-01-01 00:00:00"),
+                ("Empate", "Autor Borda", 2000, "Fantasia", "Sinopse", 4.5, "2020-01-01 00:00:00"),
+            ]
+        )
+        conn.executemany(
+            "INSERT INTO comentarios (livro_id, nome_usuario, comentario, data_comentario) VALUES (?, ?, ?, ?)",
+            [(1, "Borda", f"Sem data {i}", None) for i in range(30)]
+        )
+    conn.close()
+
+
+def preparar_acervo(total_livros, total_comentarios):
+    """Gera o acervo em BIBLIOTECA_DB, que precisa estar definida antes de importar o banco."""
+    from benchmark import gerar_acervo
+
+    gerar_acervo(os.environ["BIBLIOTECA_DB"], total_livros, total_comentarios)
+    _acrescentar_casos_de_borda(os.environ["BIBLIOTECA_DB"])
+
+    import banco
+    import similares
+
+    banco.inicializar_banco()
+    # Os similares são calculados aqui, fora do segundo plano, para não mudarem no meio de uma comparação
+    similares.desligar_atualizacao()
+    similares.incorporar_pendentes()
+
+
+def verificar(backend, total_livros):
+    """Compara o backend com o RepositorioSQLite no acervo de preparar_acervo.
+
+    Retorna o número de verificações e a lista de falhas (nome, diferença).
+    As escritas feitas no caminho ficam no banco.
+    """
+    import banco
+    import similares
+    from repositorio import BACKENDS, RepositorioSQLite
+
+    sqlite, outro = RepositorioSQLite(), BACKENDS[backend]()
+    falhas = []
+    verificacoes = [0]
+
+    def comparar(nome, operacao):
+        verificacoes[0] += 1
+        diferenca = _igual(operacao(sqlite), operacao(outro))
+        if diferenca is not None:
+            falhas.append((nome, diferenca))
+
+    def comparar_paginas(nome, consultar):
+        """Percorre todas as páginas com os cursores do SQLite e compara cada uma."""
+        cursor = None
+        for pagina in itertools.count(1):
+            comparar(f"{nome} página {pagina}", lambda repositorio: consultar(repositorio, cursor))
+            _, cursor = consultar(sqlite, cursor)
+            if cursor is None:
+                break
+
+    def comparar_tudo(etapa):
+        for ordenacao in banco.ORDENACOES_LIVROS:
+            comparar_paginas(
+                f"{etapa}: consultar_livros[{ordenacao}]",
+                lambda repositorio, cursor: repositorio.consultar_livros(ordenar_por=ordenacao, cursor=cursor)
+            )
+            comparar_paginas(
+                f"{etapa}: consultar_livros[{ordenacao}, Fantasia/Romance, nota >= 3.5]",
+                lambda repositorio, cursor: repositorio.consultar_livros(
+                    generos=["Fantasia", "Romance"], nota_minima=3.5, ordenar_por=ordenacao, cursor=cursor
+                ),
+            )
+        # Páginas pequenas para cruzar os blocos de comentários com e sem data
+        comparar_paginas(
+            f"{etapa}: consultar_comentarios[livro 1]",
+            lambda repositorio, cursor: repositorio.consultar_comentarios(1, cursor, tamanho_pagina=7),
+        )
+        for livro_id in (1, 2, total_livros // 2, total_livros, total_livros + 1, total_livros + 10):
+            comparar(f"{etapa}: obter_livro_por_id({livro_id})", lambda r: r.obter_livro_por_id(livro_id))
+            comparar(f"{etapa}: contar_comentarios({livro_id})", lambda r: r.contar_comentarios(livro_id))
+            comparar(f"{etapa}: obter_livros_similares({livro_id})", lambda r: r.obter_livros_similares(livro_id))
+            comparar(f"{etapa}: consultar_comentarios({livro_id})", lambda r: r.consultar_comentarios(livro_id))
+        for limite in (1, 6, 50, 200):
+            comparar(f"{etapa}: obter_livros_populares({limite})", lambda r: r.obter_livros_populares(limite))
+        for termo in ("ba", "borda", "sem nota", str(total_livros), ""):
+            comparar(f"{etapa}: buscar_livros({termo!r})", lambda r: r.buscar_livros(termo))
+        comparar(f"{etapa}: obter_estatisticas", lambda r: r.obter_estatisticas())
+
+    comparar_tudo("inicial")
+
+    # Escritas por um backend devem aparecer iguais nos dois
+    sqlite.adicionar_comentario(2, "Conformidade", "Comentário pelo SQLite")
+    outro.adicionar_comentario(3, "Conformidade", f"Comentário pelo {backend}")
+    outro.adicionar_livro(f"Livro novo ({backend})", "Autor Novo", 2024, "Outro", "Sinopse nova", 5.0)
+    similares.incorporar_pendentes()
+    comparar_tudo("após escritas")
+
+    return verificacoes[0], falhas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara os backends SQLite e DuckDB do repositório.")
+    parser.add_argument("--livros", type=int, default=1000, help="livros do acervo sintético")
+    parser.add_argument("--comentarios", type=int, default=10000, help="comentários do acervo sintético")
+    argumentos = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="conformidade_") as pasta:
+        # Antes de importar o banco: o caminho é lido na importação
+        os.environ["BIBLIOTECA_DB"] = os.path.join(pasta, "biblioteca.db")
+        os.environ["BIBLIOTECA_METRICAS"] = ""
+        preparar_acervo(argumentos.livros, argumentos.comentarios)
+        from repositorio import BACKENDS
+
+        falhou = False
+        for backend in BACKENDS:
+            if backend == "sqlite":
+                continue
+            total, falhas = verificar(backend, argumentos.livros)
+            for nome, diferenca in falhas:
+                print(f"FALHA {backend}: {nome}\n{diferenca}\n")
+            print(f"{backend}: {total - len(falhas)} de {total} verificações iguais ao SQLite")
+            falhou = falhou or bool(falhas)
+
+    sys.exit(1 if falhou else 0)
@@ -0,0 +1,42 @@
+"""Painel de depuração com o tempo de cada trecho do rerun atual.
+
+Desligado por padrão; aparece na barra lateral quando a URL do app tem
+`?depuracao=1`. Os trechos de mesmo nome (ex.: várias grades numa página)
+aparecem somados numa linha, na posição em que o primeiro começou. A linha
+"fora dos trechos" é o tempo do rerun não coberto por nenhum trecho de
+primeiro nível: o restante do script, os widgets e o próprio Streamlit.
+"""
+import pandas as pd
+import streamlit as st
+
+
+def depuracao_ativa():
+    """Retorna True se a página foi aberta com ?depuracao=1."""
+    return st.query_params.get("depuracao") == "1"
+
+
+def tabela_trechos(trechos, total):
+    """Resume os trechos de um rerun em um DataFrame (trecho, chamadas, ms)."""
+    linhas = {}
+    medido = 0.0
+    for nome, segundos, profundidade in trechos:
+        if segundos is None:
+            continue
+        if profundidade == 0:
+            medido += segundos
+        linha = linhas.setdefault(nome, {"trecho": "  " * profundidade + nome, "chamadas": 0, "ms": 0.0})
+        linha["chamadas"] += 1
+        linha["ms"] += segundos * 1000
+    tabela = pd.DataFrame(
+        list(linhas.values()) + [{"trecho": "fora dos trechos", "chamadas": 1, "ms": max(total - medido, 0) * 1000}],
+        columns=["trecho", "chamadas", "ms"],
+    )
+    tabela["ms"] = tabela["ms"].round(2)
+    return tabela
+
+
+def renderizar_painel(trechos, total):
+    """Mostra na barra lateral o tempo total do rerun e o de cada trecho."""
+    with st.sidebar.expander("⏱️ Tempo deste rerun", expanded=True):
+        st.markdown(f"**Total:** {total * 1000:.1f} ms")
+        st.dataframe(tabela_trechos(trechos, total), hide_index=True)
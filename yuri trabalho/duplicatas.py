@@ -0,0 +1,248 @@
+"""Detecção de livros quase duplicados pelo título e autor.
+
+Título e autor são normalizados (sem acentos, pontuação ou maiúsculas) e
+quebrados em trigramas de caracteres. Dois livros são quase duplicados
+quando a similaridade de Jaccard entre os conjuntos de trigramas passa de
+LIMIAR: um erro de digitação num título médio troca só dois ou três dos
+trinta e poucos trigramas. O algoritmo e as constantes ficam em
+compartilhado/semelhanca.py, o pacote comum com o app de análises da raiz;
+aqui ficam as tabelas dos livros e a indexação em segundo plano.
+
+Para não comparar com o acervo inteiro, cada livro tem uma assinatura
+MinHash de ASSINATURAS valores (tabela livros_minhash, migração 9),
+dividida em BANDAS faixas cujo hash vai para livros_assinaturas. Livros
+que coincidem em ao menos uma faixa são candidatos; com 10 faixas de 3
+valores, um par com Jaccard 0,7 vira candidato em 98,5% das vezes, e um
+par com 0,3, em 24%. A fração de valores iguais nas assinaturas estima o
+Jaccard dos candidatos de uma vez (numpy), e só os que passam perto do
+LIMIAR têm os trigramas comparados.
+
+Livros novos são indexados na hora (ver banco.adicionar_livro); os
+importados e os que já existiam, em segundo plano. Para listar os grupos
+de duplicatas do acervo inteiro:
+
+    python duplicatas.py --grupos
+    python duplicatas.py --grupos --limiar 0.8
+"""
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from banco import conexao, escritor
+from semelhanca import (
+    ASSINATURAS, LIMIAR, MARGEM_ESTIMATIVA, MAX_CANDIDATOS, agrupar, assinatura, chaves, confirmar, trigramas
+)
+
+# Pares estimados de uma vez no modo em lote
+PARES_POR_BLOCO = 1_000_000
+
+# Faixas com mais livros que isto são ignoradas no modo em lote: quase
+# sempre são trigramas comuns a todo o acervo, e os pares cresceriam ao quadrado
+MAX_LIVROS_POR_FAIXA = 200
+
+# Livros lidos e indexados por vez em indexar_pendentes
+LIVROS_POR_LOTE = 20000
+
+# Livros por transação do escritor: as outras escritas do app não esperam pelo lote inteiro
+LIVROS_POR_GRAVACAO = 500
+
+_lock = threading.Lock()
+_indexacao_agendada = False
+_indexacao_iniciada = False
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="duplicatas")
+
+
+def _linhas_indice(livros):
+    """Linhas de livros_minhash (livro_id, assinatura) e de livros_assinaturas (chave, livro_id)."""
+    assinaturas, faixas = [], []
+    for livro_id, titulo, autor in livros:
+        valores = assinatura(trigramas(titulo, autor))
+        assinaturas.append((livro_id, valores.tobytes()))
+        faixas.extend((chave, livro_id) for chave in chaves(valores))
+    return assinaturas, faixas
+
+
+# Função para procurar livros parecidos antes de adicionar um novo
+def possiveis_duplicatas(titulo, autor, limite=5, limiar=LIMIAR):
+    """Retorna até `limite` livros parecidos, como dicionários (id, titulo, autor, similaridade)."""
+    conjunto = trigramas(titulo, autor)
+    valores = assinatura(conjunto)
+    chaves_livro = chaves(valores)
+    with conexao() as conn:
+        candidatos = conn.execute(
+            f"""
+            SELECT l.id, l.titulo, l.autor, m.assinatura FROM (
+                SELECT livro_id, COUNT(*) AS faixas FROM livros_assinaturas
+                WHERE chave IN ({', '.join('?' * len(chaves_livro))})
+                GROUP BY livro_id ORDER BY faixas DESC LIMIT ?
+            ) c
+            JOIN livros l ON l.id = c.livro_id
+            JOIN livros_minhash m ON m.livro_id = c.livro_id
+            """,
+            chaves_livro + [MAX_CANDIDATOS]
+        ).fetchall()
+    parecidos = []
+    for posicao, similaridade in confirmar(conjunto, valores, [linha[1:] for linha in candidatos], limiar):
+        livro_id, titulo_livro, autor_livro, _ = candidatos[posicao]
+        parecidos.append({"id": livro_id, "titulo": titulo_livro, "autor": autor_livro,
+                          "similaridade": round(similaridade, 3)})
+    parecidos.sort(key=lambda livro: (-livro["similaridade"], livro["id"]))
+    return parecidos[:limite]
+
+
+def indexar_livro(livro_id, titulo, autor):
+    """Grava a assinatura e as chaves de um livro recém-adicionado (pela fila do escritor)."""
+    assinaturas, faixas = _linhas_indice([(livro_id, titulo, autor)])
+    # Enviadas juntas, costumam entrar na mesma transação do escritor
+    futuros = [
+        escritor.enviar(
+            f"INSERT OR IGNORE INTO livros_assinaturas (chave, livro_id) VALUES {', '.join(['(?, ?)'] * len(faixas))}",
+            [valor for faixa in faixas for valor in faixa]
+        ),
+        # Por último: livro com assinatura é livro indexado (ver indexar_pendentes)
+        escritor.enviar("INSERT OR REPLACE INTO livros_minhash (livro_id, assinatura) VALUES (?, ?)", assinaturas[0]),
+    ]
+    for futuro in futuros:
+        futuro.result()
+
+
+def _gravar_indice(assinaturas, faixas):
+    """Grava numa transação do escritor as chaves e as assinaturas de alguns livros."""
+    def executar(conn):
+        conn.executemany("INSERT OR IGNORE INTO livros_assinaturas (chave, livro_id) VALUES (?, ?)", faixas)
+        # Por último: livro com assinatura é livro indexado
+        conn.executemany("INSERT OR REPLACE INTO livros_minhash (livro_id, assinatura) VALUES (?, ?)", assinaturas)
+
+    escritor.executar(executar)
+
+
+def indexar_pendentes():
+    """Indexa os livros que ainda não têm assinatura. Retorna quantos foram indexados."""
+    total = 0
+    with conexao() as conn:
+        while True:
+            livros = conn.execute(
+                """
+                SELECT id, titulo, autor FROM livros
+                WHERE id NOT IN (SELECT livro_id FROM livros_minhash)
+                ORDER BY id LIMIT ?
+                """,
+                (LIVROS_POR_LOTE,)
+            ).fetchall()
+            if not livros:
+                break
+            for inicio in range(0, len(livros), LIVROS_POR_GRAVACAO):
+                _gravar_indice(*_linhas_indice(livros[inicio:inicio + LIVROS_POR_GRAVACAO]))
+            total += len(livros)
+    return total
+
+
+def grupos_de_duplicatas(limiar=LIMIAR):
+    """Varre o índice e retorna os grupos de quase duplicatas, cada um uma lista de ids em ordem."""
+    indexar_pendentes()
+    with conexao() as conn:
+        linhas = conn.execute("SELECT livro_id, assinatura FROM livros_minhash ORDER BY livro_id").fetchall()
+        if not linhas:
+            return []
+        ids = np.fromiter((linha[0] for linha in linhas), dtype=np.int64, count=len(linhas))
+        assinaturas = np.frombuffer(b"".join(linha[1] for linha in linhas), dtype=np.uint32).reshape(-1, ASSINATURAS)
+        del linhas
+
+        # Faixas com mais de um livro, agrupadas pelo número de livros
+        por_tamanho = {}
+        faixas = conn.execute(
+            """
+            SELECT GROUP_CONCAT(livro_id) FROM livros_assinaturas
+            GROUP BY chave HAVING COUNT(*) BETWEEN 2 AND ?
+            """,
+            (MAX_LIVROS_POR_FAIXA,)
+        )
+        for (membros,) in faixas:
+            membros = list(map(int, membros.split(",")))
+            por_tamanho.setdefault(len(membros), []).append(membros)
+        if not por_tamanho:
+            return []
+
+        # Pares (a, b) de posições em ids, com a < b, codificados como a * n + b para tirar repetidos
+        n = len(ids)
+        codigos = []
+        for tamanho, membros in por_tamanho.items():
+            posicoes = np.sort(np.searchsorted(ids, np.array(membros, dtype=np.int64)), axis=1)
+            i, j = np.triu_indices(tamanho, k=1)
+            codigos.append((posicoes[:, i] * n + posicoes[:, j]).ravel())
+        codigos = np.sort(np.concatenate(codigos))
+        codigos = codigos[np.concatenate([[True], codigos[1:] != codigos[:-1]])]
+        pares = np.stack(np.divmod(codigos, n))
+
+        # Estimativa pelas assinaturas, em blocos; só os pares perto do limiar seguem
+        provaveis = []
+        for inicio in range(0, pares.shape[1], PARES_POR_BLOCO):
+            a, b = pares[:, inicio:inicio + PARES_POR_BLOCO]
+            estimativas = (assinaturas[a] == assinaturas[b]).mean(axis=1)
+            provaveis.append(np.stack([ids[a], ids[b]])[:, estimativas >= limiar - MARGEM_ESTIMATIVA])
+        provaveis = np.concatenate(provaveis, axis=1)
+
+        envolvidos = np.unique(provaveis).tolist()
+        textos = {}
+        for inicio in range(0, len(envolvidos), 900):
+            bloco = envolvidos[inicio:inicio + 900]
+            textos.update(
+                (livro_id, trigramas(titulo, autor))
+                for livro_id, titulo, autor in conn.execute(
+                    f"SELECT id, titulo, autor FROM livros WHERE id IN ({', '.join('?' * len(bloco))})", bloco
+                )
+            )
+
+    return agrupar(provaveis.T.tolist(), textos, limiar)
+
+
+def _indexar_em_segundo_plano():
+    global _indexacao_agendada
+    with _lock:
+        _indexacao_agendada = False
+    try:
+        indexar_pendentes()
+    except Exception:
+        # Os livros não indexados ficam sem aviso de duplicata até a próxima tentativa
+        logging.getLogger(__name__).exception("Falha ao indexar os livros no índice de duplicatas")
+
+
+def agendar_indexacao():
+    """Agenda a indexação dos livros sem chaves; pedidos seguidos são atendidos de uma vez."""
+    global _indexacao_agendada
+    with _lock:
+        if _indexacao_agendada:
+            return
+        _indexacao_agendada = True
+    _executor.submit(_indexar_em_segundo_plano)
+
+
+def iniciar_indexacao():
+    """Agenda, uma vez por processo, a indexação dos livros que ainda não têm chaves."""
+    global _indexacao_iniciada
+    with _lock:
+        if _indexacao_iniciada:
+            return
+        _indexacao_iniciada = True
+    agendar_indexacao()
+
+
+if __name__ == "__main__":
+    from banco import init_db
+
+    init_db()
+    limiar = float(sys.argv[sys.argv.index("--limiar") + 1]) if "--limiar" in sys.argv else LIMIAR
+    inicio = time.perf_counter()
+    if "--grupos" in sys.argv:
+        grupos = grupos_de_duplicatas(limiar)
+        with conexao() as conn:
+            for ids in grupos:
+                print(f"\n{len(ids)} livros:")
+                for livro_id in ids:
+                    titulo, autor = conn.execute("SELECT titulo, autor FROM livros WHERE id = ?", (livro_id,)).fetchone()
+                    print(f"  {livro_id:>8}  {titulo} — {autor}")
+        print(f"\n{len(grupos)} grupos de duplicatas em {time.perf_counter() - inicio:.2f} s")
+    else:
+        print(f"{indexar_pendentes()} livros indexados em {time.perf_counter() - inicio:.2f} s")
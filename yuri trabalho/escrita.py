@@ -0,0 +1,226 @@
+"""Fila de escrita com commit em grupo.
+
+Em vez de cada sessão do Streamlit disputar o lock de escrita do SQLite
+(um commit e um fsync por comentário), as inserções entram numa fila
+atendida por uma única thread. Enquanto ela grava uma transação, as
+próximas operações se acumulam na fila e entram juntas na transação
+seguinte; cada chamador recebe, por um Future, o id da linha inserida.
+Assim o número de commits acompanha o tempo de cada commit (poucos
+milissegundos), e não o número de usuários.
+
+Cada operação roda num SAVEPOINT próprio: uma que falhe (por exemplo por
+chave estrangeira) recebe a exceção no seu Future sem desfazer as demais.
+Se o banco estiver bloqueado por outro processo, o grupo inteiro é
+repetido após uma espera crescente.
+"""
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from cache import cache_consultas
+
+# Espera extra por mais operações quando o grupo já tem mais de uma: junta
+# as sessões que chegam logo depois, ao custo de até 2 ms por transação.
+# Uma escrita isolada não espera (ver _completar_grupo).
+JANELA_AGRUPAMENTO = 0.002
+
+# Máximo de operações por transação
+MAXIMO_POR_GRUPO = 500
+
+# Tentativas quando o banco está bloqueado por outro processo
+TENTATIVAS_BLOQUEIO = 5
+ESPERA_INICIAL_BLOQUEIO = 0.05  # dobra a cada nova tentativa
+
+
+def _banco_bloqueado(erro):
+    mensagem = str(erro).lower()
+    return "locked" in mensagem or "busy" in mensagem
+
+
+class EscritorEmLote:
+    """Thread única que grava as operações da fila em transações agrupadas."""
+
+    def __init__(self, abrir_conexao, janela=JANELA_AGRUPAMENTO, maximo_por_grupo=MAXIMO_POR_GRUPO):
+        self._abrir_conexao = abrir_conexao
+        self.janela = janela
+        self.maximo_por_grupo = maximo_por_grupo
+        self._fila = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._conn = None
+        self.escritas = 0
+        self.falhas = 0
+        self.transacoes = 0
+        self.repeticoes = 0
+        self.maior_grupo = 0
+        self.profundidade_maxima = 0
+
+    def enviar(self, sql, parametros=(), tabelas=()):
+        """Coloca uma inserção na fila e retorna um Future com o id da linha.
+
+        `sql` também pode ser uma função que recebe a conexão (para gravações
+        maiores, como vários executemany); o Future recebe o que ela retornar.
+        `tabelas` são invalidadas no cache de consultas depois do commit,
+        antes de o Future ser resolvido.
+        """
+        futuro = Future()
+        self._iniciar()
+        self._fila.put((sql, parametros, tabelas, futuro))
+        profundidade = self._fila.qsize()
+        if profundidade > self.profundidade_maxima:
+            self.profundidade_maxima = profundidade
+        return futuro
+
+    def executar(self, sql, parametros=(), tabelas=()):
+        """Envia a operação e espera o commit; retorna o id da linha inserida."""
+        return self.enviar(sql, parametros, tabelas).result()
+
+    def _iniciar(self):
+        """Inicia a thread escritora na primeira operação do processo, ou de novo se ela tiver parado."""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                if self._thread is not None:
+                    # A thread anterior pode ter parado no meio de uma transação
+                    self._desfazer()
+                thread = threading.Thread(target=self._executar, name="escritor-sqlite", daemon=True)
+                thread.start()
+                self._thread = thread
+
+    def _executar(self):
+        while True:
+            grupo = [self._fila.get()]
+            try:
+                self._completar_grupo(grupo)
+                self._gravar(grupo)
+            except BaseException as erro:
+                # Erro fora da transação (ex.: ao invalidar o cache): quem ainda
+                # espera recebe a exceção, em vez de ficar preso no Future. Se a
+                # thread parar mesmo assim, a próxima operação inicia outra.
+                self._desfazer()
+                self._falhar([operacao for operacao in grupo if not operacao[3].done()], erro)
+                if not isinstance(erro, Exception):
+                    raise
+
+    def _completar_grupo(self, grupo):
+        """Junta ao grupo o que já está na fila e, havendo concorrência, o que chegar na janela.
+
+        Uma escrita isolada é gravada na hora; a espera só vale a pena quando
+        já há várias sessões escrevendo ao mesmo tempo.
+        """
+        limite = None
+        while len(grupo) < self.maximo_por_grupo:
+            try:
+                grupo.append(self._fila.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            if len(grupo) == 1:
+                return
+            if limite is None:
+                limite = time.monotonic() + self.janela
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                return
+            try:
+                grupo.append(self._fila.get(timeout=restante))
+            except queue.Empty:
+                return
+
+    def _conexao(self):
+        if self._conn is None:
+            self._conn = self._abrir_conexao()
+            # Transações controladas explicitamente (BEGIN/SAVEPOINT/COMMIT)
+            self._conn.isolation_level = None
+        return self._conn
+
+    def _gravar(self, grupo):
+        """Grava um grupo numa transação, repetindo-o se o banco estiver bloqueado."""
+        pendentes = [operacao for operacao in grupo if operacao[3].set_running_or_notify_cancel()]
+        if not pendentes:
+            return
+
+        espera = ESPERA_INICIAL_BLOQUEIO
+        for tentativa in range(TENTATIVAS_BLOQUEIO):
+            try:
+                resultados = self._transacao(pendentes)
+                break
+            except sqlite3.OperationalError as erro:
+                self._desfazer()
+                if not _banco_bloqueado(erro) or tentativa == TENTATIVAS_BLOQUEIO - 1:
+                    self._falhar(pendentes, erro)
+                    return
+                self.repeticoes += 1
+                time.sleep(espera)
+                espera *= 2
+            except Exception as erro:
+                self._desfazer()
+                self._falhar(pendentes, erro)
+                return
+
+        # Invalida o cache antes de liberar os chamadores: quem ler em seguida vê a escrita
+        tabelas = {tabela for operacao, (ok, _) in zip(pendentes, resultados) if ok for tabela in operacao[2]}
+        if tabelas:
+            cache_consultas.invalidar(*tabelas)
+
+        self.transacoes += 1
+        self.maior_grupo = max(self.maior_grupo, len(pendentes))
+        for (_, _, _, futuro), (ok, valor) in zip(pendentes, resultados):
+            if ok:
+                self.escritas += 1
+                futuro.set_result(valor)
+            else:
+                self.falhas += 1
+                futuro.set_exception(valor)
+
+    def _transacao(self, pendentes):
+        """Executa as operações numa única transação; retorna (ok, id ou exceção) de cada uma."""
+        conn = self._conexao()
+        conn.execute("BEGIN IMMEDIATE")
+        resultados = []
+        for sql, parametros, _, _ in pendentes:
+            conn.execute("SAVEPOINT operacao")
+            try:
+                linha_id = sql(conn) if callable(sql) else conn.execute(sql, parametros).lastrowid
+            except sqlite3.Error as erro:
+                # Bloqueio derruba o grupo todo (e ele é repetido); o resto fica só com a operação
+                if isinstance(erro, sqlite3.OperationalError) and _banco_bloqueado(erro):
+                    raise
+                conn.execute("ROLLBACK TO operacao")
+                resultados.append((False, erro))
+            else:
+                resultados.append((True, linha_id))
+            conn.execute("RELEASE operacao")
+        conn.execute("COMMIT")
+        return resultados
+
+    def _desfazer(self):
+        conn = self._conn
+        if conn is not None and conn.in_transaction:
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                # Conexão em estado inválido: abre outra na próxima transação
+                conn.close()
+                self._conn = None
+
+    def _falhar(self, pendentes, erro):
+        self.falhas += len(pendentes)
+        for operacao in pendentes:
+            operacao[3].set_exception(erro)
+
+    def estatisticas(self):
+        """Retorna os contadores da fila de escrita."""
+        return {
+            "profundidade": self._fila.qsize(),
+            "profundidade_maxima": self.profundidade_maxima,
+            "escritas": self.escritas,
+            "falhas": self.falhas,
+            "transacoes": self.transacoes,
+            "escritas_por_transacao": self.escritas / self.transacoes if self.transacoes else 0.0,
+            "maior_grupo": self.maior_grupo,
+            "repeticoes": self.repeticoes,
+        }
@@ -0,0 +1,106 @@
+"""Grade de livros renderizada em um único bloco HTML.
+
+Em vez de um st.markdown e um st.button por livro, cada grade envia uma
+página de cartões montada coluna a coluna com operações do pandas, mais um
+único seletor que leva o id do livro escolhido para a página de detalhes.
+Listas maiores que uma página ganham navegação Anterior/Próxima, de modo
+que só a janela visível é enviada ao navegador.
+"""
+import html
+import pandas as pd
+import streamlit as st
+from capas import url_capa
+from metricas import cronometrado
+
+# Quantidade de cartões enviados por página da grade
+ITENS_POR_PAGINA = 12
+
+
+# Função para renderizar estrelas baseado na nota
+def renderizar_estrelas(nota):
+    """Renderiza estrelas baseado na nota (0-5)."""
+    estrelas_cheias = int(nota)
+    meia_estrela = 1 if nota - estrelas_cheias >= 0.5 else 0
+    estrelas_vazias = 5 - estrelas_cheias - meia_estrela
+
+    return "⭐" * estrelas_cheias + ("⭐" if meia_estrela else "") + "☆" * estrelas_vazias
+
+
+def texto_html(serie):
+    """Converte uma coluna em texto seguro para HTML."""
+    return serie.fillna("").astype(str).map(html.escape)
+
+
+@cronometrado
+def html_cartoes(livros):
+    """Monta o HTML de todos os cartões de uma vez, a partir das colunas do DataFrame."""
+    if livros.empty:
+        return ""
+
+    titulo = texto_html(livros["titulo"])
+    ano = livros["ano_publicacao"].astype("Int64").astype(str).replace("<NA>", "")
+    atraso = pd.Series(range(len(livros)), index=livros.index).mul(0.1).round(1).astype(str)
+
+    cartoes = (
+        '<div class="book-card animate-fade-in" style="animation-delay: ' + atraso + 's">'
+        + '<img src="' + texto_html(livros["capa_url"].map(url_capa)) + '" class="book-cover" loading="lazy" alt="Capa do livro ' + titulo + '">'
+        + '<div class="book-title">' + titulo + '</div>'
+        + '<div class="book-author">por ' + texto_html(livros["autor"]) + '</div>'
+        + '<div class="book-meta"><span>' + texto_html(livros["genero"]) + '</span><span>' + ano + '</span></div>'
+        + '<div class="book-rating">' + livros["nota"].fillna(0).map(renderizar_estrelas) + '</div>'
+        + '<div class="book-description">' + texto_html(livros["sinopse"].fillna("").str.slice(0, 100)) + '...</div>'
+        + '</div>'
+    )
+    return '<div class="book-grid">' + "".join(cartoes.tolist()) + '</div>'
+
+
+def _selecionar_livro(chave_selecao):
+    """Callback do seletor: abre a página de detalhes do livro escolhido."""
+    livro_id = st.session_state.get(chave_selecao)
+    if livro_id is not None:
+        st.session_state['livro_selecionado'] = livro_id
+        st.session_state['pagina_atual'] = 'detalhes'
+
+
+@cronometrado
+def renderizar_grade(livros, chave, itens_por_pagina=ITENS_POR_PAGINA):
+    """Exibe os livros em grade, uma página por vez, com um único seletor de detalhes.
+
+    `chave` identifica a grade no session_state (página atual e seletor).
+    """
+    chave_pagina = f"{chave}_pagina"
+    total_paginas = max(1, -(-len(livros) // itens_por_pagina))
+    pagina = min(st.session_state.get(chave_pagina, 0), total_paginas - 1)
+    janela = livros.iloc[pagina * itens_por_pagina:(pagina + 1) * itens_por_pagina]
+
+    st.markdown(html_cartoes(janela), unsafe_allow_html=True)
+
+    # Um seletor por grade no lugar de um botão por livro
+    titulos = dict(zip(janela["id"].tolist(), janela["titulo"].tolist()))
+    chave_selecao = f"{chave}_selecao_{pagina}"
+    st.selectbox(
+        "Ver Detalhes",
+        options=list(titulos),
+        index=None,
+        format_func=lambda livro_id: titulos[livro_id],
+        placeholder="Escolha um livro para ver os detalhes",
+        key=chave_selecao,
+        on_change=_selecionar_livro,
+        args=(chave_selecao,),
+    )
+
+    if total_paginas > 1:
+        col1, col2, col3 = st.columns([1, 4, 1])
+        with col1:
+            if pagina > 0 and st.button("← Anterior", key=f"{chave}_anterior"):
+                st.session_state[chave_pagina] = pagina - 1
+                st.rerun()
+        with col2:
+            st.markdown(
+                f'<p style="text-align: center;">Página {pagina + 1} de {total_paginas}</p>',
+                unsafe_allow_html=True
+            )
+        with col3:
+            if pagina < total_paginas - 1 and st.button("Próxima →", key=f"{chave}_proxima"):
+                st.session_state[chave_pagina] = pagina + 1
+                st.rerun()
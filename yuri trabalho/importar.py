@@ -0,0 +1,241 @@
+"""Importação em lote de catálogos de livros (CSV, JSONL ou Parquet).
+
+O arquivo é lido em blocos, sem carregar tudo na memória, e cada bloco é
+gravado com executemany em transações da fila do escritor (banco.escritor)
+de LINHAS_POR_GRAVACAO linhas: as outras escritas do app esperam no máximo
+uma delas. Os livros entram com importacao_pendente = 1, que os gatilhos de
+inserção (estatísticas, índice da busca, popularidade, réplica) pulam; na
+mesma transação, COMANDOS_IMPORTADOS fazem o trabalho deles de uma só vez
+para esses livros e limpam a marca. Os gatilhos nunca são desligados: o que
+outras conexões ou processos gravarem durante a importação passa por eles
+normalmente.
+Livros cujo par (título, autor) normalizado já exista no banco ou já tenha
+aparecido no arquivo são ignorados.
+
+Uso pela linha de comando, dentro da pasta do app:
+
+    python importar.py catalogo.csv
+    python importar.py catalogo.parquet --lote 20000
+
+Colunas reconhecidas: titulo, autor (obrigatórias), ano_publicacao, genero,
+sinopse, nota e capa_url.
+"""
+import argparse
+import itertools
+import os
+import time
+from datetime import datetime
+import pandas as pd
+from banco import conexao, escritor, ranking_populares
+from migracoes import EXPRESSAO_POPULARIDADE
+from cache import cache_consultas
+from metricas import cronometrado
+from semelhanca import normalizar_coluna
+
+COLUNAS = ["titulo", "autor", "ano_publicacao", "genero", "sinopse", "nota", "capa_url"]
+
+# Linhas lidas do arquivo por bloco
+TAMANHO_LOTE = 10000
+
+# Linhas gravadas por transação do escritor: um comentário espera no máximo uma delas
+LINHAS_POR_GRAVACAO = 2000
+
+# O trabalho dos gatilhos de inserção para os livros marcados com
+# importacao_pendente, feito de uma vez no fim da transação de cada bloco
+# (ver migração 11). Rodam nesta ordem: a popularidade usa a nota média de
+# estatisticas, e a marca sai por último.
+COMANDOS_IMPORTADOS = [
+    # Gêneros novos entram com o gatilho de estatisticas_generos, que conta total_generos
+    """
+    INSERT INTO estatisticas_generos (genero, quantidade)
+    SELECT genero, COUNT(*) FROM livros WHERE importacao_pendente = 1 AND genero IS NOT NULL GROUP BY genero
+    ON CONFLICT (genero) DO UPDATE SET quantidade = quantidade + excluded.quantidade
+    """,
+    """
+    UPDATE estatisticas SET
+        total_livros = total_livros + (SELECT COUNT(*) FROM livros WHERE importacao_pendente = 1),
+        soma_notas = soma_notas + (SELECT COALESCE(SUM(nota), 0) FROM livros WHERE importacao_pendente = 1),
+        qtd_notas = qtd_notas + (SELECT COUNT(nota) FROM livros WHERE importacao_pendente = 1)
+    WHERE id = 1
+    """,
+    """
+    INSERT INTO livros_fts(rowid, titulo, autor, genero, sinopse)
+    SELECT id, titulo, autor, genero, sinopse FROM livros WHERE importacao_pendente = 1
+    """,
+    f"UPDATE livros SET popularidade = {EXPRESSAO_POPULARIDADE} WHERE importacao_pendente = 1",
+    # Todos os livros do bloco com a mesma seq: a réplica lê o bloco inteiro de uma vez
+    """
+    INSERT OR REPLACE INTO alteracoes_replica (tabela, livro_id, seq)
+    SELECT 'livros', id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM alteracoes_replica)
+    FROM livros WHERE importacao_pendente = 1
+    """,
+    "UPDATE livros SET importacao_pendente = NULL WHERE importacao_pendente = 1",
+]
+
+FORMATOS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet"}
+
+
+def chave_livro(titulos, autores):
+    """Chave de deduplicação de cada livro: título e autor normalizados."""
+    return normalizar_coluna(titulos) + "\x1f" + normalizar_coluna(autores)
+
+
+def detectar_formato(nome):
+    """Deduz o formato do arquivo pela extensão."""
+    extensao = os.path.splitext(nome)[1].lower()
+    if extensao not in FORMATOS:
+        raise ValueError(f"Formato não suportado: '{extensao}'. Use CSV, JSONL ou Parquet.")
+    return FORMATOS[extensao]
+
+
+def ler_em_lotes(origem, formato, tamanho_lote=TAMANHO_LOTE):
+    """Lê o arquivo (caminho ou objeto de arquivo) em DataFrames de até `tamanho_lote` linhas."""
+    if formato == "csv":
+        yield from pd.read_csv(origem, chunksize=tamanho_lote)
+    elif formato == "jsonl":
+        yield from pd.read_json(origem, lines=True, chunksize=tamanho_lote)
+    elif formato == "parquet":
+        import pyarrow.parquet as pq
+
+        arquivo = pq.ParquetFile(origem)
+        colunas = [coluna for coluna in COLUNAS if coluna in arquivo.schema_arrow.names]
+        for lote in arquivo.iter_batches(batch_size=tamanho_lote, columns=colunas):
+            yield lote.to_pandas()
+    else:
+        raise ValueError(f"Formato não suportado: '{formato}'.")
+
+
+def _preparar_lote(lote):
+    """Ajusta colunas e tipos de um bloco lido do arquivo."""
+    lote = lote.rename(columns=lambda coluna: str(coluna).strip().lower())
+    for coluna in COLUNAS:
+        if coluna not in lote.columns:
+            lote[coluna] = None
+    lote = lote[COLUNAS].copy()
+    lote["titulo"] = lote["titulo"].astype("string").str.strip()
+    lote["autor"] = lote["autor"].astype("string").str.strip()
+    lote["ano_publicacao"] = pd.to_numeric(lote["ano_publicacao"], errors="coerce").astype("Int64")
+    lote["nota"] = pd.to_numeric(lote["nota"], errors="coerce").clip(0, 5)
+    lote["capa_url"] = lote["capa_url"].fillna("")
+    return lote
+
+
+def _linhas(lote, data_adicao):
+    """Converte o DataFrame em tuplas prontas para o executemany (NaN/NA viram NULL)."""
+    lote = lote.astype(object).where(lote.notna(), None)
+    lote["data_adicao"] = data_adicao
+    colunas = ["titulo", "autor", "ano_publicacao", "genero", "sinopse", "nota", "data_adicao", "capa_url"]
+    return list(lote[colunas].itertuples(index=False, name=None))
+
+
+def _gravar_lote(linhas):
+    """Insere livros e faz o trabalho dos gatilhos por eles, numa transação do escritor."""
+    def executar(conn):
+        conn.executemany(
+            """
+            INSERT INTO livros (
+                titulo, autor, ano_publicacao, genero, sinopse, nota, data_adicao, capa_url, importacao_pendente
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)
+            """,
+            linhas
+        )
+        for comando in COMANDOS_IMPORTADOS:
+            conn.execute(comando)
+
+    escritor.executar(executar, tabelas=('livros',))
+
+
+@cronometrado
+def importar_catalogo(origem, formato=None, tamanho_lote=TAMANHO_LOTE, ao_progredir=None):
+    """Importa um catálogo para a tabela livros e retorna um resumo da importação.
+
+    `origem` é um caminho ou um objeto de arquivo; sem `formato`, ele é
+    deduzido do nome. `ao_progredir`, se informado, é chamado após cada
+    bloco com o resumo parcial.
+    """
+    if formato is None:
+        formato = detectar_formato(getattr(origem, "name", origem))
+
+    resumo = {"lidos": 0, "inseridos": 0, "duplicados": 0, "invalidos": 0}
+    inicio = time.perf_counter()
+    data_adicao = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    with conexao() as conn:
+        # Chaves (título, autor) já cadastradas
+        existentes = pd.read_sql_query("SELECT titulo, autor FROM livros", conn)
+        chaves = set(chave_livro(existentes["titulo"], existentes["autor"]).tolist())
+        del existentes
+
+    try:
+        for lote in ler_em_lotes(origem, formato, tamanho_lote):
+            resumo["lidos"] += len(lote)
+            lote = _preparar_lote(lote)
+
+            # Título e autor são obrigatórios
+            validos = lote["titulo"].fillna("").ne("") & lote["autor"].fillna("").ne("")
+            resumo["invalidos"] += int((~validos).sum())
+            lote = lote[validos]
+
+            # Duplicados dentro do bloco e em relação ao que já existe
+            # (consulta direta ao set, que o isin do pandas reconstruiria a cada bloco, sobre
+            # uma lista: percorrer a Series de strings item a item é bem mais lento)
+            chaves_lote = chave_livro(lote["titulo"], lote["autor"])
+            lista_chaves = chaves_lote.tolist()
+            ja_existem = pd.Series([chave in chaves for chave in lista_chaves], index=chaves_lote.index, dtype=bool)
+            novos = ~chaves_lote.duplicated() & ~ja_existem
+            resumo["duplicados"] += int((~novos).sum())
+            lote = lote[novos]
+
+            if len(lote):
+                linhas = _linhas(lote, data_adicao)
+                for posicao in range(0, len(linhas), LINHAS_POR_GRAVACAO):
+                    _gravar_lote(linhas[posicao:posicao + LINHAS_POR_GRAVACAO])
+                chaves.update(itertools.compress(lista_chaves, novos.tolist()))
+            resumo["inseridos"] += len(lote)
+
+            if ao_progredir is not None:
+                ao_progredir(dict(resumo))
+    finally:
+        cache_consultas.invalidar('livros')
+        ranking_populares.invalidar()
+
+    # Livros importados entram nas recomendações de similares, no índice de duplicatas e nas sugestões da busca em segundo plano
+    if resumo["inseridos"]:
+        from similares import agendar_atualizacao
+        from duplicatas import agendar_indexacao
+        from sugestoes import agendar_montagem
+        agendar_atualizacao()
+        agendar_indexacao()
+        agendar_montagem()
+
+    resumo["segundos"] = time.perf_counter() - inicio
+    resumo["linhas_por_segundo"] = resumo["lidos"] / resumo["segundos"] if resumo["segundos"] else 0.0
+    return resumo
+
+
+def _formatar_resumo(resumo):
+    return (
+        f"{resumo['lidos']} lidos, {resumo['inseridos']} inseridos, "
+        f"{resumo['duplicados']} duplicados, {resumo['invalidos']} inválidos"
+    )
+
+
+if __name__ == "__main__":
+    from banco import init_db
+
+    parser = argparse.ArgumentParser(description="Importa um catálogo de livros em lote.")
+    parser.add_argument("arquivo", help="arquivo CSV, JSONL ou Parquet")
+    parser.add_argument("--formato", choices=sorted(set(FORMATOS.values())), help="formato do arquivo (padrão: pela extensão)")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="linhas lidas por bloco")
+    argumentos = parser.parse_args()
+
+    init_db()
+    resumo = importar_catalogo(
+        argumentos.arquivo,
+        formato=argumentos.formato,
+        tamanho_lote=argumentos.lote,
+        ao_progredir=lambda parcial: print(f"\r{_formatar_resumo(parcial)}", end="", flush=True),
+    )
+    print(f"\r{_formatar_resumo(resumo)}")
+    print(f"{resumo['segundos']:.2f} s ({resumo['linhas_por_segundo']:.0f} linhas/s)")
@@ -0,0 +1,45 @@
+"""Mede quantos bytes o app envia ao navegador em um rerun.
+
+Executa o app.py com o AppTest do Streamlit e soma o tamanho serializado
+(protobuf) de cada elemento gerado, que é o que segue pelo websocket a cada
+rerun. Rode dentro da pasta do app:
+
+    python medir_rerun.py            # página inicial
+    python medir_rerun.py --detalhes # também lista os bytes por tipo de elemento
+"""
+import os
+import sys
+from collections import Counter
+from streamlit.testing.v1 import AppTest
+
+
+def _somar_bytes(no, por_tipo):
+    """Soma recursivamente o tamanho dos protobufs de um nó da árvore do AppTest."""
+    total = 0
+    proto = getattr(no, "proto", None)
+    if proto is not None:
+        tamanho = proto.ByteSize()
+        por_tipo[type(no).__name__] += tamanho
+        total += tamanho
+    for filho in getattr(no, "children", {}).values():
+        total += _somar_bytes(filho, por_tipo)
+    return total
+
+
+def medir_rerun(caminho_app="app.py", timeout=60):
+    """Executa o app uma vez e retorna (total de bytes, bytes por tipo de elemento)."""
+    app = AppTest.from_file(caminho_app, default_timeout=timeout)
+    app.run()
+    if app.exception:
+        raise RuntimeError(app.exception[0].value)
+    por_tipo = Counter()
+    total = _somar_bytes(app.main, por_tipo) + _somar_bytes(app.sidebar, por_tipo)
+    return total, por_tipo
+
+
+if __name__ == "__main__":
+    total, por_tipo = medir_rerun(os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py"))
+    print(f"Bytes enviados no rerun: {total}")
+    if "--detalhes" in sys.argv:
+        for tipo, tamanho in por_tipo.most_common():
+            print(f"  {tipo:<20} {tamanho}")
@@ -0,0 +1,187 @@
+"""Tempo gasto em cada parte de um rerun, medido por trechos.
+
+Um trecho é um bloco `with trecho(nome)` ou uma função marcada com
+@cronometrado (funções do banco, carregadores de tema e animações, montagem
+do HTML) ou aberto e fechado à mão, como as páginas do app.py. A duração
+de cada trecho entra num histograma do processo; de tempos em tempos os
+histogramas e os contadores do escritor, do cache e do ranking são gravados
+num arquivo no formato texto do Prometheus, que o coletor textfile do
+node_exporter (ou outro raspador local) pode ler.
+
+Entre iniciar_rerun() e finalizar_rerun() os trechos da thread do script
+também ficam guardados em ordem, para o painel de depuração (ver
+depuracao.py) mostrar para onde foi o tempo daquele rerun.
+"""
+import bisect
+import os
+import threading
+import time
+from functools import wraps
+
+# Limites superiores dos buckets dos histogramas, em segundos
+LIMITES_SEGUNDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Arquivo das métricas no formato do Prometheus (BIBLIOTECA_METRICAS vazio desliga a exportação)
+CAMINHO_METRICAS = os.environ.get('BIBLIOTECA_METRICAS', 'metricas.prom')
+
+# Intervalo mínimo entre duas gravações do arquivo
+INTERVALO_EXPORTACAO = 15.0  # segundos
+
+_histogramas = {}  # trecho -> [contagem por bucket (o último é +Inf), soma, quantidade]
+_fontes = {}       # nome -> função que retorna um dicionário de contadores
+_lock = threading.Lock()
+_local = threading.local()
+_ultima_exportacao = 0.0
+
+
+def registrar(nome, segundos):
+    """Acrescenta uma duração ao histograma do trecho."""
+    with _lock:
+        histograma = _histogramas.get(nome)
+        if histograma is None:
+            histograma = _histogramas[nome] = [[0] * (len(LIMITES_SEGUNDOS) + 1), 0.0, 0]
+        histograma[0][bisect.bisect_left(LIMITES_SEGUNDOS, segundos)] += 1
+        histograma[1] += segundos
+        histograma[2] += 1
+
+
+def registrar_fonte(nome, estatisticas):
+    """Inclui na exportação os contadores numéricos retornados por `estatisticas()`."""
+    with _lock:
+        _fontes[nome] = estatisticas
+
+
+class Trecho:
+    """Mede um trecho; use com `with` ou com iniciar()/encerrar()."""
+
+    __slots__ = ("nome", "_inicio", "_registro")
+
+    def __init__(self, nome):
+        self.nome = nome
+        self._inicio = None
+        self._registro = None
+
+    def iniciar(self):
+        trechos = getattr(_local, "trechos", None)
+        if trechos is not None:
+            # Guardado já na abertura: o painel mostra os trechos na ordem em que começaram
+            self._registro = [self.nome, None, _local.profundidade]
+            trechos.append(self._registro)
+            _local.profundidade += 1
+        self._inicio = time.perf_counter()
+        return self
+
+    def encerrar(self):
+        duracao = time.perf_counter() - self._inicio
+        registrar(self.nome, duracao)
+        if self._registro is not None:
+            self._registro[1] = duracao
+            _local.profundidade -= 1
+        return duracao
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *excecao):
+        self.encerrar()
+
+
+def trecho(nome):
+    """Cria um trecho com o nome dado (ex.: `with trecho("pagina.explorar"):`)."""
+    return Trecho(nome)
+
+
+def cronometrado(funcao):
+    """Decorador que mede cada chamada da função como o trecho "modulo.funcao"."""
+    nome = f"{funcao.__module__}.{funcao.__name__}"
+
+    @wraps(funcao)
+    def envoltorio(*args, **kwargs):
+        with Trecho(nome):
+            return funcao(*args, **kwargs)
+    return envoltorio
+
+
+def iniciar_rerun():
+    """Começa a guardar os trechos da thread atual (chamada no início do app.py)."""
+    _local.trechos = []
+    _local.profundidade = 0
+    _local.inicio = time.perf_counter()
+
+
+def finalizar_rerun():
+    """Encerra o rerun da thread atual e retorna (trechos, duração total em segundos).
+
+    Cada trecho é [nome, segundos, profundidade], na ordem em que começou;
+    os que não chegaram a terminar têm segundos None. Também registra o
+    trecho "rerun" e grava o arquivo de métricas se já passou o intervalo.
+    """
+    trechos = getattr(_local, "trechos", None)
+    if trechos is None:
+        return [], 0.0
+    total = time.perf_counter() - _local.inicio
+    _local.trechos = None
+    registrar("rerun", total)
+    exportar_se_preciso()
+    return trechos, total
+
+
+def _rotulo(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def texto_prometheus():
+    """Retorna os histogramas e os contadores das fontes no formato texto do Prometheus."""
+    with _lock:
+        histogramas = {nome: (list(contagens), soma, quantidade) for nome, (contagens, soma, quantidade) in _histogramas.items()}
+        fontes = dict(_fontes)
+
+    linhas = [
+        "# HELP biblioteca_trecho_segundos Duração dos trechos medidos no app.",
+        "# TYPE biblioteca_trecho_segundos histogram",
+    ]
+    for nome, (contagens, soma, quantidade) in sorted(histogramas.items()):
+        rotulo = _rotulo(nome)
+        acumulado = 0
+        for limite, contagem in zip(LIMITES_SEGUNDOS + ("+Inf",), contagens):
+            acumulado += contagem
+            linhas.append(f'biblioteca_trecho_segundos_bucket{{trecho="{rotulo}",le="{limite}"}} {acumulado}')
+        linhas.append(f'biblioteca_trecho_segundos_sum{{trecho="{rotulo}"}} {soma:.6f}')
+        linhas.append(f'biblioteca_trecho_segundos_count{{trecho="{rotulo}"}} {quantidade}')
+
+    for fonte, estatisticas in sorted(fontes.items()):
+        for chave, valor in estatisticas().items():
+            if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                metrica = f"biblioteca_{fonte}_{chave}"
+                linhas.append(f"# TYPE {metrica} gauge")
+                linhas.append(f"{metrica} {valor}")
+    return "\n".join(linhas) + "\n"
+
+
+def exportar(caminho=None):
+    """Grava o arquivo de métricas de uma vez (o raspador nunca lê um arquivo pela metade)."""
+    caminho = caminho or CAMINHO_METRICAS
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        arquivo.write(texto_prometheus())
+    os.replace(temporario, caminho)
+
+
+def exportar_se_preciso():
+    """Grava o arquivo de métricas se a última gravação tiver mais de INTERVALO_EXPORTACAO."""
+    global _ultima_exportacao
+    if not CAMINHO_METRICAS:
+        return
+    agora = time.monotonic()
+    with _lock:
+        if agora - _ultima_exportacao < INTERVALO_EXPORTACAO:
+            return
+        _ultima_exportacao = agora
+    try:
+        exportar()
+    except OSError:
+        # Sem métricas desta vez; a página não deve falhar por isso
+        pass
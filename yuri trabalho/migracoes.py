@@ -0,0 +1,476 @@
+"""Migrações versionadas do esquema do biblioteca.db.
+
+A versão aplicada fica em `PRAGMA user_version`. Cada migração roda em uma
+transação própria junto com a atualização da versão: ou ela é aplicada
+inteira, ou o banco continua na versão anterior.
+
+Para alterar o esquema, acrescente uma nova entrada ao final de MIGRACOES;
+nunca edite uma migração que já foi publicada.
+"""
+
+# Popularidade de um livro: média bayesiana entre a nota do livro e a nota
+# média do acervo (peso 5). O peso da nota do livro cresce com os comentários,
+# e cada comentário vale menos quanto mais antiga a última atividade (metade
+# aos 30 dias). Livros sem nota ficam com popularidade NULL.
+# Usada pelos gatilhos das migrações 8 e 11, por banco.recalcular_popularidade
+# e pela importação em lote; para mudar a fórmula, crie uma migração nova que
+# recrie os gatilhos.
+_PESO_ENGAJAMENTO = """
+    (1.0 + num_comentarios / (1.0 + MAX(
+        julianday('now') - COALESCE(julianday(COALESCE(ultima_atividade, data_adicao)), julianday('now')), 0
+    ) / 30.0))
+"""
+EXPRESSAO_POPULARIDADE = f"""
+    (5.0 * (SELECT COALESCE(soma_notas / NULLIF(qtd_notas, 0), 0) FROM estatisticas WHERE id = 1)
+     + nota * {_PESO_ENGAJAMENTO}) / (5.0 + {_PESO_ENGAJAMENTO})
+"""
+
+# Cada migração é (versão, descrição, passos). Um passo é um comando SQL ou
+# uma função que recebe a conexão, para alterações que precisam de Python.
+MIGRACOES = [
+    (1, "Tabelas de livros e comentários", [
+        """
+        CREATE TABLE IF NOT EXISTS livros (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            titulo TEXT NOT NULL,
+            autor TEXT NOT NULL,
+            ano_publicacao INTEGER,
+            genero TEXT,
+            sinopse TEXT,
+            nota REAL,
+            data_adicao TEXT,
+            capa_url TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS comentarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            livro_id INTEGER,
+            nome_usuario TEXT,
+            comentario TEXT,
+            data_comentario TEXT,
+            FOREIGN KEY (livro_id) REFERENCES livros (id)
+        )
+        """,
+    ]),
+
+    # Índice FTS5 sincronizado com a tabela livros por triggers. O tokenizador
+    # remove acentos ("ficcao" encontra "Ficção") e os prefixos de 2 e 3 letras
+    # ficam pré-indexados para a busca enquanto se digita.
+    (2, "Busca textual FTS5 sobre os livros", [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS livros_fts USING fts5(
+            titulo, autor, genero, sinopse,
+            content = 'livros',
+            content_rowid = 'id',
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS livros_fts_insert AFTER INSERT ON livros BEGIN
+            INSERT INTO livros_fts(rowid, titulo, autor, genero, sinopse)
+            VALUES (new.id, new.titulo, new.autor, new.genero, new.sinopse);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS livros_fts_delete AFTER DELETE ON livros BEGIN
+            INSERT INTO livros_fts(livros_fts, rowid, titulo, autor, genero, sinopse)
+            VALUES ('delete', old.id, old.titulo, old.autor, old.genero, old.sinopse);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS livros_fts_update AFTER UPDATE OF titulo, autor, genero, sinopse ON livros BEGIN
+            INSERT INTO livros_fts(livros_fts, rowid, titulo, autor, genero, sinopse)
+            VALUES ('delete', old.id, old.titulo, old.autor, old.genero, old.sinopse);
+            INSERT INTO livros_fts(rowid, titulo, autor, genero, sinopse)
+            VALUES (new.id, new.titulo, new.autor, new.genero, new.sinopse);
+        END
+        """,
+        # Indexa os livros que já estavam cadastrados
+        "INSERT INTO livros_fts(livros_fts) VALUES ('rebuild')",
+    ]),
+
+    (3, "Índices de desempenho", [
+        "CREATE INDEX IF NOT EXISTS idx_comentarios_livro_data ON comentarios (livro_id, data_comentario)",
+        "CREATE INDEX IF NOT EXISTS idx_livros_nota ON livros (nota)",
+        "CREATE INDEX IF NOT EXISTS idx_livros_data_adicao ON livros (data_adicao)",
+        "CREATE INDEX IF NOT EXISTS idx_livros_genero ON livros (genero)",
+        # Ordenações da página Explorar
+        "CREATE INDEX IF NOT EXISTS idx_livros_titulo ON livros (titulo)",
+        "CREATE INDEX IF NOT EXISTS idx_livros_autor ON livros (autor)",
+        "CREATE INDEX IF NOT EXISTS idx_livros_ano_publicacao ON livros (ano_publicacao)",
+    ]),
+
+    # Contadores mantidos por triggers para o painel da página inicial: a nota
+    # média sai de soma/quantidade e os gêneros distintos de uma contagem de
+    # referências por gênero, sem varrer livros ou comentários.
+    (4, "Estatísticas mantidas incrementalmente", [
+        """
+        CREATE TABLE IF NOT EXISTS estatisticas (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total_livros INTEGER NOT NULL,
+            soma_notas REAL NOT NULL,
+            qtd_notas INTEGER NOT NULL,
+            total_comentarios INTEGER NOT NULL,
+            total_generos INTEGER NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS estatisticas_generos (
+            genero TEXT PRIMARY KEY,
+            quantidade INTEGER NOT NULL
+        )
+        """,
+        # Valores iniciais a partir dos dados existentes
+        """
+        INSERT OR REPLACE INTO estatisticas_generos (genero, quantidade)
+        SELECT genero, COUNT(*) FROM livros WHERE genero IS NOT NULL GROUP BY genero
+        """,
+        """
+        INSERT OR REPLACE INTO estatisticas
+            (id, total_livros, soma_notas, qtd_notas, total_comentarios, total_generos)
+        SELECT 1,
+            (SELECT COUNT(*) FROM livros),
+            (SELECT COALESCE(SUM(nota), 0) FROM livros),
+            (SELECT COUNT(nota) FROM livros),
+            (SELECT COUNT(*) FROM comentarios),
+            (SELECT COUNT(*) FROM estatisticas_generos)
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS estatisticas_generos_insert AFTER INSERT ON estatisticas_generos BEGIN
+            UPDATE estatisticas SET total_generos = total_generos + 1 WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS estatisticas_generos_delete AFTER DELETE ON estatisticas_generos BEGIN
+            UPDATE estatisticas SET total_generos = total_generos - 1 WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS estatisticas_livros_insert AFTER INSERT ON livros BEGIN
+            UPDATE estatisticas SET
+                total_livros = total_livros + 1,
+                soma_notas = soma_notas + COALESCE(new.nota, 0),
+                qtd_notas = qtd_notas + (new.nota IS NOT NULL)
+            WHERE id = 1;
+            INSERT OR IGNORE INTO estatisticas_generos (genero, quantidade)
+            SELECT new.genero, 0 WHERE new.genero IS NOT NULL;
+            UPDATE estatisticas_generos SET quantidade = quantidade + 1 WHERE genero = new.genero;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS estatisticas_livros_delete AFTER DELETE ON livros BEGIN
+            UPDATE estatisticas SET
+                total_livros = total_livros - 1,
+                soma_notas = soma_notas - COALESCE(old.nota, 0),
+                qtd_notas = qtd_notas - (old.nota IS NOT NULL)
+            WHERE id = 1;
+            UPDATE estatisticas_generos SET quantidade = quantidade - 1 WHERE genero = old.genero;
+            DELETE FROM estatisticas_generos WHERE genero = old.genero AND quantidade <= 0;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS estatisticas_livros_update AFTER UPDATE OF nota, genero ON livros BEGIN
+            UPDATE estatisticas SET
+                soma_notas = soma_notas - COALESCE(old.nota, 0) + COALESCE(new.nota, 0),
+                qtd_notas = qtd_notas - (old.nota IS NOT NULL) + (new.nota IS NOT NULL)
+            WHERE id = 1;
+            UPDATE estatisticas_generos SET quantidade = quantidade - 1 WHERE genero = old.genero;
+            DELETE FROM estatisticas_generos WHERE genero = old.genero AND quantidade <= 0;
+            INSERT OR IGNORE INTO estatisticas_generos (genero, quantidade)
+            SELECT new.genero, 0 WHERE new.genero IS NOT NULL;
+            UPDATE estatisticas_generos SET quantidade = quantidade + 1 WHERE genero = new.genero;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS estatisticas_comentarios_insert AFTER INSERT ON comentarios BEGIN
+            UPDATE estatisticas SET total_comentarios = total_comentarios + 1 WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS estatisticas_comentarios_delete AFTER DELETE ON comentarios BEGIN
+            UPDATE estatisticas SET total_comentarios = total_comentarios - 1 WHERE id = 1;
+        END
+        """,
+    ]),
+
+    # Capas baixadas para o cache local (ver capas.py)
+    (5, "Cache local de capas", [
+        """
+        CREATE TABLE IF NOT EXISTS capas (
+            url TEXT PRIMARY KEY,
+            hash TEXT NOT NULL,
+            data_download TEXT
+        )
+        """,
+    ]),
+
+    # Agregados de comentários guardados no próprio livro, para ordenar por
+    # "mais comentados" e "atividade recente" pelo índice, sem GROUP BY.
+    # ultima_atividade é a data do comentário mais recente (NULL sem comentários).
+    (6, "Contagem de comentários e última atividade nos livros", [
+        "ALTER TABLE livros ADD COLUMN num_comentarios INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE livros ADD COLUMN ultima_atividade TEXT",
+        # Valores iniciais a partir dos comentários existentes
+        """
+        UPDATE livros SET
+            num_comentarios = (SELECT COUNT(*) FROM comentarios WHERE livro_id = livros.id),
+            ultima_atividade = (SELECT MAX(data_comentario) FROM comentarios WHERE livro_id = livros.id)
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS livros_comentarios_insert AFTER INSERT ON comentarios BEGIN
+            UPDATE livros SET
+                num_comentarios = num_comentarios + 1,
+                ultima_atividade = CASE
+                    WHEN ultima_atividade IS NULL OR new.data_comentario > ultima_atividade THEN new.data_comentario
+                    ELSE ultima_atividade
+                END
+            WHERE id = new.livro_id;
+        END
+        """,
+        # Na remoção a data mais recente é relida pelo índice (livro_id, data_comentario)
+        """
+        CREATE TRIGGER IF NOT EXISTS livros_comentarios_delete AFTER DELETE ON comentarios BEGIN
+            UPDATE livros SET
+                num_comentarios = num_comentarios - 1,
+                ultima_atividade = (SELECT MAX(data_comentario) FROM comentarios WHERE livro_id = old.livro_id)
+            WHERE id = old.livro_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS livros_comentarios_update AFTER UPDATE OF livro_id, data_comentario ON comentarios BEGIN
+            UPDATE livros SET
+                num_comentarios = num_comentarios - 1,
+                ultima_atividade = (SELECT MAX(data_comentario) FROM comentarios WHERE livro_id = old.livro_id)
+            WHERE id = old.livro_id;
+            UPDATE livros SET
+                num_comentarios = num_comentarios + 1,
+                ultima_atividade = (SELECT MAX(data_comentario) FROM comentarios WHERE livro_id = new.livro_id)
+            WHERE id = new.livro_id;
+        END
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_livros_num_comentarios ON livros (num_comentarios)",
+        "CREATE INDEX IF NOT EXISTS idx_livros_ultima_atividade ON livros (ultima_atividade)",
+    ]),
+
+    # Recomendações de livros similares (ver similares.py): o vetor de termos
+    # de cada livro e a lista já calculada dos seus vizinhos mais próximos.
+    (7, "Livros similares", [
+        """
+        CREATE TABLE IF NOT EXISTS livros_vetores (
+            livro_id INTEGER PRIMARY KEY REFERENCES livros (id) ON DELETE CASCADE,
+            indices BLOB NOT NULL,
+            contagens BLOB NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS livros_similares (
+            livro_id INTEGER NOT NULL REFERENCES livros (id) ON DELETE CASCADE,
+            similar_id INTEGER NOT NULL REFERENCES livros (id) ON DELETE CASCADE,
+            similaridade REAL NOT NULL,
+            PRIMARY KEY (livro_id, similar_id)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_livros_similares_ordem ON livros_similares (livro_id, similaridade DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_livros_similares_similar ON livros_similares (similar_id)",
+    ]),
+
+    # Popularidade guardada e indexada, atualizada a cada escrita no livro
+    (8, "Popularidade dos livros", [
+        "ALTER TABLE livros ADD COLUMN popularidade REAL",
+        f"UPDATE livros SET popularidade = {EXPRESSAO_POPULARIDADE}",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS livros_popularidade_insert AFTER INSERT ON livros BEGIN
+            UPDATE livros SET popularidade = {EXPRESSAO_POPULARIDADE} WHERE id = new.id;
+        END
+        """,
+        # Não inclui a própria popularidade na lista de colunas: o gatilho não dispara a si mesmo
+        f"""
+        CREATE TRIGGER IF NOT EXISTS livros_popularidade_update
+        AFTER UPDATE OF nota, num_comentarios, ultima_atividade, data_adicao ON livros BEGIN
+            UPDATE livros SET popularidade = {EXPRESSAO_POPULARIDADE} WHERE id = new.id;
+        END
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_livros_popularidade ON livros (popularidade)",
+    ]),
+
+    # Índice de quase duplicatas (ver duplicatas.py): a assinatura MinHash de
+    # título e autor de cada livro e as chaves das faixas dela. Os livros
+    # existentes são indexados em segundo plano, como os vetores dos similares.
+    (9, "Índice de quase duplicatas", [
+        """
+        CREATE TABLE IF NOT EXISTS livros_minhash (
+            livro_id INTEGER PRIMARY KEY REFERENCES livros (id) ON DELETE CASCADE,
+            assinatura BLOB NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS livros_assinaturas (
+            chave INTEGER NOT NULL,
+            livro_id INTEGER NOT NULL REFERENCES livros (id) ON DELETE CASCADE,
+            PRIMARY KEY (chave, livro_id)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_livros_assinaturas_livro ON livros_assinaturas (livro_id)",
+        # Título ou autor alterado: o livro volta a ser pendente e é reindexado
+        """
+        CREATE TRIGGER IF NOT EXISTS livros_assinaturas_update AFTER UPDATE OF titulo, autor ON livros BEGIN
+            DELETE FROM livros_assinaturas WHERE livro_id = old.id;
+            DELETE FROM livros_minhash WHERE livro_id = old.id;
+        END
+        """,
+    ]),
+
+    # Livros e listas de similares alterados, com a ordem da última alteração
+    # (seq), para a réplica do DuckDB recopiar só o que mudou (ver repositorio.py).
+    # Uma linha por livro: o registro não cresce além do acervo.
+    (10, "Registro de alterações para a réplica", [
+        """
+        CREATE TABLE IF NOT EXISTS alteracoes_replica (
+            tabela TEXT NOT NULL,
+            livro_id INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            PRIMARY KEY (tabela, livro_id)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_alteracoes_replica_seq ON alteracoes_replica (seq)",
+        """
+        CREATE TRIGGER IF NOT EXISTS livros_replica_insert AFTER INSERT ON livros BEGIN
+            INSERT OR REPLACE INTO alteracoes_replica (tabela, livro_id, seq)
+            VALUES ('livros', new.id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM alteracoes_replica));
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS livros_replica_update AFTER UPDATE ON livros BEGIN
+            INSERT OR REPLACE INTO alteracoes_replica (tabela, livro_id, seq)
+            VALUES ('livros', new.id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM alteracoes_replica));
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS livros_replica_delete AFTER DELETE ON livros BEGIN
+            INSERT OR REPLACE INTO alteracoes_replica (tabela, livro_id, seq)
+            VALUES ('livros', old.id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM alteracoes_replica));
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS similares_replica_insert AFTER INSERT ON livros_similares BEGIN
+            INSERT OR REPLACE INTO alteracoes_replica (tabela, livro_id, seq)
+            VALUES ('livros_similares', new.livro_id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM alteracoes_replica));
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS similares_replica_update AFTER UPDATE ON livros_similares BEGIN
+            INSERT OR REPLACE INTO alteracoes_replica (tabela, livro_id, seq)
+            VALUES ('livros_similares', new.livro_id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM alteracoes_replica));
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS similares_replica_delete AFTER DELETE ON livros_similares BEGIN
+            INSERT OR REPLACE INTO alteracoes_replica (tabela, livro_id, seq)
+            VALUES ('livros_similares', old.livro_id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM alteracoes_replica));
+        END
+        """,
+    ]),
+
+    # Importação em lote sem suspender gatilhos (ver importar.py): o importador
+    # grava importacao_pendente = 1 nos livros que insere, e os gatilhos de
+    # inserção os pulam; no fim da mesma transação ele faz o trabalho deles de
+    # uma vez só para esses livros e limpa a marca. Fora dessa transação a
+    # coluna é sempre NULL, e os gatilhos valem para qualquer outra conexão.
+    (11, "Gatilhos de inserção que pulam os livros em importação", [
+        "ALTER TABLE livros ADD COLUMN importacao_pendente INTEGER",
+        """
+        CREATE INDEX IF NOT EXISTS idx_livros_importacao_pendente ON livros (importacao_pendente)
+        WHERE importacao_pendente IS NOT NULL
+        """,
+        "DROP TRIGGER IF EXISTS estatisticas_livros_insert",
+        """
+        CREATE TRIGGER estatisticas_livros_insert AFTER INSERT ON livros
+        WHEN new.importacao_pendente IS NULL BEGIN
+            UPDATE estatisticas SET
+                total_livros = total_livros + 1,
+                soma_notas = soma_notas + COALESCE(new.nota, 0),
+                qtd_notas = qtd_notas + (new.nota IS NOT NULL)
+            WHERE id = 1;
+            INSERT OR IGNORE INTO estatisticas_generos (genero, quantidade)
+            SELECT new.genero, 0 WHERE new.genero IS NOT NULL;
+            UPDATE estatisticas_generos SET quantidade = quantidade + 1 WHERE genero = new.genero;
+        END
+        """,
+        "DROP TRIGGER IF EXISTS livros_fts_insert",
+        """
+        CREATE TRIGGER livros_fts_insert AFTER INSERT ON livros
+        WHEN new.importacao_pendente IS NULL BEGIN
+            INSERT INTO livros_fts(rowid, titulo, autor, genero, sinopse)
+            VALUES (new.id, new.titulo, new.autor, new.genero, new.sinopse);
+        END
+        """,
+        "DROP TRIGGER IF EXISTS livros_popularidade_insert",
+        f"""
+        CREATE TRIGGER livros_popularidade_insert AFTER INSERT ON livros
+        WHEN new.importacao_pendente IS NULL BEGIN
+            UPDATE livros SET popularidade = {EXPRESSAO_POPULARIDADE} WHERE id = new.id;
+        END
+        """,
+        "DROP TRIGGER IF EXISTS livros_replica_insert",
+        """
+        CREATE TRIGGER livros_replica_insert AFTER INSERT ON livros
+        WHEN new.importacao_pendente IS NULL BEGIN
+            INSERT OR REPLACE INTO alteracoes_replica (tabela, livro_id, seq)
+            VALUES ('livros', new.id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM alteracoes_replica));
+        END
+        """,
+        # old: o UPDATE que calcula a popularidade dos importados e o que limpa a
+        # marca não registram livro a livro (o importador registra o lote inteiro)
+        "DROP TRIGGER IF EXISTS livros_replica_update",
+        """
+        CREATE TRIGGER livros_replica_update AFTER UPDATE ON livros
+        WHEN old.importacao_pendente IS NULL BEGIN
+            INSERT OR REPLACE INTO alteracoes_replica (tabela, livro_id, seq)
+            VALUES ('livros', new.id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM alteracoes_replica));
+        END
+        """,
+    ]),
+]
+
+# Versão do esquema esperada por este código
+VERSAO_ATUAL = MIGRACOES[-1][0]
+
+
+def versao_do_banco(conn):
+    """Retorna a versão do esquema registrada no banco."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def aplicar_migracoes(conn):
+    """Aplica, em ordem, as migrações ainda não aplicadas e retorna a versão final."""
+    if versao_do_banco(conn) >= VERSAO_ATUAL:
+        return versao_do_banco(conn)
+
+    # Controle manual de transações enquanto migra
+    isolamento_anterior = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        for versao, descricao, passos in MIGRACOES:
+            # IMMEDIATE pega o lock de escrita antes de reler a versão, então
+            # dois processos iniciando juntos não aplicam a mesma migração
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if versao_do_banco(conn) >= versao:
+                    conn.execute("ROLLBACK")
+                    continue
+                for passo in passos:
+                    if callable(passo):
+                        passo(conn)
+                    else:
+                        conn.execute(passo)
+                conn.execute(f"PRAGMA user_version = {int(versao)}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    finally:
+        conn.isolation_level = isolamento_anterior
+
+    return versao_do_banco(conn)
@@ -0,0 +1,90 @@
+"""Ranking dos livros mais populares mantido em memória.
+
+A popularidade de cada livro fica na coluna livros.popularidade, calculada
+pelos gatilhos do banco (ver migracoes.EXPRESSAO_POPULARIDADE). Este módulo
+guarda só os primeiros colocados, em ordem: a seção "Livros Mais
+Populares" lê os ids daqui, sem ordenar nada na hora.
+
+Escritas pontuais (um livro novo, um comentário) ajustam o ranking com a
+nova popularidade do livro afetado. Escritas em massa chamam invalidar(),
+e o ranking é relido pelo índice de popularidade na próxima consulta.
+"""
+import bisect
+import threading
+
+# Posições mantidas em memória (a página inicial usa as 6 primeiras)
+TAMANHO_RANKING = 50
+
+
+class RankingPopularidade:
+    """Os livros mais populares, em ordem, com atualização incremental."""
+
+    def __init__(self, carregar, tamanho=TAMANHO_RANKING):
+        # carregar(limite) -> [(livro_id, popularidade)] em ordem decrescente
+        self._carregar = carregar
+        self.tamanho = tamanho
+        self._chaves = None   # (-popularidade, -livro_id), em ordem crescente
+        self._completo = False  # True se o acervo inteiro cabe no ranking
+        self._lock = threading.Lock()
+        self.recargas = 0
+        self.atualizacoes = 0
+
+    def _garantir_carregado(self):
+        if self._chaves is not None:
+            return
+        linhas = self._carregar(self.tamanho)
+        self._chaves = [(-popularidade, -livro_id) for livro_id, popularidade in linhas]
+        self._completo = len(linhas) < self.tamanho
+        self.recargas += 1
+
+    def invalidar(self):
+        """Descarta o ranking; ele será relido do banco na próxima consulta."""
+        with self._lock:
+            self._chaves = None
+
+    def atualizar(self, livro_id, popularidade):
+        """Ajusta a posição de um livro cuja popularidade mudou."""
+        with self._lock:
+            if self._chaves is None:
+                return
+            self.atualizacoes += 1
+            chaves = self._chaves
+            presente = next((i for i, (_, menos_id) in enumerate(chaves) if menos_id == -livro_id), None)
+            if presente is not None:
+                del chaves[presente]
+
+            if popularidade is None:
+                # Sem popularidade o livro fica fora do ranking
+                if presente is not None and not self._completo:
+                    self._chaves = None
+                return
+
+            chave = (-popularidade, -livro_id)
+            if self._completo or (presente is None and chave < chaves[-1]):
+                bisect.insort(chaves, chave)
+                if len(chaves) > self.tamanho:
+                    chaves.pop()
+                    self._completo = False
+            elif presente is not None:
+                if chaves and chave < chaves[-1]:
+                    bisect.insort(chaves, chave)
+                else:
+                    # Caiu para o fim ou para fora das posições guardadas: não se sabe quem ocupa a última
+                    self._chaves = None
+
+    def melhores(self, limite):
+        """Retorna os ids dos `limite` livros mais populares, em ordem."""
+        with self._lock:
+            if limite > self.tamanho:
+                return [livro_id for livro_id, _ in self._carregar(limite)]
+            self._garantir_carregado()
+            return [-menos_id for _, menos_id in self._chaves[:limite]]
+
+    def estatisticas(self):
+        """Retorna os contadores do ranking."""
+        with self._lock:
+            return {
+                "posicoes": len(self._chaves) if self._chaves is not None else 0,
+                "recargas": self.recargas,
+                "atualizacoes": self.atualizacoes,
+            }
@@ -0,0 +1,361 @@
+"""Acesso aos dados das páginas por uma interface única, com armazenamento trocável.
+
+`Repositorio` descreve tudo o que o app.py e os componentes leem e gravam:
+livros, comentários, estatísticas e busca. Há duas implementações:
+
+- RepositorioSQLite: o banco transacional do app (banco.py), com o pool de
+  conexões, o cache de consultas, a fila de escrita e a busca FTS5.
+- RepositorioDuckDB: uma réplica colunar das tabelas num DuckDB embutido,
+  para leituras analíticas em acervos grandes. O SQLite continua sendo a
+  origem dos dados: escritas e busca textual vão para ele, e a réplica é
+  atualizada quando o SQLite muda. A primeira cópia é completa; depois,
+  os comentários, que só crescem, vêm pelo id, e os livros e as listas de
+  similares alterados, pelo registro alteracoes_replica (migração 10).
+
+obter_repositorio() devolve o repositório do processo, escolhido pela
+variável BIBLIOTECA_BACKEND ("sqlite", o padrão, ou "duckdb"). As duas
+implementações devem devolver exatamente os mesmos resultados; isso é
+verificado por `python conformidade.py`.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Protocol, Sequence, Tuple
+import pandas as pd
+import banco
+from banco import ORDENACOES_LIVROS, TAMANHO_PAGINA, TAMANHO_PAGINA_COMENTARIOS
+from metricas import cronometrado
+
+# Cursor de paginação: (valor da coluna de ordenação, id) do último item exibido
+Cursor = Optional[Tuple[Any, int]]
+
+# Implementação usada pelo app (sqlite ou duckdb)
+BACKEND = os.environ.get('BIBLIOTECA_BACKEND', 'sqlite')
+
+# Idade máxima da réplica do DuckDB quando o SQLite muda; 0 sincroniza a cada mudança
+INTERVALO_SINCRONIZACAO = float(os.environ.get('BIBLIOTECA_SINCRONIZACAO', '0'))
+
+# Comentários copiados por vez para a réplica
+LINHAS_POR_COPIA = 100000
+
+# Tabelas copiadas para a réplica por livro alterado -> coluna com o id do livro
+TABELAS_POR_LIVRO = {"livros": "id", "livros_similares": "livro_id"}
+
+# Ids de livros por consulta ao recopiar os alterados
+IDS_POR_CONSULTA = 500
+
+
+class Repositorio(Protocol):
+    """Operações de dados usadas pelas páginas."""
+
+    def obter_livro_por_id(self, livro_id: int) -> pd.DataFrame: ...
+
+    def consultar_livros(self, generos: Optional[Sequence[str]] = None, nota_minima: float = 0.0,
+                         ordenar_por: str = "Mais Recentes", cursor: Cursor = None,
+                         tamanho_pagina: int = TAMANHO_PAGINA) -> Tuple[pd.DataFrame, Cursor]: ...
+
+    def obter_livros_populares(self, limite: int = 6) -> pd.DataFrame: ...
+
+    def obter_livros_similares(self, livro_id: int, limite: int = 6) -> pd.DataFrame: ...
+
+    def buscar_livros(self, termo_busca: str, limite: int = 100) -> pd.DataFrame: ...
+
+    def adicionar_livro(self, titulo: str, autor: str, ano_publicacao: Optional[int], genero: Optional[str],
+                        sinopse: Optional[str], nota: Optional[float], capa_url: str = "") -> int: ...
+
+    def consultar_comentarios(self, livro_id: int, cursor: Cursor = None,
+                              tamanho_pagina: int = TAMANHO_PAGINA_COMENTARIOS) -> Tuple[pd.DataFrame, Cursor]: ...
+
+    def contar_comentarios(self, livro_id: int) -> int: ...
+
+    def adicionar_comentario(self, livro_id: int, nome_usuario: str, comentario: str) -> int: ...
+
+    def obter_estatisticas(self) -> Dict[str, float]: ...
+
+
+class RepositorioSQLite:
+    """Repositório sobre o banco transacional do app (as funções do banco.py)."""
+
+    obter_livro_por_id = staticmethod(banco.obter_livro_por_id)
+    consultar_livros = staticmethod(banco.consultar_livros)
+    obter_livros_populares = staticmethod(banco.obter_livros_populares)
+    obter_livros_similares = staticmethod(banco.obter_livros_similares)
+    buscar_livros = staticmethod(banco.buscar_livros)
+    adicionar_livro = staticmethod(banco.adicionar_livro)
+    consultar_comentarios = staticmethod(banco.consultar_comentarios)
+    contar_comentarios = staticmethod(banco.contar_comentarios)
+    adicionar_comentario = staticmethod(banco.adicionar_comentario)
+    obter_estatisticas = staticmethod(banco.obter_estatisticas)
+
+
+# Tipos do SQLite -> tipos das colunas na réplica
+_TIPOS_DUCKDB = {"INTEGER": "BIGINT", "REAL": "DOUBLE", "TEXT": "VARCHAR", "BLOB": "BLOB"}
+
+
+class RepositorioDuckDB:
+    """Repositório com leituras numa réplica DuckDB do biblioteca.db.
+
+    As consultas reproduzem a semântica do SQLite, inclusive a posição dos
+    NULL nas ordenações (primeiro no ASC, por último no DESC), para que os
+    cursores de uma implementação sirvam na outra.
+    """
+
+    def __init__(self, caminho_banco=None, intervalo_sincronizacao=INTERVALO_SINCRONIZACAO):
+        try:
+            import duckdb
+        except ImportError as erro:
+            raise ImportError("O backend duckdb precisa do pacote duckdb (pip install duckdb)") from erro
+        self.caminho_banco = caminho_banco or banco.CAMINHO_BANCO
+        self.intervalo_sincronizacao = intervalo_sincronizacao
+        self._duck = duckdb.connect()
+        # Conexão própria: PRAGMA data_version muda quando outra conexão grava
+        self._origem = sqlite3.connect(self.caminho_banco, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._versao_origem = None
+        self._ultima_sincronizacao = 0.0
+        self._ultimo_comentario = 0
+        self._ultima_alteracao = 0
+        self._colunas = {}
+        self.sincronizacoes = 0
+
+    # --- Réplica -----------------------------------------------------------
+
+    def _criar_tabela(self, tabela):
+        colunas = self._origem.execute(f"PRAGMA table_info({tabela})").fetchall()
+        definicao = ", ".join(
+            f'"{nome}" {_TIPOS_DUCKDB.get((tipo or "").upper(), "VARCHAR")}' for _, nome, tipo, *_ in colunas
+        )
+        self._duck.execute(f"CREATE OR REPLACE TABLE {tabela} ({definicao})")
+        return [nome for _, nome, *_ in colunas]
+
+    def _copiar(self, tabela, colunas, consulta, parametros=()):
+        """Copia para a réplica, em blocos, as linhas de uma consulta ao SQLite."""
+        copiadas = 0
+        for bloco in pd.read_sql_query(consulta, self._origem, params=parametros, chunksize=LINHAS_POR_COPIA):
+            self._duck.register("bloco_origem", bloco)
+            self._duck.execute(f"INSERT INTO {tabela} SELECT {', '.join(colunas)} FROM bloco_origem")
+            self._duck.unregister("bloco_origem")
+            copiadas += len(bloco)
+        return copiadas
+
+    def sincronizar(self, forcar=False):
+        """Atualiza a réplica se o SQLite mudou (e o intervalo mínimo já passou)."""
+        with self._lock:
+            versao = self._origem.execute("PRAGMA data_version").fetchone()[0]
+            agora = time.monotonic()
+            if not forcar and versao == self._versao_origem:
+                return False
+            if not forcar and self._versao_origem is not None and \
+                    agora - self._ultima_sincronizacao < self.intervalo_sincronizacao:
+                return False
+
+            # Uma transação de leitura: todas as tabelas vêm do mesmo instante
+            self._origem.execute("BEGIN")
+            try:
+                completa = self._versao_origem is None or forcar
+                alteracao = self._origem.execute("SELECT COALESCE(MAX(seq), 0) FROM alteracoes_replica").fetchone()[0]
+                if completa:
+                    for tabela in [*TABELAS_POR_LIVRO, "comentarios"]:
+                        self._colunas[tabela] = self._criar_tabela(tabela)
+                    for tabela in TABELAS_POR_LIVRO:
+                        colunas = self._colunas[tabela]
+                        self._copiar(tabela, colunas, f"SELECT {', '.join(colunas)} FROM {tabela}")
+                    self._ultimo_comentario = 0
+                elif alteracao > self._ultima_alteracao:
+                    self._copiar_alterados()
+
+                colunas = self._colunas["comentarios"]
+                self._copiar(
+                    "comentarios", colunas,
+                    f"SELECT {', '.join(colunas)} FROM comentarios WHERE id > ? ORDER BY id",
+                    (self._ultimo_comentario,)
+                )
+                self._ultimo_comentario = self._duck.execute(
+                    "SELECT COALESCE(MAX(id), 0) FROM comentarios"
+                ).fetchone()[0]
+                self._ultima_alteracao = alteracao
+            finally:
+                self._origem.rollback()
+
+            self._versao_origem = versao
+            self._ultima_sincronizacao = agora
+            self.sincronizacoes += 1
+            return True
+
+    def _copiar_alterados(self):
+        """Recopia as linhas dos livros registrados em alteracoes_replica desde a última sincronização."""
+        alterados = pd.read_sql_query(
+            "SELECT tabela, livro_id FROM alteracoes_replica WHERE seq > ?",
+            self._origem, params=(self._ultima_alteracao,)
+        )
+        for tabela, coluna in TABELAS_POR_LIVRO.items():
+            ids = alterados.loc[alterados["tabela"] == tabela, ["livro_id"]]
+            if ids.empty:
+                continue
+            # Apaga as linhas antigas (inclusive de livros removidos) e copia as atuais
+            self._duck.register("ids_alterados", ids)
+            self._duck.execute(f"DELETE FROM {tabela} WHERE {coluna} IN (SELECT livro_id FROM ids_alterados)")
+            self._duck.unregister("ids_alterados")
+            colunas = self._colunas[tabela]
+            lista = ids["livro_id"].tolist()
+            for inicio in range(0, len(lista), IDS_POR_CONSULTA):
+                parte = lista[inicio:inicio + IDS_POR_CONSULTA]
+                self._copiar(
+                    tabela, colunas,
+                    f"SELECT {', '.join(colunas)} FROM {tabela} WHERE {coluna} IN ({', '.join('?' * len(parte))})",
+                    parte
+                )
+
+    def _consultar(self, sql, parametros=()):
+        self.sincronizar()
+        with self._lock:
+            return self._duck.execute(sql, list(parametros)).df()
+
+    # --- Livros ------------------------------------------------------------
+
+    @cronometrado
+    def obter_livro_por_id(self, livro_id):
+        return self._consultar("SELECT * FROM livros WHERE id = ?", (livro_id,))
+
+    @cronometrado
+    def consultar_livros(self, generos=None, nota_minima=0.0, ordenar_por="Mais Recentes",
+                         cursor=None, tamanho_pagina=TAMANHO_PAGINA):
+        coluna, descendente = ORDENACOES_LIVROS[ordenar_por]
+        # Mesma posição dos NULL que no SQLite
+        direcao = "DESC NULLS LAST" if descendente else "ASC NULLS FIRST"
+        direcao_id = "DESC" if descendente else "ASC"
+
+        condicoes = ["nota >= ?"]
+        parametros = [nota_minima]
+        if generos:
+            condicoes.append(f"genero IN ({', '.join('?' * len(generos))})")
+            parametros.extend(generos)
+        if cursor is not None:
+            condicao, valores = banco.condicao_cursor(coluna, descendente, cursor)
+            condicoes.append(condicao)
+            parametros.extend(valores)
+        parametros.append(tamanho_pagina + 1)
+
+        livros = self._consultar(
+            f"""
+            SELECT * FROM livros
+            WHERE {' AND '.join(condicoes)}
+            ORDER BY {coluna} {direcao}, id {direcao_id}
+            LIMIT ?
+            """,
+            parametros
+        )
+        proximo_cursor = None
+        if len(livros) > tamanho_pagina:
+            livros = livros.iloc[:tamanho_pagina]
+            valor, livro_id = livros[[coluna, "id"]].iloc[-1].tolist()
+            proximo_cursor = (None if pd.isna(valor) else valor, int(livro_id))
+        return livros, proximo_cursor
+
+    @cronometrado
+    def obter_livros_populares(self, limite=6):
+        return self._consultar(
+            """
+            SELECT * FROM livros WHERE popularidade IS NOT NULL
+            ORDER BY popularidade DESC, id DESC
+            LIMIT ?
+            """,
+            (limite,)
+        )
+
+    @cronometrado
+    def obter_livros_similares(self, livro_id, limite=6):
+        return self._consultar(
+            """
+            SELECT l.* FROM livros_similares s
+            JOIN livros l ON l.id = s.similar_id
+            WHERE s.livro_id = ?
+            ORDER BY s.similaridade DESC, s.similar_id
+            LIMIT ?
+            """,
+            (livro_id, limite)
+        )
+
+    def buscar_livros(self, termo_busca, limite=100):
+        # O índice FTS5 (e a ordem do bm25) existe só no SQLite
+        return banco.buscar_livros(termo_busca, limite)
+
+    def adicionar_livro(self, titulo, autor, ano_publicacao, genero, sinopse, nota, capa_url=""):
+        return banco.adicionar_livro(titulo, autor, ano_publicacao, genero, sinopse, nota, capa_url)
+
+    # --- Comentários -------------------------------------------------------
+
+    @cronometrado
+    def consultar_comentarios(self, livro_id, cursor=None, tamanho_pagina=TAMANHO_PAGINA_COMENTARIOS):
+        condicao, parametros = "", [livro_id]
+        if cursor is not None and cursor[0] is None:
+            condicao = "AND data_comentario IS NULL AND id < ?"
+            parametros.append(cursor[1])
+        elif cursor is not None:
+            condicao = "AND (data_comentario < ? OR (data_comentario = ? AND id < ?) OR data_comentario IS NULL)"
+            parametros.extend([cursor[0], cursor[0], cursor[1]])
+        parametros.append(tamanho_pagina + 1)
+
+        comentarios = self._consultar(
+            f"""
+            SELECT * FROM comentarios WHERE livro_id = ? {condicao}
+            ORDER BY data_comentario DESC NULLS LAST, id DESC
+            LIMIT ?
+            """,
+            parametros
+        )
+        proximo_cursor = None
+        if len(comentarios) > tamanho_pagina:
+            comentarios = comentarios.iloc[:tamanho_pagina]
+            data, comentario_id = comentarios[["data_comentario", "id"]].iloc[-1].tolist()
+            proximo_cursor = (None if pd.isna(data) else data, int(comentario_id))
+        return comentarios, proximo_cursor
+
+    @cronometrado
+    def contar_comentarios(self, livro_id):
+        # Contado na réplica, sem depender dos contadores mantidos por gatilhos
+        return int(self._consultar(
+            "SELECT COUNT(*) AS total FROM comentarios WHERE livro_id = ?", (livro_id,)
+        )["total"].iloc[0])
+
+    def adicionar_comentario(self, livro_id, nome_usuario, comentario):
+        return banco.adicionar_comentario(livro_id, nome_usuario, comentario)
+
+    # --- Estatísticas ------------------------------------------------------
+
+    @cronometrado
+    def obter_estatisticas(self):
+        linha = self._consultar(
+            """
+            SELECT COUNT(*) AS total_livros, SUM(nota) AS soma_notas, COUNT(nota) AS qtd_notas,
+                   (SELECT COUNT(*) FROM comentarios) AS total_comentarios,
+                   COUNT(DISTINCT genero) AS total_generos
+            FROM livros
+            """
+        ).iloc[0]
+        qtd_notas = int(linha["qtd_notas"])
+        return {
+            "total_livros": int(linha["total_livros"]),
+            "nota_media": round(float(linha["soma_notas"]) / qtd_notas, 1) if qtd_notas else 0,
+            "total_comentarios": int(linha["total_comentarios"]),
+            "total_generos": int(linha["total_generos"]),
+        }
+
+
+BACKENDS = {"sqlite": RepositorioSQLite, "duckdb": RepositorioDuckDB}
+
+_repositorio = None
+_lock_repositorio = threading.Lock()
+
+
+def obter_repositorio():
+    """Retorna o repositório do processo, criado na primeira chamada conforme BACKEND."""
+    global _repositorio
+    if _repositorio is None:
+        with _lock_repositorio:
+            if _repositorio is None:
+                if BACKEND not in BACKENDS:
+                    raise ValueError(f"BIBLIOTECA_BACKEND desconhecido: {BACKEND} (use {', '.join(BACKENDS)})")
+                _repositorio = BACKENDS[BACKEND]()
+    return _repositorio
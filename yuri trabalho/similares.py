@@ -0,0 +1,336 @@
+"""Recomendações de livros similares a partir do texto de cada livro.
+
+Cada livro vira um vetor esparso de termos: palavras e pares de palavras da
+sinopse, mais o gênero e o autor com peso maior. Os termos são mapeados por
+hash para um número fixo de colunas, então não há vocabulário a manter. Os
+vetores ficam na tabela livros_vetores; em memória formam uma matriz
+esparsa TF-IDF normalizada, e a similaridade de cosseno é um produto de
+matrizes feito em blocos. Os vizinhos mais próximos de cada livro são
+gravados em livros_similares: a página de detalhes faz uma única consulta
+pelo índice (ver banco.obter_livros_similares).
+
+Livros novos são incorporados sem refazer a matriz: os vetores deles são
+acrescentados, a lista de cada livro novo é calculada contra todos e ele
+entra na lista dos livros antigos em que superar o último vizinho. O IDF dos
+vetores antigos só é recalculado numa reconstrução completa:
+
+    python similares.py --reconstruir
+"""
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scipy import sparse
+from banco import conexao, escritor
+from cache import cache_consultas
+from semelhanca import normalizar_texto
+
+# Colunas da matriz de termos (os termos são distribuídos por hash)
+DIMENSOES = 2 ** 20
+
+# Peso do gênero e do autor em relação a uma palavra da sinopse
+PESO_GENERO = 3.0
+PESO_AUTOR = 2.0
+
+# Termos presentes em mais que esta fração dos livros (artigos, preposições...)
+# são ignorados: quase não distinguem os livros e tornariam o produto denso
+FRACAO_MAXIMA_LIVROS = 0.5
+
+# Vizinhos guardados por livro
+VIZINHOS = 6
+
+# Tamanho máximo (linhas x livros) de cada bloco denso de similaridades
+CELULAS_POR_BLOCO = 2 ** 24
+
+# Livros vetorizados e comparados por vez
+LIVROS_POR_LOTE = 20000
+
+# Livros cujos vetores e listas vão juntos para a fila de escrita: cada
+# operação ocupa o escritor por pouco tempo, e os comentários entram entre elas
+LIVROS_POR_GRAVACAO = 250
+
+_lock = threading.Lock()
+_modelo = None
+_atualizacao_agendada = False
+_atualizacao_iniciada = False
+# Uma única thread altera o modelo, o que dispensa locks em volta dele
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="similares")
+
+
+def termos_livro(sinopse, genero, autor):
+    """Retorna os termos de um livro com seus pesos."""
+    palavras = normalizar_texto(sinopse or "").split()
+    termos = Counter(palavras)
+    termos.update(f"{primeira} {segunda}" for primeira, segunda in zip(palavras, palavras[1:]))
+    if genero:
+        termos[f"genero:{normalizar_texto(genero)}"] += PESO_GENERO
+    if autor:
+        termos[f"autor:{normalizar_texto(autor)}"] += PESO_AUTOR
+    return termos
+
+
+def vetor_livro(sinopse, genero, autor):
+    """Retorna o vetor esparso do livro: (colunas em ordem, contagens)."""
+    contagens = {}
+    for termo, peso in termos_livro(sinopse, genero, autor).items():
+        # crc32 é estável entre processos, ao contrário do hash() do Python
+        coluna = zlib.crc32(termo.encode("utf-8")) % DIMENSOES
+        contagens[coluna] = contagens.get(coluna, 0.0) + peso
+    colunas = sorted(contagens)
+    return np.array(colunas, dtype=np.int32), np.array([contagens[coluna] for coluna in colunas], dtype=np.float32)
+
+
+def _matriz_de_vetores(vetores):
+    """Empilha vetores (colunas, contagens) numa matriz CSR de contagens."""
+    tamanhos = [len(colunas) for colunas, _ in vetores]
+    ponteiros = np.zeros(len(vetores) + 1, dtype=np.int64)
+    np.cumsum(tamanhos, out=ponteiros[1:])
+    colunas = np.concatenate([colunas for colunas, _ in vetores]) if vetores else np.empty(0, dtype=np.int32)
+    contagens = np.concatenate([contagens for _, contagens in vetores]) if vetores else np.empty(0, dtype=np.float32)
+    return sparse.csr_matrix((contagens, colunas, ponteiros), shape=(len(vetores), DIMENSOES))
+
+
+def _tfidf_normalizado(contagens, frequencia, total_livros):
+    """Aplica o IDF às contagens e normaliza cada linha (norma L2 igual a 1)."""
+    idf = (np.log((1.0 + total_livros) / (1.0 + frequencia)) + 1.0).astype(np.float32)
+    idf[frequencia > FRACAO_MAXIMA_LIVROS * total_livros] = 0.0
+    matriz = contagens.copy()
+    matriz.data *= idf[matriz.indices]
+    matriz.eliminate_zeros()
+    normas = np.sqrt(np.asarray(matriz.multiply(matriz).sum(axis=1)).ravel())
+    normas[normas == 0] = 1.0
+    matriz.data /= np.repeat(normas, np.diff(matriz.indptr)).astype(np.float32)
+    return matriz
+
+
+class ModeloSimilares:
+    """Matriz TF-IDF em memória dos livros já vetorizados e o limiar de entrada de cada lista."""
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.matriz = sparse.csr_matrix((0, DIMENSOES), dtype=np.float32)
+        self.frequencia = np.zeros(DIMENSOES, dtype=np.int64)  # livros que contêm cada coluna
+        # Similaridade que um livro novo precisa superar para entrar na lista (0 se ela não está cheia)
+        self.limiares = np.empty(0, dtype=np.float32)
+
+    @classmethod
+    def carregar(cls, conn):
+        """Monta o modelo a partir dos vetores e das listas gravadas no banco."""
+        modelo = cls()
+        linhas = conn.execute("SELECT livro_id, indices, contagens FROM livros_vetores ORDER BY livro_id").fetchall()
+        if not linhas:
+            return modelo
+
+        contagens = _matriz_de_vetores([
+            (np.frombuffer(indices, dtype=np.int32), np.frombuffer(valores, dtype=np.float32))
+            for _, indices, valores in linhas
+        ])
+        modelo.ids = np.array([livro_id for livro_id, _, _ in linhas], dtype=np.int64)
+        modelo.frequencia = np.bincount(contagens.indices, minlength=DIMENSOES).astype(np.int64)
+        modelo.matriz = _tfidf_normalizado(contagens, modelo.frequencia, len(modelo.ids))
+        modelo.limiares = np.zeros(len(modelo.ids), dtype=np.float32)
+        modelo._atualizar_limiares(conn, modelo.ids.tolist())
+        return modelo
+
+    def _atualizar_limiares(self, conn, livro_ids):
+        """Relê do banco o limiar das listas dos livros informados."""
+        posicoes = dict(zip(self.ids.tolist(), range(len(self.ids))))
+        for inicio in range(0, len(livro_ids), 500):
+            parte = livro_ids[inicio:inicio + 500]
+            linhas = conn.execute(
+                f"""
+                SELECT livro_id, COUNT(*), MIN(similaridade) FROM livros_similares
+                WHERE livro_id IN ({', '.join('?' * len(parte))})
+                GROUP BY livro_id
+                """,
+                parte
+            ).fetchall()
+            for livro_id, quantidade, menor in linhas:
+                self.limiares[posicoes[livro_id]] = menor if quantidade >= VIZINHOS else 0.0
+
+    def incorporar(self, conn, livros):
+        """Acrescenta livros (id, sinopse, genero, autor) ao modelo e grava vetores e vizinhos.
+
+        Todo o cálculo é feito antes das gravações, que vão em partes pela fila
+        de escrita (banco.escritor): o lock do SQLite não espera pelos produtos
+        de matrizes, e as outras escritas do app não esperam pelo lote inteiro.
+        """
+        vetores = [vetor_livro(sinopse, genero, autor) for _, sinopse, genero, autor in livros]
+        novos_ids = np.array([livro[0] for livro in livros], dtype=np.int64)
+
+        contagens = _matriz_de_vetores(vetores)
+        self.frequencia += np.bincount(contagens.indices, minlength=DIMENSOES)
+        antigos = len(self.ids)
+        self.ids = np.concatenate([self.ids, novos_ids])
+        self.matriz = sparse.vstack(
+            [self.matriz, _tfidf_normalizado(contagens, self.frequencia, len(self.ids))], format="csr"
+        )
+        self.limiares = np.concatenate([self.limiares, np.zeros(len(novos_ids), dtype=np.float32)])
+
+        vizinhos = []        # (livro_id, similar_id, similaridade) das listas dos livros novos
+        entradas = []        # livros novos que entram nas listas dos antigos
+        linhas_por_bloco = max(1, CELULAS_POR_BLOCO // len(self.ids))
+        for inicio in range(antigos, len(self.ids), linhas_por_bloco):
+            fim = min(inicio + linhas_por_bloco, len(self.ids))
+            # Cosseno = produto escalar, pois as linhas já estão normalizadas
+            bloco = (self.matriz @ self.matriz[inicio:fim].T).toarray().T
+            bloco[np.arange(fim - inicio), np.arange(inicio, fim)] = 0.0  # o próprio livro
+
+            k = min(VIZINHOS, len(self.ids) - 1)
+            if k > 0:
+                melhores = np.argpartition(-bloco, k - 1, axis=1)[:, :k]
+                for linha, colunas in enumerate(melhores):
+                    for coluna in colunas:
+                        if bloco[linha, coluna] > 0:
+                            vizinhos.append((int(self.ids[inicio + linha]), int(self.ids[coluna]), float(bloco[linha, coluna])))
+
+            # Livros antigos cujo último vizinho perde para algum dos novos
+            linhas, colunas = np.nonzero(bloco[:, :antigos] > self.limiares[:antigos])
+            entradas.extend(
+                (int(self.ids[coluna]), int(self.ids[inicio + linha]), float(bloco[linha, coluna]))
+                for linha, coluna in zip(linhas, colunas)
+            )
+
+        # O vetor de cada livro novo vai na mesma transação que a lista dele: um
+        # livro com vetor gravado nunca fica sem vizinhos
+        vizinhos_por_livro = {}
+        for linha in vizinhos:
+            vizinhos_por_livro.setdefault(linha[0], []).append(linha)
+        for inicio in range(0, len(novos_ids), LIVROS_POR_GRAVACAO):
+            parte = range(inicio, min(inicio + LIVROS_POR_GRAVACAO, len(novos_ids)))
+            _gravar([
+                (
+                    "INSERT OR REPLACE INTO livros_vetores (livro_id, indices, contagens) VALUES (?, ?, ?)",
+                    [(int(novos_ids[i]), vetores[i][0].tobytes(), vetores[i][1].tobytes()) for i in parte],
+                ),
+                (
+                    "INSERT OR REPLACE INTO livros_similares (livro_id, similar_id, similaridade) VALUES (?, ?, ?)",
+                    [linha for i in parte for linha in vizinhos_por_livro.get(int(novos_ids[i]), [])],
+                ),
+            ])
+
+        # Entradas nas listas dos livros antigos, cada lista cortada na mesma transação
+        entradas_por_livro = {}
+        for linha in entradas:
+            entradas_por_livro.setdefault(linha[0], []).append(linha)
+        alterados = sorted(entradas_por_livro)
+        for inicio in range(0, len(alterados), LIVROS_POR_GRAVACAO):
+            parte = alterados[inicio:inicio + LIVROS_POR_GRAVACAO]
+            _gravar([
+                (
+                    "INSERT OR REPLACE INTO livros_similares (livro_id, similar_id, similaridade) VALUES (?, ?, ?)",
+                    [linha for livro_id in parte for linha in entradas_por_livro[livro_id]],
+                ),
+                (
+                    """
+                    DELETE FROM livros_similares WHERE livro_id = ? AND similar_id NOT IN (
+                        SELECT similar_id FROM livros_similares WHERE livro_id = ? ORDER BY similaridade DESC LIMIT ?
+                    )
+                    """,
+                    [(livro_id, livro_id, VIZINHOS) for livro_id in parte],
+                ),
+            ])
+        self._atualizar_limiares(conn, novos_ids.tolist() + alterados)
+        return len(vizinhos), len(alterados)
+
+
+def _gravar(comandos):
+    """Grava os comandos [(sql, linhas)] juntos pela fila de escrita (uma operação da fila)."""
+    def executar(conn):
+        for sql, linhas in comandos:
+            conn.executemany(sql, linhas)
+    escritor.executar(executar, tabelas=('similares',))
+
+
+def incorporar_pendentes():
+    """Incorpora ao modelo os livros que ainda não têm vetor. Retorna quantos foram incorporados."""
+    global _modelo
+    total = 0
+    with conexao() as conn:
+        try:
+            if _modelo is None:
+                _modelo = ModeloSimilares.carregar(conn)
+            while True:
+                livros = conn.execute(
+                    """
+                    SELECT id, sinopse, genero, autor FROM livros
+                    WHERE id NOT IN (SELECT livro_id FROM livros_vetores)
+                    ORDER BY id LIMIT ?
+                    """,
+                    (LIVROS_POR_LOTE,)
+                ).fetchall()
+                if not livros:
+                    break
+                _modelo.incorporar(conn, livros)
+                total += len(livros)
+        except Exception:
+            # O modelo em memória pode ter ficado à frente do banco: recarrega na próxima vez
+            _modelo = None
+            raise
+    return total
+
+
+def reconstruir():
+    """Apaga vetores e vizinhos e recalcula tudo com o IDF atual."""
+    global _modelo
+    with conexao() as conn:
+        conn.execute("DELETE FROM livros_similares")
+        conn.execute("DELETE FROM livros_vetores")
+        conn.commit()
+    cache_consultas.invalidar('similares')
+    _modelo = None
+    return incorporar_pendentes()
+
+
+def _atualizar_em_segundo_plano():
+    global _atualizacao_agendada
+    with _lock:
+        _atualizacao_agendada = False
+    try:
+        incorporar_pendentes()
+    except Exception:
+        # Sem recomendações novas até a próxima tentativa; o app segue funcionando
+        pass
+
+
+def agendar_atualizacao():
+    """Agenda a incorporação dos livros novos; pedidos seguidos são atendidos de uma vez."""
+    global _atualizacao_agendada
+    with _lock:
+        if _atualizacao_agendada:
+            return
+        _atualizacao_agendada = True
+    _executor.submit(_atualizar_em_segundo_plano)
+
+
+def iniciar_atualizacao():
+    """Agenda, uma vez por processo, a incorporação dos livros que ainda não têm vetor."""
+    global _atualizacao_iniciada
+    with _lock:
+        if _atualizacao_iniciada:
+            return
+        _atualizacao_iniciada = True
+    agendar_atualizacao()
+
+
+def desligar_atualizacao():
+    """Impede que novos livros e a inicialização agendem a incorporação (benchmark e testes)."""
+    global _atualizacao_iniciada, _atualizacao_agendada
+    with _lock:
+        _atualizacao_iniciada = True
+        _atualizacao_agendada = True
+
+
+if __name__ == "__main__":
+    from banco import init_db
+
+    init_db()
+    inicio = time.perf_counter()
+    if "--reconstruir" in sys.argv:
+        quantidade = reconstruir()
+    else:
+        quantidade = incorporar_pendentes()
+    print(f"{quantidade} livros incorporados em {time.perf_counter() - inicio:.2f} s")
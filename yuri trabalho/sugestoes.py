@@ -0,0 +1,230 @@
+"""Sugestões de títulos e autores enquanto o usuário digita na busca.
+
+O índice fica em memória, montado uma vez por processo a partir do banco:
+um array ordenado de chaves (título inteiro e cada palavra do nome do
+autor, normalizados por semelhanca.normalizar_texto e cortados em
+TAMANHO_CHAVE bytes) e, alinhados a ele, o tipo da entrada, um livro e o
+peso (a popularidade do livro; para um autor, a do seu livro mais
+popular). As entradas que começam com o texto digitado formam uma faixa
+contínua do array, achada por busca binária (np.searchsorted), e os
+CANDIDATOS mais pesados da faixa saem de um argpartition. Para prefixos de
+até PREFIXO_CURTO bytes, cuja faixa pode ser o acervo inteiro, a lista já
+fica pronta desde a montagem.
+
+Livros adicionados depois da montagem vão para uma lista ordenada à parte,
+consultada junto com o array (ver acrescentar_livro); uma importação em
+lote agenda uma nova montagem em segundo plano, e o índice antigo segue
+respondendo até o novo ficar pronto.
+"""
+import bisect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from banco import conexao
+from metricas import cronometrado
+from semelhanca import normalizar_coluna, normalizar_texto
+
+# Sugestões mostradas por consulta
+SUGESTOES = 8
+
+# Entradas tiradas do índice por consulta: um autor com vários livros ou
+# títulos repetidos viram uma sugestão só, então pega-se o dobro
+CANDIDATOS = 2 * SUGESTOES
+
+# Bytes guardados de cada chave (prefixos mais longos são cortados no mesmo ponto)
+TAMANHO_CHAVE = 48
+
+# Prefixos com até este número de bytes têm as sugestões calculadas na montagem
+PREFIXO_CURTO = 2
+
+TITULO, AUTOR = 0, 1
+
+_lock = threading.Lock()
+_indice = None
+_montagem_agendada = False
+_montagem_iniciada = False
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sugestoes")
+
+
+class IndicePrefixos:
+    """Array ordenado de chaves com os tipos, livros e pesos de cada entrada."""
+
+    def __init__(self, chaves, tipos, livros, pesos, ultimo_id=0):
+        self.ultimo_id = ultimo_id
+        ordem = np.argsort(chaves, kind="stable")
+        self.chaves = chaves[ordem]
+        self.tipos = tipos[ordem]
+        self.livros = livros[ordem]
+        self.pesos = pesos[ordem]
+        self.curtos = self._calcular_curtos()
+        # Entradas acrescentadas depois da montagem: (chave, tipo, livro, peso), em ordem
+        self.acrescentadas = []
+
+    @classmethod
+    def carregar(cls, conn):
+        """Monta o índice com todos os livros do banco."""
+        livros = pd.read_sql_query("SELECT id, titulo, autor, popularidade FROM livros", conn)
+        pesos = livros["popularidade"].fillna(0.0).to_numpy(dtype=np.float32)
+
+        # Cada autor uma vez, com o livro mais popular dele (normalizando cada grafia uma vez só)
+        autores = livros.assign(peso=pesos).sort_values("peso", ascending=False).drop_duplicates("autor")
+        autores = autores.assign(chave_autor=normalizar_coluna(autores["autor"])).drop_duplicates("chave_autor")
+        palavras = autores.assign(palavra=autores["chave_autor"].map(_inicios_de_palavra)).explode("palavra")
+        palavras = palavras[palavras["palavra"].fillna("") != ""]
+
+        def codificar(textos):
+            return np.array([texto.encode()[:TAMANHO_CHAVE] for texto in textos], dtype=f"S{TAMANHO_CHAVE}")
+
+        return cls(
+            np.concatenate([codificar(normalizar_coluna(livros["titulo"])), codificar(palavras["palavra"])]),
+            np.concatenate([np.full(len(livros), TITULO, np.int8), np.full(len(palavras), AUTOR, np.int8)]),
+            np.concatenate([livros["id"].to_numpy(np.int64), palavras["id"].to_numpy(np.int64)]),
+            np.concatenate([pesos, palavras["peso"].to_numpy(np.float32)]),
+            int(livros["id"].max()) if len(livros) else 0,
+        )
+
+    def _melhores(self, inicio, fim, limite):
+        """Posições das `limite` entradas mais pesadas da faixa [inicio, fim)."""
+        if fim - inicio > limite:
+            return inicio + np.argpartition(-self.pesos[inicio:fim], limite - 1)[:limite]
+        return np.arange(inicio, fim)
+
+    def _calcular_curtos(self):
+        """Sugestões de cada prefixo de até PREFIXO_CURTO bytes: prefixo -> posições."""
+        curtos = {}
+        for tamanho in range(1, PREFIXO_CURTO + 1):
+            prefixos, inicios = np.unique(self.chaves.astype(f"S{tamanho}"), return_index=True)
+            fins = np.append(inicios[1:], len(self.chaves))
+            for prefixo, inicio, fim in zip(prefixos, inicios, fins):
+                # Chaves mais curtas que o prefixo (ex.: título "a") não contam para os mais longos
+                if len(prefixo) == tamanho:
+                    curtos[bytes(prefixo)] = self._melhores(int(inicio), int(fim), CANDIDATOS)
+        return curtos
+
+    def sugerir(self, prefixo):
+        """Até CANDIDATOS entradas (tipo, livro) que começam com o prefixo normalizado, das mais pesadas às menos."""
+        chave = prefixo.encode()[:TAMANHO_CHAVE]
+        if len(chave) <= PREFIXO_CURTO:
+            posicoes = self.curtos.get(chave, np.arange(0))
+        else:
+            inicio = int(np.searchsorted(self.chaves, chave, side="left"))
+            # 0xff não aparece em UTF-8: toda chave com o prefixo é menor que prefixo + 0xff
+            fim = int(np.searchsorted(self.chaves, chave + b"\xff", side="left"))
+            posicoes = self._melhores(inicio, fim, CANDIDATOS)
+        candidatos = [(float(self.pesos[p]), int(self.tipos[p]), int(self.livros[p])) for p in posicoes]
+
+        inicio = bisect.bisect_left(self.acrescentadas, (chave,))
+        fim = bisect.bisect_left(self.acrescentadas, (chave + b"\xff",))
+        candidatos += [(peso, tipo, livro) for _, tipo, livro, peso in self.acrescentadas[inicio:fim]]
+        candidatos.sort(key=lambda candidato: (-candidato[0], candidato[2], candidato[1]))
+        return [(tipo, livro) for _, tipo, livro in candidatos[:CANDIDATOS]]
+
+    def acrescentar(self, livro_id, titulo, autor, peso):
+        """Inclui um livro novo (título e palavras do autor) sem remontar o array."""
+        chaves = [(normalizar_texto(titulo), TITULO)] + [
+            (palavra, AUTOR) for palavra in _inicios_de_palavra(normalizar_texto(autor))
+        ]
+        for texto, tipo in chaves:
+            if texto:
+                bisect.insort(self.acrescentadas, (texto.encode()[:TAMANHO_CHAVE], tipo, livro_id, peso))
+
+
+def _inicios_de_palavra(texto):
+    """O texto a partir de cada palavra: "j r r tolkien" -> ["j r r tolkien", "r r tolkien", ...]."""
+    palavras = texto.split()
+    return [" ".join(palavras[i:]) for i in range(len(palavras))]
+
+
+def montar():
+    """Monta o índice com o banco atual e o põe no lugar do anterior."""
+    global _indice
+    with conexao() as conn:
+        indice = IndicePrefixos.carregar(conn)
+    with _lock:
+        # Livros adicionados durante a montagem, depois da leitura do banco
+        if _indice is not None:
+            indice.acrescentadas = [
+                entrada for entrada in _indice.acrescentadas if entrada[2] > indice.ultimo_id
+            ]
+        _indice = indice
+    return indice
+
+
+def _montar_em_segundo_plano():
+    global _montagem_agendada
+    with _lock:
+        _montagem_agendada = False
+    try:
+        montar()
+    except Exception:
+        # Sem sugestões (ou com as antigas) até a próxima montagem; a busca continua funcionando
+        pass
+
+
+def agendar_montagem():
+    """Agenda a montagem do índice em segundo plano; pedidos seguidos são atendidos de uma vez."""
+    global _montagem_agendada
+    with _lock:
+        if _montagem_agendada:
+            return
+        _montagem_agendada = True
+    _executor.submit(_montar_em_segundo_plano)
+
+
+def iniciar_indice():
+    """Agenda, uma vez por processo, a primeira montagem do índice."""
+    global _montagem_iniciada
+    # Uma flag própria: _indice continua None enquanto a montagem roda, e cada
+    # rerun do app durante ela agendaria outra
+    with _lock:
+        if _montagem_iniciada:
+            return
+        _montagem_iniciada = True
+    agendar_montagem()
+
+
+def acrescentar_livro(livro_id, titulo, autor):
+    """Inclui no índice um livro recém-adicionado (se o índice já foi montado)."""
+    if _indice is None:
+        return
+    with conexao() as conn:
+        linha = conn.execute("SELECT popularidade FROM livros WHERE id = ?", (livro_id,)).fetchone()
+    with _lock:
+        _indice.acrescentar(livro_id, titulo, autor, float(linha[0] or 0.0) if linha else 0.0)
+
+
+# Função para sugerir títulos e autores para o texto digitado
+@cronometrado
+def sugerir(termo, limite=SUGESTOES):
+    """Retorna até `limite` (no máximo SUGESTOES) sugestões (tipo, texto, livro_id); vazia enquanto o índice é montado."""
+    indice = _indice
+    prefixo = normalizar_texto(termo or "")
+    if indice is None or not prefixo:
+        return []
+
+    entradas = indice.sugerir(prefixo)
+    if not entradas:
+        return []
+    ids = sorted({livro for _, livro in entradas})
+    with conexao() as conn:
+        textos = {
+            livro_id: (titulo, autor)
+            for livro_id, titulo, autor in conn.execute(
+                f"SELECT id, titulo, autor FROM livros WHERE id IN ({', '.join('?' * len(ids))})", ids
+            )
+        }
+
+    sugestoes, vistos = [], set()
+    for tipo, livro in entradas:
+        if livro not in textos:
+            continue
+        titulo, autor = textos[livro]
+        texto = titulo if tipo == TITULO else autor
+        if (tipo, texto) in vistos:
+            continue
+        vistos.add((tipo, texto))
+        sugestoes.append(("titulo" if tipo == TITULO else "autor", texto, livro))
+        if len(sugestoes) == limite:
+            break
+    return sugestoes
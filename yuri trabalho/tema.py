@@ -0,0 +1,133 @@
+"""Compilação do tema visual em uma folha de estilos estática.
+
+O CSS fica em estilos/tema.css. Uma vez por processo ele recebe as cores do
+app, é minificado e gravado em static/tema.min.css, que o Streamlit serve em
+app/static/ (enableStaticServing em .streamlit/config.toml). A cada rerun a
+página recebe só a tag <link>, com o hash do conteúdo em `?v=`: o navegador
+baixa o arquivo uma vez e o servidor de arquivos estáticos o marca como
+cacheável por tempo longo.
+
+Para baixar as fontes Poppins para static/fontes:
+
+    python tema.py --baixar-fontes
+
+Enquanto os arquivos não estiverem lá, a página também recebe a folha de
+estilos do Google Fonts (URL_POPPINS_REMOTA), depois da do tema.
+"""
+import hashlib
+import os
+import re
+import sys
+import threading
+from string import Template
+from metricas import cronometrado
+
+PASTA_APP = os.path.dirname(os.path.abspath(__file__))
+ARQUIVO_FONTE = os.path.join(PASTA_APP, 'estilos', 'tema.css')
+PASTA_STATIC = os.path.join(PASTA_APP, 'static')
+ARQUIVO_COMPILADO = os.path.join(PASTA_STATIC, 'tema.min.css')
+
+# Endereço público da pasta static/ no servidor do Streamlit
+URL_STATIC = 'app/static'
+
+# Pesos da Poppins usados pelo tema
+PESOS_POPPINS = (300, 400, 500, 600, 700)
+
+# Poppins pelo Google Fonts, para quando os arquivos locais não foram baixados
+URL_POPPINS_REMOTA = (
+    "https://fonts.googleapis.com/css2?family=Poppins:wght@"
+    + ";".join(str(peso) for peso in PESOS_POPPINS) + "&display=swap"
+)
+
+_lock = threading.Lock()
+_tags_compiladas = {}  # cores -> tag <link> pronta
+
+
+def minificar_css(css):
+    """Remove comentários e espaços desnecessários do CSS."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    css = css.replace(";}", "}")
+    return css.strip()
+
+
+def compilar_tema(cores):
+    """Gera static/tema.min.css com as cores informadas e retorna a versão (hash do conteúdo)."""
+    with open(ARQUIVO_FONTE, encoding="utf-8") as arquivo:
+        fonte = arquivo.read()
+    css = minificar_css(Template(fonte).substitute(cores))
+    conteudo = css.encode("utf-8")
+    versao = hashlib.sha256(conteudo).hexdigest()[:12]
+
+    # Só regrava quando o conteúdo mudou
+    try:
+        with open(ARQUIVO_COMPILADO, "rb") as arquivo:
+            atual = arquivo.read()
+    except OSError:
+        atual = None
+    if atual != conteudo:
+        os.makedirs(PASTA_STATIC, exist_ok=True)
+        temporario = f"{ARQUIVO_COMPILADO}.{os.getpid()}.tmp"
+        with open(temporario, "wb") as arquivo:
+            arquivo.write(conteudo)
+        os.replace(temporario, ARQUIVO_COMPILADO)
+
+    return versao
+
+
+def fontes_locais():
+    """Indica se todos os pesos da Poppins estão em static/fontes."""
+    return all(
+        os.path.exists(os.path.join(PASTA_STATIC, 'fontes', f"poppins-{peso}.woff2")) for peso in PESOS_POPPINS
+    )
+
+
+@cronometrado
+def tag_tema(cores):
+    """Retorna a tag <link> do tema, compilando-o na primeira chamada do processo."""
+    chave = tuple(sorted(cores.items()))
+    with _lock:
+        tag = _tags_compiladas.get(chave)
+        if tag is None:
+            versao = compilar_tema(cores)
+            tag = f'<link rel="stylesheet" href="{URL_STATIC}/tema.min.css?v={versao}">'
+            if not fontes_locais():
+                # Depois do tema: as regras @font-face remotas prevalecem sobre as locais sem arquivo
+                tag += f'<link rel="stylesheet" href="{URL_POPPINS_REMOTA}">'
+            _tags_compiladas[chave] = tag
+    return tag
+
+
+def baixar_fontes():
+    """Baixa os arquivos woff2 (subconjunto latino) da Poppins para static/fontes."""
+    import requests
+
+    # Com um User-Agent de navegador atual o Google Fonts responde com woff2
+    resposta = requests.get(
+        URL_POPPINS_REMOTA,
+        headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0 Safari/537.36"},
+        timeout=10,
+    )
+    resposta.raise_for_status()
+
+    pasta = os.path.join(PASTA_STATIC, 'fontes')
+    os.makedirs(pasta, exist_ok=True)
+    for subconjunto, bloco in re.findall(r"/\* ([\w-]+) \*/\s*(@font-face\s*{.*?})", resposta.text, flags=re.S):
+        if subconjunto != "latin":
+            continue
+        peso = re.search(r"font-weight:\s*(\d+)", bloco).group(1)
+        url = re.search(r"url\((.*?)\)", bloco).group(1)
+        arquivo = requests.get(url, timeout=10)
+        arquivo.raise_for_status()
+        with open(os.path.join(pasta, f"poppins-{peso}.woff2"), "wb") as destino:
+            destino.write(arquivo.content)
+        print(f"poppins-{peso}.woff2: {len(arquivo.content)} bytes")
+
+
+if __name__ == "__main__":
+    if "--baixar-fontes" in sys.argv:
+        baixar_fontes()
+    else:
+        print(__doc__)
@@ -0,0 +1,15 @@
+"""Configuração dos testes: banco temporário e a pasta do app no caminho de importação.
+
+O banco.py lê BIBLIOTECA_DB quando é importado, então o caminho é definido
+aqui, antes de qualquer teste importar os módulos do app.
+"""
+import os
+import sys
+import tempfile
+
+PASTA_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_pasta_temporaria = tempfile.TemporaryDirectory(prefix="bibliotech_testes_")
+
+os.environ["BIBLIOTECA_DB"] = os.path.join(_pasta_temporaria.name, "biblioteca.db")
+os.environ["BIBLIOTECA_METRICAS"] = ""
+sys.path.insert(0, PASTA_APP)
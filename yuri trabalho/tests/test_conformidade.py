@@ -0,0 +1,23 @@
+"""Os backends do repositório devolvem o mesmo que o SQLite num acervo pequeno.
+
+Para acervos maiores: python conformidade.py --livros 5000 --comentarios 50000
+"""
+import pytest
+from conformidade import preparar_acervo, verificar
+from repositorio import BACKENDS
+
+LIVROS = 200
+COMENTARIOS = 2000
+
+
+@pytest.fixture(scope="module")
+def acervo():
+    preparar_acervo(LIVROS, COMENTARIOS)
+    return LIVROS
+
+
+@pytest.mark.parametrize("backend", [nome for nome in BACKENDS if nome != "sqlite"])
+def test_backend_igual_ao_sqlite(acervo, backend):
+    total, falhas = verificar(backend, acervo)
+    assert total > 0
+    assert not falhas, "\n\n".join(f"{nome}\n{diferenca}" for nome, diferenca in falhas)